@@ -0,0 +1,28 @@
+"""
+Helpers for conditional GET (ETag / Last-Modified) in API views.
+"""
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """
+    Return a 304 response if the client's If-None-Match / If-Modified-Since
+    validators still match, otherwise None. last_modified is a datetime.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None and response.status_code == 304:
+        set_validators(response, etag, last_modified)
+        return response
+    return None
+
+
+def set_validators(response, etag=None, last_modified=None):
+    if etag:
+        response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    # Clients may keep the response but must revalidate it every time.
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,63 @@
+"""
+Tiny counter/timer store on top of Django's cache framework.
+
+Values live in the default cache, so they are shared between processes when
+CACHE_URL points at a shared backend and are per-process with the default
+local-memory cache. Commands that report counters of other processes check
+is_shared() first. Only Redis and Memcached increment atomically; the
+database and file caches share values but implement incr as get + set, so
+concurrent increments can be lost (has_atomic_incr()).
+"""
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+
+PREFIX = "metrics:"
+
+
+def incr(name, delta=1):
+    key = PREFIX + name
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Evicted between add() and incr().
+        cache.set(key, delta, timeout=None)
+        return delta
+
+
+def observe(name, seconds):
+    """
+    Record a duration: keeps a count and a running total in milliseconds.
+    """
+    incr(f"{name}.count")
+    incr(f"{name}.total_ms", int(seconds * 1000))
+
+
+def is_shared():
+    """
+    Whether every process sees the same counters, i.e. the default cache
+    isn't a local-memory or dummy one. Other state kept in the cache for
+    all processes (e.g. meetings.cache) relies on this too.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def has_atomic_incr():
+    """
+    Whether the default cache is shared and its incr() is atomic across
+    processes: Redis (Django's or django-redis) or Memcached.
+    """
+    backend = caches['default']
+    return isinstance(backend, (RedisCache, BaseMemcachedCache)) or type(backend).__module__.startswith("django_redis.")
+
+
+def get(name):
+    return cache.get(PREFIX + name, 0)
+
+
+def snapshot(*names):
+    values = cache.get_many([PREFIX + name for name in names])
+    return {name: values.get(PREFIX + name, 0) for name in names}
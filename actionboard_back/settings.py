@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
@@ -32,6 +33,8 @@ SECRET_KEY = 'django-insecure-*3f@f1$^^m(my!zm_1e@)gx$0*58g$mfc$-&jj&616hb-p$-n$
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = ['*']
 
 
@@ -164,6 +167,17 @@ DATABASES = {
 
 DATABASES['default']['CONN_MAX_AGE'] = 600
 
+# Use Redis (redis://) or Memcached (pymemcache://) in production: webhook
+# dedup keys and counters must be seen by every process, and the Zoom rate
+# limit buckets need an atomic incr (integrations.E001 rejects other caches).
+CACHES = {
+    'default': env.cache("CACHE_URL", default="locmemcache://"),
+}
+
+# Seconds a serialized meeting list page stays cached (it is also dropped
+# as soon as the organisation's meetings change, see meetings.cache).
+MEETING_LIST_CACHE_TIMEOUT = env.int("MEETING_LIST_CACHE_TIMEOUT", default=600)
+
 # DATABASES = {
 #     'default': dj_database_url.config(
 #         default=config("DATABASE_URL"),
@@ -253,6 +267,13 @@ EMAIL_PORT = env.int("EMAIL_PORT", default=587)
 EMAIL_HOST_USER = env("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD")
 
+# Email outbox worker (python manage.py send_emails)
+EMAIL_OUTBOX_MAX_ATTEMPTS = env.int("EMAIL_OUTBOX_MAX_ATTEMPTS", default=6)
+EMAIL_OUTBOX_RETRY_BASE_DELAY = env.int("EMAIL_OUTBOX_RETRY_BASE_DELAY", default=30)  # seconds, doubled per attempt
+EMAIL_OUTBOX_RETRY_MAX_DELAY = env.int("EMAIL_OUTBOX_RETRY_MAX_DELAY", default=3600)
+EMAIL_OUTBOX_LOCK_TIMEOUT = env.int("EMAIL_OUTBOX_LOCK_TIMEOUT", default=300)  # seconds before a claimed email is retried
+EMAIL_OUTBOX_RETENTION = env.int("EMAIL_OUTBOX_RETENTION", default=7 * 24 * 3600)  # seconds sent rows are kept
+
 
 ACCOUNT_USER_MODEL_USERNAME_FIELD = None
 ACCOUNT_EMAIL_REQUIRED = True
@@ -283,9 +304,71 @@ CSRF_TRUSTED_ORIGINS = [
 
 ZOOM_CLIENT_ID = env("ZOOM_CLIENT_ID", default="")
 ZOOM_CLIENT_SECRET = env("ZOOM_CLIENT_SECRET", default="")
+ZOOM_API_BASE_URL = env("ZOOM_API_BASE_URL", default="https://api.zoom.us/v2")
+
+# Refresh OAuth tokens this many seconds before they expire (integrations.tokens)
+OAUTH_TOKEN_REFRESH_SKEW = env.int("OAUTH_TOKEN_REFRESH_SKEW", default=300)
+
+# Past-meeting sync (integrations.zoom_sync)
+ZOOM_SYNC_CONCURRENCY = env.int("ZOOM_SYNC_CONCURRENCY", default=8)  # meetings fetched in parallel, keep <= HTTP_POOL_MAXSIZE
+ZOOM_SYNC_PAGE_SIZE = env.int("ZOOM_SYNC_PAGE_SIZE", default=300)  # Zoom's maximum
+ZOOM_SYNC_WINDOW_DAYS = env.int("ZOOM_SYNC_WINDOW_DAYS", default=7)  # days per from/to window, the checkpoint unit
+ZOOM_SYNC_OVERLAP_HOURS = env.int("ZOOM_SYNC_OVERLAP_HOURS", default=24)  # re-read before the watermark, for late recordings
+
+# Zoom API rate limits per account, requests per second (integrations.rate_limit)
+# Defaults are Zoom's Pro plan limits; Business and up allow 80/60/40.
+ZOOM_RATE_LIMITS = {
+    "light": env.int("ZOOM_RATE_LIMIT_LIGHT", default=30),
+    "medium": env.int("ZOOM_RATE_LIMIT_MEDIUM", default=20),
+    "heavy": env.int("ZOOM_RATE_LIMIT_HEAVY", default=10),
+}
+ZOOM_RATE_LIMIT_MAX_WAIT = env.int("ZOOM_RATE_LIMIT_MAX_WAIT", default=60)  # longest a request queues before failing
+ZOOM_RATE_LIMIT_RETRIES = env.int("ZOOM_RATE_LIMIT_RETRIES", default=3)  # 429s retried after the pause
+# Per-process buckets with locmemcache://: a single process only, i.e. tests or development.
+ZOOM_RATE_LIMIT_ALLOW_LOCAL = env.bool("ZOOM_RATE_LIMIT_ALLOW_LOCAL", default=TESTING)
+
+# Outbound HTTP (integrations.http_client)
+HTTP_CONNECT_TIMEOUT = env.float("HTTP_CONNECT_TIMEOUT", default=5.0)
+HTTP_READ_TIMEOUT = env.float("HTTP_READ_TIMEOUT", default=30.0)
+HTTP_UPLOAD_READ_TIMEOUT = env.float("HTTP_UPLOAD_READ_TIMEOUT", default=300.0)
+HTTP_MAX_RETRIES = env.int("HTTP_MAX_RETRIES", default=3)
+HTTP_BACKOFF_FACTOR = env.float("HTTP_BACKOFF_FACTOR", default=0.5)
+HTTP_BACKOFF_JITTER = env.float("HTTP_BACKOFF_JITTER", default=0.5)
+HTTP_MAX_RETRY_AFTER = env.float("HTTP_MAX_RETRY_AFTER", default=60.0)  # longest Retry-After we'll wait for
+HTTP_POOL_CONNECTIONS = env.int("HTTP_POOL_CONNECTIONS", default=10)
+HTTP_POOL_MAXSIZE = env.int("HTTP_POOL_MAXSIZE", default=20)
 
 
 ASSEMBLYAI_API_KEY = env("ASSEMBLYAI_API_KEY", default="")
+ASSEMBLYAI_ENDPOINT = env("ASSEMBLYAI_ENDPOINT", default="https://api.assemblyai.com/v2")
+
+# Zoom -> AssemblyAI audio relay
+AUDIO_RELAY_CHUNK_SIZE = env.int("AUDIO_RELAY_CHUNK_SIZE", default=1024 * 1024)  # bytes per streamed chunk
+AUDIO_RELAY_SPOOL_MAX_MEMORY = env.int("AUDIO_RELAY_SPOOL_MAX_MEMORY", default=16 * 1024 * 1024)  # fallback spool kept in memory up to this size
+
+# Webhook inbox worker (python manage.py process_webhooks)
+WEBHOOK_MAX_ATTEMPTS = env.int("WEBHOOK_MAX_ATTEMPTS", default=8)
+WEBHOOK_RETRY_BASE_DELAY = env.int("WEBHOOK_RETRY_BASE_DELAY", default=10)  # seconds, doubled per attempt
+WEBHOOK_RETRY_MAX_DELAY = env.int("WEBHOOK_RETRY_MAX_DELAY", default=3600)
+WEBHOOK_LOCK_TIMEOUT = env.int("WEBHOOK_LOCK_TIMEOUT", default=600)  # seconds before a claimed event is retried
+WEBHOOK_DEDUP_TTL = env.int("WEBHOOK_DEDUP_TTL", default=3 * 24 * 3600)  # how long redeliveries are recognised
+
+# Summary stage after transcription: "provider" (AssemblyAI), "local" or "none"
+TRANSCRIPT_SUMMARIZER = env("TRANSCRIPT_SUMMARIZER", default="provider")
+
+# Action item extraction after transcription (transcripts.action_items)
+ACTION_ITEM_EXTRACTORS = env.list("ACTION_ITEM_EXTRACTORS", default=["commitments", "assignments", "summary"])
+ACTION_ITEM_DEFAULT_DUE_DAYS = env.int("ACTION_ITEM_DEFAULT_DUE_DAYS", default=7)  # when no deadline was mentioned
+
+# Action item reminders (python manage.py send_action_item_reminders, run from cron)
+ACTION_ITEM_REMINDER_LEAD_DAYS = env.int("ACTION_ITEM_REMINDER_LEAD_DAYS", default=1)  # remind this many days before the due date
+ACTION_ITEM_REMINDER_LOCK_TIMEOUT = env.int("ACTION_ITEM_REMINDER_LOCK_TIMEOUT", default=3600)  # seconds
+
+# Transcription worker pool (python manage.py run_transcription_workers)
+TRANSCRIPTION_JOB_MAX_ATTEMPTS = env.int("TRANSCRIPTION_JOB_MAX_ATTEMPTS", default=3)
+TRANSCRIPTION_JOB_STALE_AFTER = env.int("TRANSCRIPTION_JOB_STALE_AFTER", default=300)  # seconds without a heartbeat
+TRANSCRIPTION_JOB_RETRY_BASE_DELAY = env.int("TRANSCRIPTION_JOB_RETRY_BASE_DELAY", default=60)  # seconds, doubled per attempt
+TRANSCRIPTION_JOB_RETRY_MAX_DELAY = env.int("TRANSCRIPTION_JOB_RETRY_MAX_DELAY", default=1800)
 
 # Live
 BACKEND_URL = "https://actionboard-backend-cdqe.onrender.com"
@@ -0,0 +1,66 @@
+"""
+Helpers shared by the background workers (webhook inbox, email outbox,
+transcription jobs) and the benchmark commands.
+"""
+import os
+import random
+import signal
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+
+
+def make_worker_id(index=0):
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def retry_delay(attempts, base_delay, max_delay):
+    """
+    Exponential backoff with jitter for the nth failed attempt: base_delay
+    doubled per attempt, capped at max_delay, then scaled by 0.5-1.0.
+    """
+    delay = min(base_delay * 2 ** (attempts - 1), max_delay)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def stop_event():
+    """A threading.Event that SIGTERM and SIGINT set, for worker loops to wait on."""
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    return stop
+
+
+def poll(stop, drain, poll_interval, once=False, on_idle=None):
+    """
+    Call drain() until `stop` is set: straight away again while it finds
+    work, otherwise after on_idle() and poll_interval seconds. With `once`,
+    return the first time drain() finds nothing.
+    """
+    while not stop.is_set():
+        close_old_connections()
+        if drain():
+            continue
+        if on_idle:
+            on_idle()
+        if once:
+            break
+        stop.wait(poll_interval)
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back, for benchmark data."""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
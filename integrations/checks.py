@@ -0,0 +1,11 @@
+from django.core.checks import Error, register
+
+from integrations.rate_limit import backend_error
+
+
+@register()
+def rate_limit_backend_check(app_configs, **kwargs):
+    error = backend_error()
+    if error is None:
+        return []
+    return [Error(error, hint="See integrations.rate_limit.", id="integrations.E001")]
@@ -0,0 +1,172 @@
+"""
+Shared HTTP client for every outbound call to Zoom and AssemblyAI.
+
+All calls go through one requests.Session per process, so connections are
+kept alive and reused from a pool per host instead of paying a TCP+TLS
+handshake on every request. Every request gets the default connect/read
+timeouts unless the caller passes its own, and idempotent requests are
+retried with jittered exponential backoff on connection errors, 429 and
+5xx, waiting for the server's Retry-After when it sends one.
+
+Usage mirrors requests:
+
+    from integrations import http_client
+    response = http_client.get(url, headers=headers)
+
+Pass retries=False for requests whose body can't be replayed (streamed
+uploads), and retry_statuses=SERVER_ERRORS when the caller handles 429s
+itself (the Zoom client's rate limiter).
+
+Async code (fan-out over many meetings or hosts) uses an httpx.AsyncClient
+from async_session() instead, built from the same pool, timeout and retry
+settings. An event loop can't share connections with the threads, so open
+one session per run and pass it to everything in that loop:
+
+    async with http_client.async_session() as session:
+        response = await http_client.async_request(session, "GET", url)
+"""
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SERVER_ERRORS = (500, 502, 503, 504)
+RETRY_STATUSES = (429,) + SERVER_ERRORS
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "PUT", "DELETE", "OPTIONS", "TRACE"))
+
+
+class CappedRetry(Retry):
+    """
+    Retry that honours Retry-After but never sleeps longer than
+    HTTP_MAX_RETRY_AFTER, so a long (e.g. daily) limit can't park a worker.
+    """
+
+    def sleep_for_retry(self, response=None):
+        retry_after = self.get_retry_after(response) if response else None
+        if retry_after:
+            time.sleep(min(retry_after, settings.HTTP_MAX_RETRY_AFTER))
+            return True
+        return False
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout to every request."""
+
+    def __init__(self, *args, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def build_session(retries=True, retry_statuses=RETRY_STATUSES):
+    if retries:
+        max_retries = CappedRetry(
+            total=settings.HTTP_MAX_RETRIES,
+            backoff_factor=settings.HTTP_BACKOFF_FACTOR,
+            backoff_jitter=settings.HTTP_BACKOFF_JITTER,
+            status_forcelist=retry_statuses,
+            respect_retry_after_header=True,
+            # Hand the last response back instead of raising, callers check status codes.
+            raise_on_status=False,
+        )
+    else:
+        max_retries = Retry(total=0, read=False, raise_on_status=False)
+
+    adapter = TimeoutHTTPAdapter(
+        pool_connections=settings.HTTP_POOL_CONNECTIONS,  # number of hosts with a cached pool
+        pool_maxsize=settings.HTTP_POOL_MAXSIZE,  # keep-alive connections per host
+        max_retries=max_retries,
+        timeout=(settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT),
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(retries=True, retry_statuses=RETRY_STATUSES):
+    key = (retries, retry_statuses)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = build_session(retries, retry_statuses)
+    return session
+
+
+def request(method, url, retries=True, retry_statuses=RETRY_STATUSES, **kwargs):
+    return get_session(retries, retry_statuses).request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def async_session():
+    """An httpx.AsyncClient with the same pool, timeouts and connect retries as the session."""
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_POOL_MAXSIZE,
+        max_keepalive_connections=settings.HTTP_POOL_MAXSIZE,
+    )
+    return httpx.AsyncClient(
+        # httpx retries connection failures only; async_request() handles 429/5xx.
+        transport=httpx.AsyncHTTPTransport(retries=settings.HTTP_MAX_RETRIES, limits=limits),
+        timeout=httpx.Timeout(settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+    )
+
+
+def retry_after(response):
+    """Seconds the server asked us to wait, capped at HTTP_MAX_RETRY_AFTER, or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0), settings.HTTP_MAX_RETRY_AFTER)
+
+
+def backoff(attempt):
+    """Jittered exponential backoff before retry number `attempt` (from 1), as urllib3 does it."""
+    return settings.HTTP_BACKOFF_FACTOR * 2 ** (attempt - 1) + random.uniform(0, settings.HTTP_BACKOFF_JITTER)
+
+
+async def async_request(session, method, url, retries=True, retry_statuses=RETRY_STATUSES, **kwargs):
+    """
+    session.request() that retries idempotent requests on `retry_statuses`
+    (429 and 5xx), like the sync session: waiting for Retry-After when
+    sent, backing off otherwise. Returns the last response.
+    """
+    attempts = settings.HTTP_MAX_RETRIES if retries and method.upper() in IDEMPOTENT_METHODS else 0
+    for attempt in range(1, attempts + 2):
+        response = await session.request(method, url, **kwargs)
+        if response.status_code not in retry_statuses or attempt > attempts:
+            return response
+        await response.aclose()
+        wait = retry_after(response)
+        await asyncio.sleep(backoff(attempt) if wait is None else wait)
+    return response
@@ -0,0 +1,96 @@
+import time
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+
+from actionboard_back.utils import rolled_back
+from integrations.management.commands.bench_zoom_sync import FakeZoomServer
+from integrations.models import OAuthToken, ZoomProfile
+from integrations.zoom_sync import refresh_recordings_async, sync_organisation, sync_organisation_async
+from organisations.models import Organisation, OrganisationMembership
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark org-wide Zoom operations against a local fake Zoom API: syncing every "
+        "host one after the other with a thread pool each, versus all hosts at once from "
+        "one event loop, and refetching every recording list. Data is created in a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hosts', type=int, default=10)
+        parser.add_argument('--meetings', type=int, default=100, help="Past meetings per host.")
+        parser.add_argument('--latency', type=float, default=50.0, help="Milliseconds the fake API takes per request.")
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def handle(self, *args, **options):
+        server = FakeZoomServer(options['meetings'], options['latency'] / 1000, users=options['hosts'])
+        server.start()
+        try:
+            # The fake API has no rate limits, so neither does the client.
+            unlimited = {category: 10 ** 6 for category in settings.ZOOM_RATE_LIMITS}
+            with override_settings(ZOOM_API_BASE_URL=server.base_url, ZOOM_RATE_LIMITS=unlimited), rolled_back():
+                self.run(server, options)
+        finally:
+            server.stop()
+
+    def run(self, server, options):
+        suffix = uuid.uuid4().hex[:8]
+        owner = CustomUser.objects.create_user(email=f"bench-{suffix}@example.com", password=None)
+        organisation = Organisation.objects.create(name=f"bench-{suffix}", created_by=owner)
+        for i in range(options['hosts']):
+            user = CustomUser.objects.create_user(email=f"bench-{suffix}-{i}@example.com", password=None)
+            OrganisationMembership.objects.create(user=user, organisation=organisation, role='member')
+            oauth_token = OAuthToken.objects.create(
+                user=user, provider='zoom', access_token="bench", refresh_token="bench",
+                expires_at=timezone.now() + timedelta(days=1),
+            )
+            ZoomProfile.objects.create(
+                user=user, oauth_token=oauth_token, zoom_user_id=f"bench-{suffix}-{i}", zoom_email=user.email,
+            )
+
+        total = options['hosts'] * options['meetings']
+        concurrency = options['concurrency']
+        self.stdout.write(
+            f"{options['hosts']} hosts x {options['meetings']} past meetings, "
+            f"{options['latency']:.0f} ms per API request"
+        )
+        self.stdout.write(f"{'run':<34} {'s':>7} {'requests':>9} {'meetings/s':>11}")
+
+        def timed(name, run, count=total):
+            requests_before = server.requests
+            started = time.perf_counter()
+            with rolled_back():
+                results = run()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{name:<34} {elapsed:>7.2f} {server.requests - requests_before:>9} {count / elapsed:>11.1f}")
+            return results
+
+        timed(
+            f"threads, host by host, {concurrency} each",
+            lambda: list(sync_organisation(organisation, concurrency=concurrency)),
+        )
+        for limit in (concurrency, concurrency * 4):
+            results = timed(
+                f"async, all hosts, {limit} in flight",
+                lambda: async_to_sync(sync_organisation_async)(organisation, concurrency=limit),
+            )
+        failed = [profile.zoom_email for profile, result in results if result is None]
+        if failed:
+            self.stdout.write(f"failed: {', '.join(failed)}")
+
+        # Recording lists need meetings to look up, so sync them for good first.
+        async_to_sync(sync_organisation_async)(organisation, concurrency=concurrency * 4)
+        since = timezone.now() - timedelta(hours=options['meetings'] + 1)
+        for limit in (concurrency, concurrency * 4):
+            timed(
+                f"async recording lists, {limit} in flight",
+                lambda: async_to_sync(refresh_recordings_async)(organisation, since, concurrency=limit),
+            )
@@ -0,0 +1,92 @@
+import time
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+
+from actionboard_back import metrics
+from actionboard_back.utils import rolled_back
+from integrations.management.commands.bench_zoom_sync import FakeZoomServer
+from integrations.models import OAuthToken, ZoomProfile
+from integrations.zoom_sync import organisation_profiles, sync_organisation_async
+from organisations.models import Organisation, OrganisationMembership
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark a Zoom sync against a local fake Zoom API that enforces per-second rate "
+        "limits: without client-side limits (reacting to 429s only) and with the token "
+        "buckets set to the server's limits. Data is created in a transaction that is "
+        "rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hosts', type=int, default=4, help="Hosts of one Zoom account.")
+        parser.add_argument('--meetings', type=int, default=100, help="Past meetings per host.")
+        parser.add_argument('--latency', type=float, default=20.0, help="Milliseconds the fake API takes per request.")
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--light', type=int, default=40, help="Light requests per second the fake API allows.")
+        parser.add_argument('--medium', type=int, default=10, help="Medium requests per second the fake API allows.")
+
+    def handle(self, *args, **options):
+        limits = {"light": options['light'], "medium": options['medium'], "heavy": options['medium']}
+        server = FakeZoomServer(
+            options['meetings'], options['latency'] / 1000, users=options['hosts'], rate_limits=limits,
+        )
+        server.start()
+        try:
+            with override_settings(ZOOM_API_BASE_URL=server.base_url), rolled_back():
+                self.run(server, limits, options)
+        finally:
+            server.stop()
+
+    def run(self, server, limits, options):
+        suffix = uuid.uuid4().hex[:8]
+        owner = CustomUser.objects.create_user(email=f"bench-{suffix}@example.com", password=None)
+        organisation = Organisation.objects.create(name=f"bench-{suffix}", created_by=owner)
+        for i in range(options['hosts']):
+            user = CustomUser.objects.create_user(email=f"bench-{suffix}-{i}@example.com", password=None)
+            OrganisationMembership.objects.create(user=user, organisation=organisation, role='member')
+            oauth_token = OAuthToken.objects.create(
+                user=user, provider='zoom', access_token="bench", refresh_token="bench",
+                expires_at=timezone.now() + timedelta(days=1),
+            )
+            ZoomProfile.objects.create(
+                user=user, oauth_token=oauth_token, zoom_user_id=f"bench-{suffix}-{i}", zoom_email=user.email,
+            )
+        profiles = ZoomProfile.objects.filter(pk__in=organisation_profiles(organisation).values('pk'))
+
+        total = options['hosts'] * options['meetings']
+        # Medium listings per host, then light details and recordings requests per meeting.
+        floor = 2 * total / limits["light"]
+        self.stdout.write(
+            f"{options['hosts']} hosts of one account x {options['meetings']} past meetings, "
+            f"{options['latency']:.0f} ms per API request, limits {limits['light']} light / "
+            f"{limits['medium']} medium per second: about {floor:.1f} s at best"
+        )
+        self.stdout.write(f"{'run':<28} {'s':>7} {'requests':>9} {'429s':>6} {'queued':>7} {'failed':>7} {'meetings/s':>11}")
+
+        def timed(name, client_limits):
+            # A fresh account per run, so buckets paused by an earlier run don't carry over.
+            profiles.update(zoom_account_id=f"bench-{uuid.uuid4().hex[:8]}")
+            requests_before, throttled_before = server.requests, server.throttled
+            queued_before = metrics.snapshot("zoom.rate_limit.queued")["zoom.rate_limit.queued"]
+            started = time.perf_counter()
+            with override_settings(ZOOM_RATE_LIMITS=client_limits), rolled_back():
+                results = async_to_sync(sync_organisation_async)(organisation, concurrency=options['concurrency'])
+            elapsed = time.perf_counter() - started
+            queued = metrics.snapshot("zoom.rate_limit.queued")["zoom.rate_limit.queued"] - queued_before
+            failed = sum(options['meetings'] if result is None else result.failed for _, result in results)
+            self.stdout.write(
+                f"{name:<28} {elapsed:>7.2f} {server.requests - requests_before:>9} "
+                f"{server.throttled - throttled_before:>6} {queued:>7} {failed:>7} {total / elapsed:>11.1f}"
+            )
+
+        unlimited = {category: 10 ** 6 for category in settings.ZOOM_RATE_LIMITS}
+        timed("429s only", unlimited)
+        timed("token buckets", limits)
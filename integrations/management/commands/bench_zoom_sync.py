@@ -0,0 +1,314 @@
+import asyncio
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlparse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+
+from actionboard_back.utils import rolled_back
+from integrations.models import OAuthToken, ZoomProfile
+from integrations.rate_limit import category_for
+from integrations.zoom_client import ZoomAPIClient
+from integrations.zoom_sync import sync_profile
+from organisations.models import Organisation, OrganisationMembership
+from users.models import CustomUser
+
+
+class FakeZoomServer:
+    """
+    A local stand-in for the Zoom endpoints the sync uses, answering every
+    request after `latency` seconds. It runs on its own event loop thread,
+    so thousands of slow requests in flight cost no threads. Every third
+    meeting has no recordings and every seventh no past meeting details
+    (404, as on Zoom for deleted meetings). With `rate_limits`
+    ({category: requests per second}) it answers requests over the limit
+    with a 429 and Retry-After, like Zoom. Every meeting has `participants`
+    people in its participants report, each joining one to three times.
+    """
+
+    def __init__(self, meetings, latency, users=1, rate_limits=None, participants=0):
+        self.meetings = meetings  # per user
+        self.users = users
+        self.participants = participants
+        self.latency = latency
+        self.rate_limits = rate_limits or {}
+        self.requests = 0
+        self.throttled = 0
+        self.counts = {}
+        self.renamed = set()
+        # One meeting an hour, the last one an hour ago.
+        self.epoch = datetime.now(dt_timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=meetings)
+        self.connections = set()
+        self.loop = asyncio.new_event_loop()
+        self.started = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        self.started.wait()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop)
+        self.thread.join()
+        self.loop.close()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(asyncio.start_server(self.serve, '127.0.0.1', 0, backlog=1024))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.started.set()
+        self.loop.run_forever()
+
+    async def shutdown(self):
+        self.server.close()
+        # Hang up on the clients, so every serve() sees EOF and returns.
+        for writer in list(self.connections):
+            writer.close()
+        connections = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        await asyncio.gather(*connections, return_exceptions=True)
+        self.loop.stop()
+
+    async def serve(self, reader, writer):
+        """One keep-alive connection: GET requests without bodies, one after the other."""
+        self.connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                while (await reader.readline()).strip():
+                    pass  # headers
+                self.requests += 1
+                target = request_line.decode().split()[1]
+                headers = self.throttle(urlparse(target).path)
+                if headers:
+                    status, body = 429, {"code": 429, "message": "You have reached the maximum per-second rate limit."}
+                else:
+                    status, body = self.route(target)
+                await asyncio.sleep(self.latency)
+                payload = json.dumps(body).encode()
+                headers = "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: application/json\r\n"
+                    f"{headers}Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    def throttle(self, path):
+        """Count the request against its category's limit this second; the 429 headers when over it."""
+        category = category_for(path)
+        limit = self.rate_limits.get(category)
+        if limit is None:
+            return {}
+        window = (category, int(time.time()))
+        self.counts[window] = self.counts.get(window, 0) + 1
+        if self.counts[window] <= limit:
+            return {}
+        self.throttled += 1
+        return {"Retry-After": "1", "X-RateLimit-Category": category.capitalize(), "X-RateLimit-Type": "QPS"}
+
+    def route(self, target):
+        url = urlparse(target)
+        parts = url.path.strip('/').split('/')
+
+        if len(parts) == 3 and parts[0] == 'users' and parts[2] == 'meetings':
+            query = parse_qs(url.query)
+            size = int(query.get("page_size", ["30"])[0])
+            offset = int(query.get("next_page_token", ["0"])[0])
+            listings = self.listings(parts[1], query.get("from", [None])[0], query.get("to", [None])[0])
+            token = str(offset + size) if offset + size < len(listings) else ""
+            return 200, {"page_size": size, "next_page_token": token, "meetings": listings[offset:offset + size]}
+
+        if len(parts) == 3 and parts[0] == 'past_meetings' and parts[2] == 'participants':
+            n = self.number(parts[1])
+            if n is None:
+                return 404, {"code": 3001, "message": "Meeting does not exist."}
+            query = parse_qs(url.query)
+            size = int(query.get("page_size", ["30"])[0])
+            offset = int(query.get("next_page_token", ["0"])[0])
+            joins = self.joins(n)
+            token = str(offset + size) if offset + size < len(joins) else ""
+            return 200, {
+                "page_size": size, "total_records": len(joins), "next_page_token": token,
+                "participants": joins[offset:offset + size],
+            }
+
+        if len(parts) == 2 and parts[0] == 'past_meetings':
+            n = self.number(parts[1])
+            if n is None or n % 7 == 0:
+                return 404, {"code": 3001, "message": "Meeting does not exist."}
+            end = datetime.strptime(self.listing(n)["start_time"], "%Y-%m-%dT%H:%M:%SZ") + timedelta(minutes=25)
+            return 200, {**self.listing(n), "end_time": end.strftime("%Y-%m-%dT%H:%M:%SZ"), "duration": 25}
+
+        if len(parts) >= 2 and parts[0] == 'meetings':
+            n = self.number(parts[1])
+            if n is None:
+                return 404, {"code": 3001, "message": "Meeting does not exist."}
+            if len(parts) == 3 and parts[2] == 'recordings':
+                if n % 3 == 0:
+                    return 404, {"code": 3301, "message": "There is no recording for this meeting."}
+                return 200, {"recording_files": self.recording_files(n)}
+            return 200, self.listing(n)
+
+        return 404, {"message": "Not found"}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def number(self, meeting_id):
+        """Meeting number from a meeting id or a (URL-encoded) uuid."""
+        match = re.match(r"(?:uuid)?(\d+)", unquote(meeting_id))
+        n = int(match.group(1)) - 10 ** 9 if match else -1
+        return n if 0 <= n < self.meetings * self.users else None
+
+    def listings(self, zoom_user_id, from_date=None, to_date=None):
+        """
+        A user's listed meetings, newest first, that started within the
+        from/to dates. User ids ending in -<n> get the nth block of meetings.
+        """
+        match = re.search(r"-(\d+)$", zoom_user_id)
+        first = (int(match.group(1)) if match else 0) * self.meetings
+        listings = [self.listing(n) for n in reversed(range(first, first + self.meetings))]
+        return [
+            listing for listing in listings
+            if (not from_date or listing["start_time"][:10] >= from_date)
+            and (not to_date or listing["start_time"][:10] <= to_date)
+        ]
+
+    def listing(self, n):
+        start = self.epoch + timedelta(hours=n % self.meetings)
+        return {
+            "uuid": f"uuid{10 ** 9 + n}==",
+            "id": 10 ** 9 + n,
+            "topic": f"Synced meeting {n}" + (" (renamed)" if n in self.renamed else ""),
+            "type": 2,
+            "start_time": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "duration": 30,
+            "join_url": f"https://zoom.us/j/{10 ** 9 + n}",
+        }
+
+    def joins(self, n):
+        """
+        The participants report of meeting n: person p joins p % 3 + 1 times
+        for ten minutes each, the last two overlapping (a second device).
+        Every fifth person is a guest without id or email.
+        """
+        start = self.epoch + timedelta(hours=n % self.meetings)
+        joins = []
+        for p in range(self.participants):
+            guest = p % 5 == 4
+            for segment in range(p % 3 + 1):
+                join_time = start + timedelta(minutes=segment * 10 - (5 if segment == 2 else 0))
+                joins.append({
+                    "id": "" if guest else f"participant-{p}",
+                    "user_id": str(16778240 + len(joins)),
+                    "name": f"Participant {p}",
+                    "user_email": "" if guest else f"participant-{p}@example.com",
+                    "join_time": join_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "leave_time": (join_time + timedelta(minutes=10)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "duration": 600,
+                })
+        return joins
+
+    def recording_files(self, n):
+        start = self.epoch + timedelta(hours=n % self.meetings)
+        return [
+            {
+                "id": f"rec-{n}-{kind}",
+                "recording_type": kind,
+                "file_type": file_type,
+                "file_size": 1024,
+                "play_url": f"https://zoom.us/rec/play/{n}-{kind}",
+                "download_url": f"https://zoom.us/rec/download/{n}-{kind}",
+                "recording_start": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "recording_end": (start + timedelta(minutes=30)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            }
+            for kind, file_type in (("shared_screen_with_speaker_view", "MP4"), ("audio_transcript", "TRANSCRIPT"))
+        ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the past-meeting sync against a local fake Zoom API with per-request "
+        "latency: a sequential and a concurrent backfill, a full re-sync of unchanged "
+        "meetings, and an incremental sync after a few recent meetings changed. Data is "
+        "created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meetings', type=int, default=600)
+        parser.add_argument('--latency', type=float, default=50.0, help="Milliseconds the fake API takes per request.")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--page-size', type=int, default=300)
+        parser.add_argument('--changed', type=int, default=5, help="Recent meetings renamed before the incremental sync.")
+
+    def handle(self, *args, **options):
+        server = FakeZoomServer(options['meetings'], options['latency'] / 1000)
+        server.start()
+        try:
+            # The fake API has no rate limits, so neither does the client.
+            unlimited = {category: 10 ** 6 for category in settings.ZOOM_RATE_LIMITS}
+            with override_settings(ZOOM_API_BASE_URL=server.base_url, ZOOM_RATE_LIMITS=unlimited), rolled_back():
+                self.run(server, options)
+        finally:
+            server.stop()
+
+    def run(self, server, options):
+        suffix = uuid.uuid4().hex[:8]
+        user = CustomUser.objects.create_user(email=f"bench-{suffix}@example.com", password=None)
+        organisation = Organisation.objects.create(name=f"bench-{suffix}", created_by=user)
+        OrganisationMembership.objects.create(user=user, organisation=organisation, role='admin')
+        oauth_token = OAuthToken.objects.create(
+            user=user, provider='zoom', access_token="bench", refresh_token="bench",
+            expires_at=timezone.now() + timedelta(days=1),
+        )
+        profile = ZoomProfile.objects.create(
+            user=user, oauth_token=oauth_token, zoom_user_id=f"bench-{suffix}", zoom_email=user.email,
+        )
+        client = ZoomAPIClient(oauth_token)
+
+        self.stdout.write(f"{options['meetings']} past meetings, {options['latency']:.0f} ms per API request")
+        self.stdout.write(
+            f"{'run':<24} {'s':>7} {'requests':>9} {'read':>6} {'written':>8} {'skipped':>8} {'windows':>8}"
+        )
+
+        def timed(name, concurrency, full=False):
+            requests_before = server.requests
+            started = time.perf_counter()
+            result = sync_profile(
+                profile, organisation, client=client, concurrency=concurrency, page_size=options['page_size'],
+                full=full,
+            )
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{name:<24} {elapsed:>7.2f} {server.requests - requests_before:>9} {result.meetings:>6} "
+                f"{result.created + result.updated:>8} {result.skipped:>8} {result.windows:>8}"
+            )
+            return elapsed
+
+        with rolled_back():
+            timed("backfill, sequential", 1)
+        profile.last_synced_at = None
+        concurrency = options['concurrency']
+        elapsed = timed(f"backfill, {concurrency} workers", concurrency)
+        timed("full re-sync, unchanged", concurrency, full=True)
+
+        server.renamed.update(range(options['meetings'] - options['changed'], options['meetings']))
+        timed("incremental", concurrency)
+
+        per_meeting = elapsed / options['meetings']
+        self.stdout.write(f"projected backfill of 5000 meetings: {per_meeting * 5000 / 60:.1f} min")
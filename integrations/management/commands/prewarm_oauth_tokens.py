@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from actionboard_back import metrics
+from actionboard_back.utils import stop_event
+from integrations.tokens import refresh_due_tokens
+
+
+class Command(BaseCommand):
+    help = "Refresh OAuth tokens that are about to expire, so requests never refresh inline."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--provider', default='zoom')
+        parser.add_argument('--window', type=int, default=15, help="Refresh tokens expiring within this many minutes.")
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--interval', type=int, default=300, help="Seconds between scans.")
+        parser.add_argument('--once', action='store_true', help="Scan once and exit.")
+
+    def handle(self, *args, **options):
+        stop = stop_event()
+
+        while not stop.is_set():
+            close_old_connections()
+            started = time.monotonic()
+            refreshed, failed = refresh_due_tokens(
+                options['window'] * 60,
+                provider=options['provider'],
+                concurrency=options['concurrency'],
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write(
+                f"Refreshed {refreshed} tokens, {failed} failed in {time.monotonic() - started:.1f}s; "
+                + self.format_metrics()
+            )
+            if options['once']:
+                break
+            stop.wait(options['interval'])
+
+    def format_metrics(self):
+        counters = metrics.snapshot(
+            "oauth.prewarm.refresh.count", "oauth.prewarm.refresh.total_ms", "oauth.prewarm.failures",
+        )
+        count = counters["oauth.prewarm.refresh.count"]
+        mean = counters["oauth.prewarm.refresh.total_ms"] / count if count else 0
+        return f"total refreshed {count}, failures {counters['oauth.prewarm.failures']}, mean refresh {mean:.0f}ms"
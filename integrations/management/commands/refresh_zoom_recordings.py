@@ -0,0 +1,33 @@
+import time
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from integrations.zoom_sync import refresh_recordings_async
+from organisations.models import Organisation
+
+
+class Command(BaseCommand):
+    help = "Refetch the recording list of every recent meeting of an organisation, all hosts at once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--org', required=True, help="org_id of the organisation.")
+        parser.add_argument('--days', type=int, default=7, help="Meetings that started within this many days.")
+        parser.add_argument('--concurrency', type=int, default=None, help="Zoom requests in flight overall.")
+
+    def handle(self, *args, **options):
+        organisation = Organisation.objects.filter(org_id=options['org']).first()
+        if not organisation:
+            raise CommandError(f"No organisation with org_id {options['org']}")
+
+        started = time.monotonic()
+        since = timezone.now() - timedelta(days=options['days'])
+        checked, written, failed = async_to_sync(refresh_recordings_async)(
+            organisation, since, concurrency=options['concurrency'],
+        )
+        self.stdout.write(
+            f"Checked {checked} meetings, wrote {written} recordings, {failed} failed "
+            f"in {time.monotonic() - started:.1f}s"
+        )
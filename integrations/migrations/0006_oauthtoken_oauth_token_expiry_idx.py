@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0005_zoomprofile_zoom_account_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='oauthtoken',
+            index=models.Index(fields=['provider', 'expires_at'], name='oauth_token_expiry_idx'),
+        ),
+    ]
@@ -21,6 +21,9 @@ class OAuthToken(models.Model):
 
     class Meta:
         unique_together = ('user', 'provider')
+        indexes = [
+            models.Index(fields=['provider', 'expires_at'], name='oauth_token_expiry_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.provider}"
@@ -0,0 +1,150 @@
+"""
+Client-side rate limiting for the Zoom API.
+
+Zoom limits requests per account and per endpoint category (light, medium,
+heavy). Every request first takes a token from the bucket of its account
+and category. A bucket holds ZOOM_RATE_LIMITS[category] tokens per second
+and is kept in the default cache as one counter per second: a request
+increments the counter of the current second, and when that second is
+full it moves on to the next one and sleeps until it starts. Requests
+over the limit are queued that way instead of failing, for at most
+ZOOM_RATE_LIMIT_MAX_WAIT seconds.
+
+The counters only limit an account as a whole when every process shares
+them through a backend with an atomic incr (Redis, Memcached). Other
+backends fail the integrations.E001 system check, so commands and the
+development server refuse to start with them: the database and file
+caches implement incr as get + set, so concurrent requests overbook a
+second, and a dummy cache never counts. The local-memory cache limits
+each process on its own, which is only right for a single process (tests,
+development), so it needs ZOOM_RATE_LIMIT_ALLOW_LOCAL.
+
+Responses feed back into the bucket: a 429's Retry-After, or
+X-RateLimit-Remaining: 0, pauses the bucket for everyone until the limit
+resets.
+"""
+import asyncio
+import logging
+import math
+import re
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from actionboard_back import metrics
+from integrations import http_client
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "zoom-rate"
+
+# Endpoint categories from Zoom's rate limit table; everything else is light.
+ENDPOINT_CATEGORIES = (
+    (re.compile(r"^/users/[^/]+/meetings$"), "medium"),
+    (re.compile(r"^/users/[^/]+/recordings$"), "medium"),
+    (re.compile(r"^/past_meetings/[^/]+/participants$"), "medium"),
+    (re.compile(r"^/report/"), "heavy"),
+)
+
+
+class RateLimitExceeded(Exception):
+    """The request would have to wait longer than ZOOM_RATE_LIMIT_MAX_WAIT."""
+
+
+def category_for(endpoint):
+    for pattern, category in ENDPOINT_CATEGORIES:
+        if pattern.match(endpoint):
+            return category
+    return "light"
+
+
+def backend_error():
+    """Why the default cache can't hold the buckets, or None when it can."""
+    backend = caches['default']
+    if metrics.has_atomic_incr():
+        return None
+    if isinstance(backend, LocMemCache) and settings.ZOOM_RATE_LIMIT_ALLOW_LOCAL:
+        return None
+    if isinstance(backend, LocMemCache):
+        return (
+            "The local-memory cache limits Zoom requests per process only. Point CACHE_URL at Redis or "
+            "Memcached, or set ZOOM_RATE_LIMIT_ALLOW_LOCAL for a single process."
+        )
+    return (
+        f"{type(backend).__name__} has no atomic incr shared by all processes, so it can't enforce Zoom's "
+        "rate limits. Point CACHE_URL at Redis or Memcached."
+    )
+
+
+class TokenBucket:
+    def __init__(self, account_id, category):
+        self.category = category
+        self.rate = settings.ZOOM_RATE_LIMITS[category]
+        self.key = f"{PREFIX}:{account_id}:{category}"
+
+    def reserve(self, now=None):
+        """
+        Take a token and return how many seconds to wait before using it.
+        Raises RateLimitExceeded when the first free second is too far out.
+        """
+        now = time.time() if now is None else now
+        start = max(now, cache.get(f"{self.key}:paused-until") or 0)
+        for second in range(int(start), int(now + settings.ZOOM_RATE_LIMIT_MAX_WAIT) + 1):
+            key = f"{self.key}:{second}"
+            cache.add(key, 0, timeout=settings.ZOOM_RATE_LIMIT_MAX_WAIT + 2)
+            try:
+                taken = cache.incr(key)
+            except ValueError:
+                # Evicted between add() and incr().
+                cache.set(key, taken := 1, timeout=settings.ZOOM_RATE_LIMIT_MAX_WAIT + 2)
+            if taken <= self.rate:
+                return max(0.0, second - now)
+        metrics.incr("zoom.rate_limit.exceeded")
+        raise RateLimitExceeded(f"Zoom {self.category} rate limit for {self.key} is booked beyond the maximum wait")
+
+    def wait(self):
+        delay = self.reserve()
+        if delay:
+            metrics.incr("zoom.rate_limit.queued")
+            time.sleep(delay)
+
+    async def await_turn(self):
+        delay = await sync_to_async(self.reserve, thread_sensitive=False)()
+        if delay:
+            metrics.incr("zoom.rate_limit.queued")
+            await asyncio.sleep(delay)
+
+    def pause_until(self, until):
+        key = f"{self.key}:paused-until"
+        if until > (cache.get(key) or 0):
+            cache.set(key, until, timeout=math.ceil(until - time.time()) + 1)
+
+    def observe(self, response):
+        """
+        Learn from Zoom's answer: pause the bucket on a 429 until Retry-After,
+        or when X-RateLimit-Remaining says the limit is used up.
+        """
+        now = time.time()
+        if response.status_code == 429:
+            metrics.incr("zoom.rate_limit.throttled")
+            wait = http_client.retry_after(response)
+            self.pause_until(now + (1.0 if wait is None else wait))
+            logger.warning(
+                "Zoom throttled %s (%s, %s), pausing", self.key,
+                response.headers.get("X-RateLimit-Type", "?"), response.headers.get("X-RateLimit-Category", "?"),
+            )
+        elif response.headers.get("X-RateLimit-Remaining") == "0":
+            if "daily" in response.headers.get("X-RateLimit-Type", "").lower():
+                # Daily limits reset at midnight UTC.
+                tomorrow = datetime.now(dt_timezone.utc).date() + timedelta(days=1)
+                self.pause_until(datetime.combine(tomorrow, datetime.min.time(), tzinfo=dt_timezone.utc).timestamp())
+            else:
+                self.pause_until(math.floor(now) + 1)
+
+
+def bucket_for(account_id, endpoint):
+    return TokenBucket(account_id, category_for(endpoint))
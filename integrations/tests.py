@@ -1,3 +1,225 @@
-from django.test import TestCase
+import io
+import json
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from integrations import rate_limit, tokens, zoom_sync
+from integrations.checks import rate_limit_backend_check
+from integrations.models import OAuthToken, ZoomProfile
+from integrations.zoom_client import ZoomAPIClient
+from meetings.models import Meeting
+from organisations.models import Organisation
+from users.models import CustomUser
+
+
+def http_response(status=200, json_body=None, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response.raw = io.BytesIO(json.dumps(json_body or {}).encode())
+    return response
+
+
+class AuthorizedRequestTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="host@example.com", password="pass")
+        self.oauth_token = OAuthToken.objects.create(
+            user=self.user, provider="zoom", access_token="old", refresh_token="refresh",
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        tokens.forget(self.user.pk)
+
+    def sent_tokens(self, request):
+        return [call.kwargs["headers"]["Authorization"] for call in request.call_args_list]
+
+    @mock.patch("integrations.tokens.request_refresh")
+    @mock.patch("integrations.tokens.http_client.request")
+    def test_401_refreshes_the_token_and_retries_once(self, request, request_refresh):
+        request.side_effect = [http_response(401), http_response(200)]
+        request_refresh.return_value = {"access_token": "new", "expires_in": 3600}
+
+        response = tokens.authorized_request(self.user, "GET", "https://api.zoom.us/v2/users/me")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.sent_tokens(request), ["Bearer old", "Bearer new"])
+        self.assertEqual(tokens.get_access_token(self.user), "new")
+        self.assertEqual(tokens._refresh_locks, {})
+
+    @mock.patch("integrations.tokens.request_refresh")
+    @mock.patch("integrations.tokens.http_client.request")
+    def test_401_with_a_token_refreshed_elsewhere_does_not_refresh_again(self, request, request_refresh):
+        tokens.get_access_token(self.user)  # cached "old" in this process
+        OAuthToken.objects.filter(pk=self.oauth_token.pk).update(access_token="rotated")
+        request.side_effect = [http_response(401), http_response(200)]
+
+        tokens.authorized_request(self.user, "GET", "https://api.zoom.us/v2/users/me")
+
+        self.assertEqual(self.sent_tokens(request), ["Bearer old", "Bearer rotated"])
+        request_refresh.assert_not_called()
+
+
+class ZoomMeetingFetchTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="host@example.com", password="pass")
+        self.client = ZoomAPIClient(OAuthToken.objects.create(
+            user=self.user, provider="zoom", access_token="token", refresh_token="refresh",
+            expires_at=timezone.now() + timedelta(hours=1),
+        ))
+        self.listing = {"id": 123, "uuid": "abc==", "topic": "Weekly", "start_time": "2025-06-02T10:00:00Z", "duration": 30}
+
+    @mock.patch("integrations.zoom_sync.connection")  # fetch_meeting() closes its pool thread's connection
+    @mock.patch("integrations.zoom_client.http_client.request")
+    def test_deleted_meeting_is_synced_from_its_listing(self, request, connection):
+        request.return_value = http_response(404, {"code": 3001, "message": "Meeting does not exist."})
+
+        listing, details, files = zoom_sync.fetch_meeting(self.client, self.listing)
+
+        self.assertEqual((details, files), ({}, []))
+        self.assertEqual(request.call_args_list[0].args[1], "https://api.zoom.us/v2/past_meetings/abc%3D%3D")
+
+    def test_listing_of_the_instance_wins_over_details(self):
+        details = {"topic": "Weekly (series)", "start_time": "2025-05-01T10:00:00Z", "end_time": "2025-06-02T10:40:00Z"}
+        grouped = zoom_sync.group_instances([(self.listing, details, [])])
+        data, _ = grouped["123"]
+        self.assertEqual((data["topic"], data["start_time"]), ("Weekly", "2025-06-02T10:00:00Z"))
+        self.assertEqual(data["end_time"], "2025-06-02T10:40:00Z")
+
+
+def http_error(status):
+    return requests.HTTPError(f"{status} error", response=http_response(status))
+
+
+class FakeZoomClient:
+    """One page of listings; get_past_meeting() raises errors[meeting id] if there is one."""
+
+    def __init__(self, listings, errors=None):
+        self.listings = listings
+        self.errors = errors or {}
+
+    def list_past_meetings(self, zoom_user_id, page_size=30, next_page_token=None, from_date=None, to_date=None):
+        return {"meetings": self.listings, "next_page_token": ""}
+
+    def get_past_meeting(self, meeting_uuid):
+        listing = next(listing for listing in self.listings if listing["uuid"] == meeting_uuid)
+        if listing["id"] in self.errors:
+            raise self.errors[listing["id"]]
+        return {"end_time": "2025-06-02T10:30:00Z"}
+
+    def get_meeting_recordings(self, meeting_id):
+        return {"recording_files": []}
+
+
+def zoom_listing(n, topic="Meeting"):
+    return {"id": n, "uuid": f"uuid-{n}", "topic": f"{topic} {n}", "start_time": "2025-06-02T10:00:00Z", "duration": 30}
+
+
+@override_settings(ZOOM_SYNC_OVERLAP_HOURS=24, ZOOM_SYNC_WINDOW_DAYS=7)
+class ZoomSyncTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="host@example.com", password="pass")
+        self.organisation = Organisation.objects.create(name="Org", created_by=self.user)
+        oauth_token = OAuthToken.objects.create(
+            user=self.user, provider="zoom", access_token="token", refresh_token="refresh",
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        self.profile = ZoomProfile.objects.create(
+            user=self.user, oauth_token=oauth_token, zoom_user_id="zoom-user", zoom_email=self.user.email,
+        )
+        self.watermark = datetime(2025, 6, 10, 12, tzinfo=dt_timezone.utc)
+
+    def test_sync_windows_start_an_overlap_before_the_watermark(self):
+        windows = list(zoom_sync.sync_windows(self.watermark, datetime(2025, 6, 20, 8, tzinfo=dt_timezone.utc)))
+        self.assertEqual(windows, [(date(2025, 6, 9), date(2025, 6, 15)), (date(2025, 6, 16), date(2025, 6, 20))])
+
+    def test_advance_watermark(self):
+        self.profile.last_synced_at = self.watermark
+        started_at = datetime(2025, 6, 20, 8, tzinfo=dt_timezone.utc)
+
+        zoom_sync.advance_watermark(self.profile, date(2025, 6, 15), started_at)
+        self.assertEqual(self.profile.last_synced_at, datetime(2025, 6, 16, tzinfo=dt_timezone.utc))
+        # Never backwards (the first window overlaps the old watermark), never past the run's start.
+        zoom_sync.advance_watermark(self.profile, date(2025, 6, 9), started_at)
+        self.assertEqual(self.profile.last_synced_at, datetime(2025, 6, 16, tzinfo=dt_timezone.utc))
+        zoom_sync.advance_watermark(self.profile, date(2025, 6, 20), started_at)
+        self.assertEqual(ZoomProfile.objects.get(pk=self.profile.pk).last_synced_at, started_at)
+
+    def test_unchanged_meetings_are_skipped(self):
+        fetched = [(zoom_listing(1), {}, []), (zoom_listing(2), {}, [])]
+        self.assertEqual(zoom_sync.save_page(self.organisation, self.user, fetched).created, 2)
+
+        with self.assertNumQueries(3):  # savepoint, lookup, release
+            result = zoom_sync.save_page(self.organisation, self.user, fetched)
+        self.assertEqual(result, zoom_sync.PageResult(0, 0, 2, 0))
+
+        fetched[1] = (zoom_listing(2, topic="Renamed"), {}, [])
+        self.assertEqual(zoom_sync.save_page(self.organisation, self.user, fetched), zoom_sync.PageResult(0, 1, 1, 0))
+        self.assertEqual(Meeting.objects.get(meeting_id="2").topic, "Renamed 2")
+
+    def test_refused_meeting_is_synced_from_its_listing_and_the_watermark_moves(self):
+        client = FakeZoomClient([zoom_listing(1), zoom_listing(2)], errors={2: http_error(403)})
+        with self.assertLogs("integrations.zoom_sync", "WARNING"):
+            result = zoom_sync.sync_profile(self.profile, self.organisation, client=client)
+
+        self.assertEqual((result.created, result.failed), (2, 0))
+        self.assertIsNotNone(ZoomProfile.objects.get(pk=self.profile.pk).last_synced_at)
+
+    def test_transient_failure_holds_the_watermark(self):
+        ZoomProfile.objects.filter(pk=self.profile.pk).update(last_synced_at=self.watermark)
+        self.profile.refresh_from_db()
+        client = FakeZoomClient([zoom_listing(1), zoom_listing(2)], errors={2: http_error(503)})
+        with self.assertLogs("integrations.zoom_sync", "WARNING"):
+            result = zoom_sync.sync_profile(self.profile, self.organisation, client=client)
+
+        self.assertEqual((result.created, result.failed), (1, 1))
+        self.assertEqual(ZoomProfile.objects.get(pk=self.profile.pk).last_synced_at, self.watermark)
+
+
+@override_settings(ZOOM_RATE_LIMITS={"light": 2, "medium": 1, "heavy": 1}, ZOOM_RATE_LIMIT_MAX_WAIT=5)
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bucket = rate_limit.TokenBucket("account", "light")
+
+    def test_requests_over_the_rate_wait_for_the_next_second(self):
+        now = 1000.25
+        self.assertEqual([self.bucket.reserve(now) for _ in range(5)], [0.0, 0.0, 0.75, 0.75, 1.75])
+
+    def test_booking_beyond_the_max_wait_raises(self):
+        for _ in range(12):  # seconds 1000 to 1005, two each
+            self.bucket.reserve(1000.0)
+        with self.assertRaises(rate_limit.RateLimitExceeded):
+            self.bucket.reserve(1000.0)
+
+    def test_429_pauses_the_bucket_until_retry_after(self):
+        with self.assertLogs("integrations.rate_limit", "WARNING"):
+            self.bucket.observe(http_response(429, headers={"Retry-After": "3"}))
+        self.assertGreaterEqual(self.bucket.reserve(), 2.0)
+
+    def test_used_up_daily_limit_pauses_until_midnight_utc(self):
+        self.bucket.observe(http_response(200, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Type": "Daily-limit"}))
+        tomorrow = datetime.now(dt_timezone.utc).date() + timedelta(days=1)
+        midnight = datetime.combine(tomorrow, datetime.min.time(), tzinfo=dt_timezone.utc).timestamp()
+        self.assertEqual(cache.get(f"{self.bucket.key}:paused-until"), midnight)
+        with self.assertRaises(rate_limit.RateLimitExceeded):
+            self.bucket.reserve()
+
+    def test_used_up_per_second_limit_pauses_until_the_next_second(self):
+        self.bucket.observe(http_response(200, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Type": "QPS"}))
+        self.assertGreater(self.bucket.reserve(), 0.0)
+
+    def test_caches_without_a_shared_atomic_incr_fail_the_system_check(self):
+        self.assertEqual(rate_limit_backend_check(None), [])
+        with override_settings(ZOOM_RATE_LIMIT_ALLOW_LOCAL=False):
+            [error] = rate_limit_backend_check(None)
+            self.assertEqual(error.id, "integrations.E001")
+            self.assertIn("per process", error.msg)
+        for backend in ("db.DatabaseCache", "filebased.FileBasedCache"):
+            with override_settings(CACHES={"default": {"BACKEND": f"django.core.cache.backends.{backend}", "LOCATION": "c"}}):
+                self.assertIn("no atomic incr", rate_limit_backend_check(None)[0].msg)
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://"}}):
+            self.assertEqual(rate_limit_backend_check(None), [])
@@ -0,0 +1,226 @@
+"""
+One place to get a usable OAuth access token.
+
+Tokens are refreshed ahead of `expires_at` (OAUTH_TOKEN_REFRESH_SKEW
+seconds early) and only one refresh per token is ever in flight: threads
+in a process serialise on a lock per token, and processes serialise on a
+SELECT ... FOR UPDATE of the OAuthToken row. Whoever gets the lock second
+sees the new token and skips its own refresh, so concurrent requests can
+no longer invalidate each other's refresh token.
+
+Valid access tokens are cached in-process, so the common path doesn't
+need an OAuthToken query at all. That cache can go stale when another
+process refreshes the token, so raw calls to Zoom go through
+authorized_request(), which re-reads or refreshes the token on a 401 and
+retries once.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from actionboard_back import metrics
+from integrations import http_client
+from integrations.models import OAuthToken
+
+logger = logging.getLogger(__name__)
+
+ZOOM_TOKEN_URL = "https://zoom.us/oauth/token"
+
+
+class TokenRefreshError(Exception):
+    pass
+
+
+_access_tokens = {}  # (user_id, provider) -> (access_token, expires_at)
+_refresh_locks = {}  # token pk -> [lock, threads holding or waiting for it]
+_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _refresh_lock(token_pk):
+    """
+    Hold the process-wide lock of one token. The entry is dropped once no
+    thread holds or waits for it, so the table doesn't grow with every
+    token ever refreshed.
+    """
+    with _locks_guard:
+        entry = _refresh_locks.setdefault(token_pk, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _refresh_locks[token_pk]
+
+
+def needs_refresh(oauth_token, skew=None):
+    skew = settings.OAUTH_TOKEN_REFRESH_SKEW if skew is None else skew
+    return oauth_token.expires_at <= timezone.now() + timedelta(seconds=skew)
+
+
+def remember(oauth_token):
+    _access_tokens[(oauth_token.user_id, oauth_token.provider)] = (oauth_token.access_token, oauth_token.expires_at)
+
+
+def forget(user_id, provider="zoom"):
+    _access_tokens.pop((user_id, provider), None)
+
+
+def get_token(user, provider="zoom"):
+    """
+    Return the user's OAuthToken, refreshed first if it is about to expire.
+    Raises OAuthToken.DoesNotExist if the provider isn't connected and
+    TokenRefreshError if the refresh fails.
+    """
+    oauth_token = OAuthToken.objects.get(user=user, provider=provider)
+    return ensure_fresh(oauth_token)
+
+
+def get_access_token(user, provider="zoom"):
+    """
+    Like get_token() but returns just the access token, from the in-process
+    cache when it is still valid.
+    """
+    cached = _access_tokens.get((user.pk, provider))
+    if cached and cached[1] > timezone.now() + timedelta(seconds=settings.OAUTH_TOKEN_REFRESH_SKEW):
+        return cached[0]
+    return get_token(user, provider).access_token
+
+
+def reauthorize(user, rejected_access_token, provider="zoom"):
+    """
+    Return a usable access token after the provider rejected
+    `rejected_access_token` with a 401: the one another process already
+    stored, or a new one from a forced refresh.
+    """
+    forget(user.pk, provider)
+    oauth_token = OAuthToken.objects.get(user=user, provider=provider)
+    if oauth_token.access_token == rejected_access_token:
+        refresh_token(oauth_token, force=True)
+    else:
+        remember(oauth_token)
+    return oauth_token.access_token
+
+
+def authorized_request(user, method, url, provider="zoom", **kwargs):
+    """
+    http_client.request() with the user's access token as bearer token,
+    retried once with a fresh token if the first one gets a 401.
+    """
+    headers = kwargs.pop("headers", None) or {}
+    access_token = get_access_token(user, provider)
+    response = http_client.request(method, url, headers={**headers, "Authorization": f"Bearer {access_token}"}, **kwargs)
+    if response.status_code == 401:
+        response.close()
+        access_token = reauthorize(user, access_token, provider)
+        response = http_client.request(
+            method, url, headers={**headers, "Authorization": f"Bearer {access_token}"}, **kwargs,
+        )
+    return response
+
+
+def ensure_fresh(oauth_token):
+    if needs_refresh(oauth_token):
+        return refresh_token(oauth_token)
+    remember(oauth_token)
+    return oauth_token
+
+
+def refresh_token(oauth_token, force=False, skew=None):
+    """
+    Refresh oauth_token in place (single-flight) and return it.
+
+    Without force the refresh is skipped if, once the lock is held, the
+    token turns out to be fresh already (not expiring within skew seconds).
+    With force (e.g. after a 401) it is skipped only if someone else
+    replaced the access token in the meantime.
+    """
+    stale_access_token = oauth_token.access_token
+
+    with _refresh_lock(oauth_token.pk), transaction.atomic():
+        current = OAuthToken.objects.select_for_update().get(pk=oauth_token.pk)
+
+        already_refreshed = (
+            current.access_token != stale_access_token if force else not needs_refresh(current, skew)
+        )
+        if not already_refreshed:
+            token_data = request_refresh(current)
+            current.access_token = token_data["access_token"]
+            current.refresh_token = token_data.get("refresh_token", current.refresh_token)
+            current.expires_at = timezone.now() + timedelta(seconds=token_data["expires_in"])
+            current.save(update_fields=['access_token', 'refresh_token', 'expires_at'])
+
+    oauth_token.access_token = current.access_token
+    oauth_token.refresh_token = current.refresh_token
+    oauth_token.expires_at = current.expires_at
+    remember(oauth_token)
+    return oauth_token
+
+
+def request_refresh(oauth_token):
+    if oauth_token.provider != "zoom":
+        raise TokenRefreshError(f"Token refresh is not supported for {oauth_token.provider}")
+
+    response = http_client.post(
+        ZOOM_TOKEN_URL,
+        data={
+            "grant_type": "refresh_token",
+            "refresh_token": oauth_token.refresh_token,
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        auth=(settings.ZOOM_CLIENT_ID, settings.ZOOM_CLIENT_SECRET),
+    )
+    if response.status_code != 200:
+        forget(oauth_token.user_id, oauth_token.provider)
+        raise TokenRefreshError(f"Failed to refresh {oauth_token.provider} token: {response.status_code}")
+    return response.json()
+
+
+def refresh_due_tokens(window, provider="zoom", concurrency=4, batch_size=50):
+    """
+    Refresh every token of the provider that expires within `window`
+    seconds, `concurrency` at a time and `batch_size` per batch, so user
+    requests find a fresh token instead of refreshing inline.
+    Returns (refreshed, failed).
+    """
+    due_ids = list(
+        OAuthToken.objects
+        .filter(provider=provider, expires_at__lte=timezone.now() + timedelta(seconds=window))
+        .order_by('expires_at')
+        .values_list('pk', flat=True)
+    )
+    refreshed = failed = 0
+
+    def refresh_one(token_pk):
+        started = time.monotonic()
+        try:
+            oauth_token = OAuthToken.objects.get(pk=token_pk)
+            refresh_token(oauth_token, skew=window)
+        except OAuthToken.DoesNotExist:
+            return None  # Disconnected in the meantime.
+        except Exception:
+            logger.exception("Pre-warming token %s failed", token_pk)
+            metrics.incr("oauth.prewarm.failures")
+            return False
+        finally:
+            connection.close()
+        metrics.observe("oauth.prewarm.refresh", time.monotonic() - started)
+        return True
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for start in range(0, len(due_ids), batch_size):
+            for ok in pool.map(refresh_one, due_ids[start:start + batch_size]):
+                refreshed += ok is True
+                failed += ok is False
+
+    return refreshed, failed
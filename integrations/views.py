@@ -5,7 +5,7 @@ from rest_framework.views import APIView
 from django.conf import settings
 from django.utils import timezone
 from django.shortcuts import redirect
-import requests
+from integrations import http_client, tokens
 from django.utils.crypto import get_random_string
 from integrations.models import OAuthToken, ZoomProfile
 from organisations.models import Organisation
@@ -65,7 +65,7 @@ class ZoomOAuthCallbackView(APIView):
             "redirect_uri": redirect_uri,
         }
         
-        response = requests.post(token_url, headers=headers, data=data, auth=auth)
+        response = http_client.post(token_url, headers=headers, data=data, auth=auth)
         if response.status_code != 200:
             return self.redirect_with_error("token_exchange_failed")
         
@@ -90,12 +90,13 @@ class ZoomOAuthCallbackView(APIView):
                 "expires_at": expires_at,
             },
         )
+        tokens.remember(oauth_token)
         
         # Get user info from Zoom
         user_info_url = "https://api.zoom.us/v2/users/me"
         user_info_headers = {"Authorization": f"Bearer {access_token}"}
         
-        user_info_resp = requests.get(user_info_url, headers=user_info_headers)
+        user_info_resp = http_client.get(user_info_url, headers=user_info_headers)
         if user_info_resp.status_code != 200:
             return self.redirect_with_error("zoom_user_fetch_failed")
         
@@ -177,12 +178,13 @@ class ZoomDisconnectView(APIView):
                 }
                 
                 # Try to revoke the token, but don't fail if it doesn't work
-                requests.post(revoke_url, data=revoke_data, headers=revoke_headers)
+                http_client.post(revoke_url, data=revoke_data, headers=revoke_headers)
             except Exception as e:
                 print(f"Warning: Could not revoke Zoom token: {e}")
             
             # Delete the ZoomProfile and OAuth token
             zoom_profile.delete()  # This will cascade delete the oauth_token due to OneToOneField
+            tokens.forget(request.user.id, "zoom")
             
             return Response({
                 "success": True,
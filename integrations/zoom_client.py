@@ -1,63 +1,211 @@
-import requests
-from django.utils import timezone
-from integrations.models import OAuthToken
+import asyncio
+from urllib.parse import quote, urlparse
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
-class ZoomAPIClient:
-    BASE_URL = "https://api.zoom.us/v2"
+from integrations import http_client, rate_limit, tokens
+from integrations.models import OAuthToken, ZoomProfile
 
-    def __init__(self, oauth_token: OAuthToken):
-        self.oauth_token = oauth_token
 
-    def _refresh_access_token(self):
+def encode_uuid(uuid):
+    """
+    Meeting UUIDs go into the path URL-encoded, and twice if they start
+    with "/" or contain "//", as Zoom requires.
+    """
+    encoded = quote(uuid, safe='')
+    if uuid.startswith('/') or '//' in uuid:
+        encoded = quote(encoded, safe='')
+    return encoded
+
+
+class ZoomEndpoints:
+    """
+    The Zoom API calls, shared by the sync and the async client: each
+    returns whatever the client's _make_request() returns, the parsed JSON
+    or a coroutine of it.
+    """
+
+    def list_past_meetings(self, zoom_user_id, page_number=1, page_size=30, next_page_token=None,
+                           from_date=None, to_date=None):
+        endpoint = f"/users/{zoom_user_id}/meetings"
+        params = {
+            "type": "past",
+            "page_size": page_size,
+        }
+        # Optional window of start dates, both inclusive.
+        if from_date:
+            params["from"] = from_date.isoformat()
+        if to_date:
+            params["to"] = to_date.isoformat()
+        # Zoom paginates with next_page_token; page_number is only used for the first page.
+        if next_page_token:
+            params["next_page_token"] = next_page_token
+        else:
+            params["page_number"] = page_number
+        return self._make_request("GET", endpoint, params=params)
+
+    def get_meeting_details(self, meeting_id):
+        endpoint = f"/meetings/{meeting_id}"
+        return self._make_request("GET", endpoint)
+
+    def get_past_meeting(self, meeting_uuid):
         """
-        Refresh the access token using the refresh token.
-        Update the OAuthToken model with new credentials.
+        Details of one ended meeting instance (end_time, actual duration), by
+        instance UUID. Unlike /meetings/{id} this also works for instant
+        meetings; a deleted meeting has no details ({}).
         """
-        token_url = "https://zoom.us/oauth/token"
-        auth = (settings.ZOOM_CLIENT_ID, settings.ZOOM_CLIENT_SECRET)
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": self.oauth_token.refresh_token,
-        }
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        endpoint = f"/past_meetings/{encode_uuid(str(meeting_uuid))}"
+        return self._make_request("GET", endpoint, missing={})
+
+    def get_meeting_recordings(self, meeting_id):
+        """
+        Recordings of a meeting, by id or by instance UUID. A meeting without
+        recordings comes back with an empty recording_files list.
+        """
+        endpoint = f"/meetings/{encode_uuid(str(meeting_id))}/recordings"
+        return self._make_request("GET", endpoint, missing={"recording_files": []})
 
-        response = requests.post(token_url, data=data, headers=headers, auth=auth)
-        if response.status_code != 200:
-            raise Exception("Failed to refresh access token")
+    def get_meeting_participants(self, meeting_uuid, page_size=300, next_page_token=None):
+        """
+        One page of a past meeting instance's participants, one entry per
+        join. Raises HTTPError (404) for a meeting Zoom has no report for.
+        """
+        endpoint = f"/past_meetings/{encode_uuid(str(meeting_uuid))}/participants"
+        params = {"page_size": page_size}
+        if next_page_token:
+            params["next_page_token"] = next_page_token
+        return self._make_request("GET", endpoint, params=params)
 
-        token_data = response.json()
-        self.oauth_token.access_token = token_data["access_token"]
-        self.oauth_token.refresh_token = token_data["refresh_token"]
-        self.oauth_token.expires_at = timezone.now() + timezone.timedelta(seconds=token_data["expires_in"])
-        self.oauth_token.save()
 
-    def _make_request(self, method, endpoint, params=None, data=None):
+class ZoomAPIClient(ZoomEndpoints):
+    """
+    Every request waits for a token of the account's rate limit bucket for
+    its endpoint category (integrations.rate_limit), and a 429 is retried
+    once Zoom's Retry-After has passed, so callers are queued, not failed.
+    Pass the Zoom account id of the token's user so all clients of one
+    account share a bucket; without it the bucket is per user.
+    """
+
+    def __init__(self, oauth_token: OAuthToken, account_id=None):
+        self.oauth_token = oauth_token
+        self.account_id = account_id or f"user-{oauth_token.user_id}"
+
+    @classmethod
+    def for_user(cls, user):
         """
-        Helper to make a request to Zoom API with automatic token refresh.
+        A client with the user's Zoom token, in their account's buckets.
+        Raises OAuthToken.DoesNotExist if the user hasn't connected Zoom.
+        """
+        oauth_token = tokens.get_token(user, provider="zoom")
+        profile = ZoomProfile.objects.filter(oauth_token=oauth_token).only('zoom_account_id').first()
+        return cls(oauth_token, profile.zoom_account_id if profile else None)
+
+    def _refresh_access_token(self, force=False):
+        """
+        Refresh the access token through the shared token service, which
+        makes sure only one refresh per token is in flight.
         """
-        headers = {"Authorization": f"Bearer {self.oauth_token.access_token}"}
-        url = f"{self.BASE_URL}{endpoint}"
+        tokens.refresh_token(self.oauth_token, force=force)
 
-        response = requests.request(method, url, headers=headers, params=params, json=data)
+    def _send(self, method, url, bucket, params, data):
+        for _ in range(settings.ZOOM_RATE_LIMIT_RETRIES + 1):
+            bucket.wait()
+            response = http_client.request(
+                method, url, retry_statuses=http_client.SERVER_ERRORS,
+                headers={"Authorization": f"Bearer {self.oauth_token.access_token}"}, params=params, json=data,
+            )
+            bucket.observe(response)
+            if response.status_code != 429:
+                break
+        return response
+
+    def _request(self, method, url, bucket, params=None, data=None):
+        tokens.ensure_fresh(self.oauth_token)
+        response = self._send(method, url, bucket, params, data)
         if response.status_code == 401:
-            # Token expired, refresh and retry once
-            self._refresh_access_token()
-            headers["Authorization"] = f"Bearer {self.oauth_token.access_token}"
-            response = requests.request(method, url, headers=headers, params=params, json=data)
+            # Token rejected early (revoked/rotated), refresh and retry once
+            self._refresh_access_token(force=True)
+            response = self._send(method, url, bucket, params, data)
+        return response
+
+    def download(self, url):
+        """
+        GET a file Zoom links to (a recording's or transcript's download_url)
+        with the same bucket, token refresh and 401 retry as the API calls.
+        Returns the response for the caller to check.
+        """
+        return self._request("GET", url, rate_limit.bucket_for(self.account_id, urlparse(url).path))
+
+    def _make_request(self, method, endpoint, params=None, data=None, missing=None):
+        """
+        Helper to make a request to Zoom API with automatic token refresh.
+        Returns `missing` on 404 when it is given.
+        """
+        url = f"{settings.ZOOM_API_BASE_URL}{endpoint}"
+        response = self._request(method, url, rate_limit.bucket_for(self.account_id, endpoint), params, data)
 
+        if response.status_code == 404 and missing is not None:
+            return missing
         response.raise_for_status()
         return response.json()
 
-    def list_past_meetings(self, zoom_user_id, page_number=1, page_size=30):
-        endpoint = f"/users/{zoom_user_id}/meetings"
-        params = {
-            "type": "past",
-            "page_size": page_size,
-            "page_number": page_number
-        }
-        return self._make_request("GET", endpoint, params=params)
 
-    def get_meeting_details(self, meeting_id):
-        endpoint = f"/meetings/{meeting_id}"
-        return self._make_request("GET", endpoint)
+class AsyncZoomAPIClient(ZoomEndpoints):
+    """
+    ZoomAPIClient for an event loop: the same calls, awaited. Clients of
+    one run share an httpx session (http_client.async_session()) and a
+    semaphore that caps the requests in flight across all of them.
+    Requests are rate limited per account like ZoomAPIClient's.
+    """
+
+    def __init__(self, oauth_token: OAuthToken, session, semaphore=None, account_id=None):
+        self.oauth_token = oauth_token
+        self.account_id = account_id or f"user-{oauth_token.user_id}"
+        self.session = session
+        self.semaphore = semaphore or asyncio.Semaphore(settings.ZOOM_SYNC_CONCURRENCY)
+        self._refresh_lock = asyncio.Lock()
+
+    async def _refresh_access_token(self, force=False):
+        """
+        Refresh through the token service on a worker thread, since it locks
+        the OAuthToken row. Requests of this client that need a refresh at
+        the same time wait for the first one instead of refreshing again.
+        """
+        stale_access_token = self.oauth_token.access_token
+        async with self._refresh_lock:
+            if self.oauth_token.access_token != stale_access_token:
+                return
+            if force or tokens.needs_refresh(self.oauth_token):
+                await sync_to_async(tokens.refresh_token)(self.oauth_token, force=force)
+
+    async def _send(self, method, url, bucket, params, data):
+        for _ in range(settings.ZOOM_RATE_LIMIT_RETRIES + 1):
+            # Queue for the bucket before taking a slot of the semaphore.
+            await bucket.await_turn()
+            async with self.semaphore:
+                response = await http_client.async_request(
+                    self.session, method, url, retry_statuses=http_client.SERVER_ERRORS,
+                    headers={"Authorization": f"Bearer {self.oauth_token.access_token}"}, params=params, json=data,
+                )
+            bucket.observe(response)
+            if response.status_code != 429:
+                break
+        return response
+
+    async def _make_request(self, method, endpoint, params=None, data=None, missing=None):
+        if tokens.needs_refresh(self.oauth_token):
+            await self._refresh_access_token()
+        url = f"{settings.ZOOM_API_BASE_URL}{endpoint}"
+        bucket = rate_limit.bucket_for(self.account_id, endpoint)
+
+        response = await self._send(method, url, bucket, params, data)
+        if response.status_code == 401:
+            # Token rejected early (revoked/rotated), refresh and retry once
+            await self._refresh_access_token(force=True)
+            response = await self._send(method, url, bucket, params, data)
+
+        if response.status_code == 404 and missing is not None:
+            return missing
+        response.raise_for_status()
+        return response.json()
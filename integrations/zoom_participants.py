@@ -0,0 +1,90 @@
+"""
+Attendees of ended Zoom meetings, from the past-meeting participants report.
+
+ingest_participants() runs for the meeting.participants inbox event that
+meeting.ended queues (meetings.webhooks): it pages through the report
+of the meeting instance with next_page_token, merges every person's
+join/leave segments into one MeetingAttendee and replaces the meeting's
+attendees in one transaction, a handful of queries however large the
+meeting or webinar.
+"""
+import logging
+
+import requests
+from django.conf import settings
+from django.db import transaction
+
+from actionboard_back import metrics
+from integrations.models import ZoomProfile
+from integrations.zoom_client import ZoomAPIClient
+from meetings.models import MeetingAttendee
+
+logger = logging.getLogger(__name__)
+
+
+class ParticipantsNotReady(Exception):
+    """Zoom hasn't published the participants report of the meeting yet."""
+
+
+def report_unavailable(error):
+    """
+    Whether a failed participants request means the meeting will never have
+    a report: Zoom answers 404 for meetings it keeps no report of, and 400
+    "... not available" for reports outside the account's plan or retention.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return False
+    if response.status_code == 404:
+        return True
+    if response.status_code == 400:
+        try:
+            message = response.json().get("message") or ""
+        except ValueError:
+            message = ""
+        return "available" in message.lower()
+    return False
+
+
+def fetch_participants(client, meeting_uuid, page_size=None):
+    """Every join listed in the participants report of a past meeting instance."""
+    participants, token = [], None
+    while True:
+        page = client.get_meeting_participants(
+            meeting_uuid, page_size=page_size or settings.ZOOM_SYNC_PAGE_SIZE, next_page_token=token,
+        )
+        participants.extend(page.get("participants") or [])
+        token = page.get("next_page_token")
+        if not token:
+            return participants
+
+
+def ingest_participants(meeting, meeting_uuid, client=None):
+    """
+    Replace the attendees of `meeting` with the participants report of its
+    instance `meeting_uuid`, read with the host's token. Returns the number
+    of attendees, 0 if Zoom has no report for the meeting. Raises
+    ParticipantsNotReady while the report is empty, so the webhook inbox
+    retries later.
+    """
+    if client is None:
+        profile = ZoomProfile.objects.select_related('oauth_token').filter(user_id=meeting.host_id).first()
+        if profile is None:
+            logger.warning("Zoom not connected for the host of meeting %s", meeting.meeting_id)
+            return 0
+        client = ZoomAPIClient(profile.oauth_token, profile.zoom_account_id)
+
+    try:
+        participants = fetch_participants(client, meeting_uuid)
+    except requests.HTTPError as e:
+        if not report_unavailable(e):
+            raise
+        logger.info("No participants report for Zoom meeting %s: %s", meeting_uuid, e)
+        return 0
+    if not participants:
+        raise ParticipantsNotReady(f"No participants report for Zoom meeting {meeting_uuid} yet")
+
+    with transaction.atomic():
+        attendees = MeetingAttendee.objects.replace_from_zoom(meeting, participants)
+    metrics.incr("zoom.participants.ingested", len(attendees))
+    return len(attendees)
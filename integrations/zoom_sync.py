@@ -0,0 +1,446 @@
+"""
+Bulk and incremental sync of past Zoom meetings into Meeting and Recording.
+
+sync_profile() walks a host's past meetings page by page with
+next_page_token. The meetings of a page are fetched (details and
+recordings) by a pool of ZOOM_SYNC_CONCURRENCY threads over the shared
+HTTP session, while the main thread already lists the next page. Each page
+is then written in one transaction with a constant number of queries: one
+lookup, one bulk insert, one bulk update and one recording upsert.
+
+ZoomProfile.last_synced_at is the watermark. The first sync (or a full
+one) reads everything; later syncs only list meetings that started since
+the watermark, minus ZOOM_SYNC_OVERLAP_HOURS for recordings that finish
+processing late, in from/to windows of ZOOM_SYNC_WINDOW_DAYS. The
+watermark moves forward after every window that synced without transient
+failures (connection errors, 429, 5xx), so an interrupted run resumes from
+the last completed window. A meeting Zoom refuses for good (any other 4xx)
+is synced from its listing alone and doesn't hold the watermark back.
+
+Every synced row keeps a hash of the Zoom data it was written from;
+meetings whose data hasn't changed are skipped without a write.
+
+sync_organisation_async() runs the same sync for every host of an
+organisation at once from one event loop, with AsyncZoomAPIClient and a
+single semaphore over all hosts' requests; refresh_recordings_async()
+refetches the recording lists of an organisation's recent meetings the
+same way.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from actionboard_back import metrics
+from integrations import http_client
+from integrations.models import ZoomProfile
+from integrations.zoom_client import AsyncZoomAPIClient, ZoomAPIClient
+from meetings.models import Meeting, Recording
+from meetings.signals import invalidate_meeting_list
+
+logger = logging.getLogger(__name__)
+
+SyncResult = namedtuple('SyncResult', 'windows pages meetings created updated skipped recordings failed')
+PageResult = namedtuple('PageResult', 'created updated skipped recordings')
+NO_RESULTS = SyncResult(0, 0, 0, 0, 0, 0, 0, 0)
+
+MEETING_UPDATE_FIELDS = [
+    'host', 'topic', 'start_time', 'end_time', 'duration', 'status', 'join_url', 'video_url', 'recording_ready',
+    'sync_hash', 'updated_at',
+]
+HASHED_MEETING_KEYS = ('topic', 'start_time', 'end_time', 'duration', 'join_url')
+HASHED_RECORDING_KEYS = ('id', 'file_type', 'file_size', 'play_url', 'download_url', 'recording_start', 'recording_end')
+# Errors worth retrying in a later run; with any other 4xx Zoom won't ever give us the meeting.
+TRANSIENT_STATUSES = (401, 408, 429)
+
+
+def is_transient(error):
+    """Whether a failed Zoom request (requests or httpx) may succeed later."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return True  # no response at all: connection error, timeout
+    return response.status_code in TRANSIENT_STATUSES or response.status_code >= 500
+
+
+def fetch_failed(listing, error):
+    """
+    What fetching a listed meeting gives after `error`: None (a failure
+    that holds the watermark) when it may work next time, otherwise the
+    listing alone.
+    """
+    if is_transient(error):
+        logger.warning("Fetching Zoom meeting %s failed: %s", listing.get("id"), error)
+        return None
+    logger.warning("Zoom refused meeting %s, syncing it from its listing: %s", listing.get("id"), error)
+    return listing, {}, []
+
+
+def fetch_meeting(client, listing):
+    """
+    Instance details and recording files of one listed meeting. Details or
+    recordings Zoom no longer has (404) come back empty, and None means a
+    transient failure (see fetch_failed()). Runs in a pool thread.
+    """
+    try:
+        details = client.get_past_meeting(listing.get("uuid") or listing["id"])
+        recordings = client.get_meeting_recordings(listing.get("uuid") or listing["id"])
+    except requests.RequestException as e:
+        return fetch_failed(listing, e)
+    finally:
+        # A token refresh may have opened a database connection in this thread.
+        connection.close()
+    return listing, details, recordings.get("recording_files") or []
+
+
+def sync_hash(data, recording_files):
+    """Hash of everything the sync copies from Zoom into a meeting and its recordings."""
+    meeting = [data.get(key) for key in HASHED_MEETING_KEYS]
+    recordings = sorted([rec.get(key) for key in HASHED_RECORDING_KEYS] for rec in recording_files)
+    return hashlib.sha1(json.dumps([meeting, recordings], default=str).encode()).hexdigest()
+
+
+def apply_zoom_meeting(meeting, data, recording_files):
+    meeting.topic = (data.get("topic") or "")[:255]
+    meeting.start_time = parse_datetime(data["start_time"])
+    if data.get("end_time"):
+        meeting.end_time = parse_datetime(data["end_time"])
+    meeting.duration = data.get("duration", meeting.duration)
+    meeting.status = 'ended'
+    meeting.join_url = data.get("join_url") or meeting.join_url
+    video_url = next((rec.get("play_url") for rec in recording_files if rec.get("file_type") == "MP4"), None)
+    meeting.video_url = video_url or meeting.video_url
+    meeting.recording_ready = meeting.recording_ready or bool(recording_files)
+
+
+def group_instances(fetched):
+    """
+    Instances of a recurring meeting share its id. Returns {meeting_id:
+    (data of the latest instance, recording files of all instances)}. The
+    listing describes the instance, so its fields win over the details.
+    """
+    grouped = {}
+    for listing, details, files in sorted(fetched, key=lambda f: f[0].get("start_time") or ""):
+        data = {**details, **listing}
+        if not data.get("start_time"):
+            continue
+        meeting_id = str(listing["id"])
+        grouped[meeting_id] = (data, grouped.get(meeting_id, (None, []))[1] + files)
+    return grouped
+
+
+@transaction.atomic
+def save_page(organisation, host, fetched):
+    """
+    Upsert one page of fetched meetings, skipping the ones whose Zoom data
+    is unchanged since they were last synced. Returns a PageResult.
+    """
+    grouped = group_instances(fetched)
+    existing = {}
+    for meeting in Meeting.objects.filter(organisation=organisation, meeting_id__in=grouped.keys()):
+        existing.setdefault(meeting.meeting_id, meeting)
+
+    now = timezone.now()
+    created, updated, recordings = [], [], []
+    for meeting_id, (data, files) in grouped.items():
+        digest = sync_hash(data, files)
+        meeting = existing.get(meeting_id)
+        if meeting and meeting.sync_hash == digest and meeting.host_id == host.pk:
+            continue
+        if meeting is None:
+            meeting = Meeting(organisation=organisation, meeting_id=meeting_id)
+            created.append(meeting)
+        else:
+            updated.append(meeting)
+        meeting.host = host
+        apply_zoom_meeting(meeting, data, files)
+        meeting.sync_hash = digest
+        meeting.updated_at = now  # bulk_update doesn't touch auto_now fields.
+        recordings.append((meeting, files))
+
+    Meeting.objects.bulk_create(created, batch_size=500)
+    Meeting.objects.bulk_update(updated, MEETING_UPDATE_FIELDS, batch_size=500)
+    written = Recording.objects.upsert([
+        recording for meeting, files in recordings for recording in Recording.objects.from_zoom(meeting, files)
+    ])
+
+    if created or updated:
+        # Bulk writes send no signals, so invalidate the cached meeting list here.
+        invalidate_meeting_list(organisation.pk)
+    return PageResult(len(created), len(updated), len(grouped) - len(created) - len(updated), len(written))
+
+
+def sync_windows(watermark, now):
+    """
+    (from, to) date windows, both inclusive and in UTC like Zoom's, from
+    the watermark minus the overlap up to today.
+    """
+    start = (watermark - timedelta(hours=settings.ZOOM_SYNC_OVERLAP_HOURS)).astimezone(dt_timezone.utc).date()
+    end = now.astimezone(dt_timezone.utc).date()
+    while start <= end:
+        window_end = min(start + timedelta(days=settings.ZOOM_SYNC_WINDOW_DAYS - 1), end)
+        yield start, window_end
+        start = window_end + timedelta(days=1)
+
+
+def page_totals(listings, fetched, page_result):
+    """SyncResult of one page: its listings, what could be fetched and what was saved."""
+    ok = sum(1 for f in fetched if f is not None)
+    return SyncResult(
+        0, 1, len(listings), page_result.created, page_result.updated, page_result.skipped,
+        page_result.recordings, len(fetched) - ok,
+    )
+
+
+def add_results(total, result):
+    return SyncResult(*(a + b for a, b in zip(total, result)))
+
+
+def plan_windows(profile, started_at, full):
+    if full or profile.last_synced_at is None:
+        return [(None, None)]
+    return list(sync_windows(profile.last_synced_at, started_at))
+
+
+def advance_watermark(profile, to_date, started_at):
+    """Move the profile's watermark past a window that synced without failures."""
+    if to_date is None:
+        watermark = started_at
+    else:
+        day_after = datetime.combine(to_date + timedelta(days=1), dt_time.min, tzinfo=dt_timezone.utc)
+        watermark = max(min(day_after, started_at), profile.last_synced_at)
+    ZoomProfile.objects.filter(pk=profile.pk).update(last_synced_at=watermark)
+    profile.last_synced_at = watermark
+
+
+def report(profile, windows, totals, elapsed):
+    metrics.incr("zoom_sync.meetings", totals.meetings)
+    metrics.incr("zoom_sync.written", totals.created + totals.updated)
+    metrics.incr("zoom_sync.skipped", totals.skipped)
+    metrics.incr("zoom_sync.failed", totals.failed)
+    metrics.observe("zoom_sync.profile", elapsed)
+    logger.info(
+        "Synced %s of %s in %d windows, %d pages: %d read, %d new, %d updated, %d unchanged, "
+        "%d recordings, %d failed",
+        "all past meetings" if windows == [(None, None)] else f"past meetings since {windows[0][0]}",
+        profile.zoom_email, totals.windows, totals.pages, totals.meetings, totals.created, totals.updated,
+        totals.skipped, totals.recordings, totals.failed,
+    )
+
+
+def sync_window(client, pool, profile, organisation, page_size, from_date=None, to_date=None):
+    """
+    Sync the past meetings that started between from_date and to_date, or
+    all of them without a window. Returns a SyncResult for the window.
+    """
+    def list_page(token=None):
+        return client.list_past_meetings(
+            profile.zoom_user_id, page_size=page_size, next_page_token=token, from_date=from_date, to_date=to_date,
+        )
+
+    totals = NO_RESULTS._replace(windows=1)
+    page = list_page()
+    while page:
+        listings = page.get("meetings") or []
+        futures = [pool.submit(fetch_meeting, client, listing) for listing in listings]
+
+        # List the next page while the pool fetches this one.
+        token = page.get("next_page_token")
+        next_page = list_page(token) if token else None
+
+        fetched = [future.result() for future in futures]
+        result = save_page(organisation, profile.user, [f for f in fetched if f is not None])
+        totals = add_results(totals, page_totals(listings, fetched, result))
+        page = next_page
+    return totals
+
+
+def sync_profile(profile, organisation, client=None, concurrency=None, page_size=None, full=False):
+    """
+    Sync the past meetings of the profile's Zoom user into `organisation`:
+    everything when `full` or on the first sync, otherwise only the
+    windows since the watermark. Returns a SyncResult.
+    """
+    client = client or ZoomAPIClient(profile.oauth_token, profile.zoom_account_id)
+    concurrency = concurrency or settings.ZOOM_SYNC_CONCURRENCY
+    page_size = page_size or settings.ZOOM_SYNC_PAGE_SIZE
+    started_at, started = timezone.now(), time.monotonic()
+    windows = plan_windows(profile, started_at, full)
+
+    totals = NO_RESULTS
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for from_date, to_date in windows:
+            result = sync_window(client, pool, profile, organisation, page_size, from_date, to_date)
+            totals = add_results(totals, result)
+            if result.failed:
+                # Only transient failures count; keep the watermark here so
+                # the next run retries from this window.
+                break
+            advance_watermark(profile, to_date, started_at)
+
+    report(profile, windows, totals, time.monotonic() - started)
+    return totals
+
+
+def organisation_profiles(organisation):
+    return (
+        ZoomProfile.objects
+        .filter(user__memberships__organisation=organisation)
+        .select_related('user', 'oauth_token')
+        .order_by('pk')
+    )
+
+
+def sync_organisation(organisation, **kwargs):
+    """
+    Sync the past meetings of every member of `organisation` who connected
+    Zoom, one after the other. Yields (profile, SyncResult), or (profile,
+    None) when the sync of that profile failed.
+    """
+    for profile in organisation_profiles(organisation):
+        try:
+            yield profile, sync_profile(profile, organisation, **kwargs)
+        except Exception:
+            logger.exception("Syncing Zoom meetings of %s failed", profile.zoom_email)
+            yield profile, None
+
+
+# The same sync on an event loop, for org-wide runs: every host is synced at
+# once, and a single semaphore caps the requests in flight across all of
+# them. Database work runs on a worker thread through sync_to_async.
+
+async def fetch_meeting_async(client, listing):
+    try:
+        details, recordings = await asyncio.gather(
+            client.get_past_meeting(listing.get("uuid") or listing["id"]),
+            client.get_meeting_recordings(listing.get("uuid") or listing["id"]),
+        )
+    except httpx.HTTPError as e:
+        return fetch_failed(listing, e)
+    return listing, details, recordings.get("recording_files") or []
+
+
+async def sync_window_async(client, profile, organisation, page_size, from_date=None, to_date=None):
+    def list_page(token=None):
+        return client.list_past_meetings(
+            profile.zoom_user_id, page_size=page_size, next_page_token=token, from_date=from_date, to_date=to_date,
+        )
+
+    totals = NO_RESULTS._replace(windows=1)
+    page = await list_page()
+    while page:
+        listings = page.get("meetings") or []
+        token = page.get("next_page_token")
+        # List the next page while this one's meetings are fetched.
+        next_page = asyncio.ensure_future(list_page(token)) if token else None
+        fetched = await asyncio.gather(*(fetch_meeting_async(client, listing) for listing in listings))
+        result = await sync_to_async(save_page)(organisation, profile.user, [f for f in fetched if f is not None])
+        totals = add_results(totals, page_totals(listings, fetched, result))
+        page = await next_page if next_page else None
+    return totals
+
+
+async def sync_profile_async(profile, organisation, client, page_size=None, full=False):
+    """sync_profile() with an AsyncZoomAPIClient."""
+    page_size = page_size or settings.ZOOM_SYNC_PAGE_SIZE
+    started_at, started = timezone.now(), time.monotonic()
+    windows = plan_windows(profile, started_at, full)
+
+    totals = NO_RESULTS
+    for from_date, to_date in windows:
+        result = await sync_window_async(client, profile, organisation, page_size, from_date, to_date)
+        totals = add_results(totals, result)
+        if result.failed:
+            break
+        await sync_to_async(advance_watermark)(profile, to_date, started_at)
+
+    report(profile, windows, totals, time.monotonic() - started)
+    return totals
+
+
+async def sync_organisation_async(organisation, concurrency=None, page_size=None, full=False):
+    """
+    Sync every member of `organisation` who connected Zoom at the same time,
+    with at most `concurrency` Zoom requests in flight overall. Returns
+    [(profile, SyncResult or None when that profile failed)].
+    """
+    profiles = await sync_to_async(list)(organisation_profiles(organisation))
+    semaphore = asyncio.Semaphore(concurrency or settings.ZOOM_SYNC_CONCURRENCY)
+
+    async with http_client.async_session() as session:
+        async def sync_one(profile):
+            client = AsyncZoomAPIClient(profile.oauth_token, session, semaphore, profile.zoom_account_id)
+            try:
+                return await sync_profile_async(profile, organisation, client, page_size=page_size, full=full)
+            except Exception:
+                logger.exception("Syncing Zoom meetings of %s failed", profile.zoom_email)
+                return None
+
+        results = await asyncio.gather(*(sync_one(profile) for profile in profiles))
+    return list(zip(profiles, results))
+
+
+@transaction.atomic
+def save_recordings(meetings, recording_lists):
+    """Upsert the fetched recording lists of `meetings` and flag the meetings that have some."""
+    recordings = [
+        recording
+        for meeting, files in zip(meetings, recording_lists)
+        for recording in Recording.objects.from_zoom(meeting, files)
+    ]
+    written = Recording.objects.upsert(recordings)
+    ready = [meeting.pk for meeting, files in zip(meetings, recording_lists) if files and not meeting.recording_ready]
+    Meeting.objects.filter(pk__in=ready).update(recording_ready=True, updated_at=timezone.now())
+    if written or ready:
+        for organisation_id in {meeting.organisation_id for meeting in meetings}:
+            invalidate_meeting_list(organisation_id)
+    return len(written)
+
+
+async def refresh_recordings_async(organisation, since, concurrency=None):
+    """
+    Fetch the recording list of every meeting of `organisation` that
+    started since `since`, each with its host's token, all from one event
+    loop. Returns (meetings checked, recordings written, failed).
+    """
+    profiles = await sync_to_async(list)(organisation_profiles(organisation))
+    meetings = await sync_to_async(list)(
+        Meeting.objects.filter(
+            organisation=organisation,
+            start_time__gte=since,
+            meeting_id__isnull=False,
+            host_id__in=[profile.user_id for profile in profiles],
+        )
+    )
+    semaphore = asyncio.Semaphore(concurrency or settings.ZOOM_SYNC_CONCURRENCY)
+
+    async with http_client.async_session() as session:
+        clients = {
+            profile.user_id: AsyncZoomAPIClient(profile.oauth_token, session, semaphore, profile.zoom_account_id)
+            for profile in profiles
+        }
+
+        async def recording_files(meeting):
+            try:
+                result = await clients[meeting.host_id].get_meeting_recordings(meeting.meeting_id)
+            except httpx.HTTPError as e:
+                logger.warning("Fetching recordings of Zoom meeting %s failed: %s", meeting.meeting_id, e)
+                return None
+            return result.get("recording_files") or []
+
+        recording_lists = await asyncio.gather(*(recording_files(meeting) for meeting in meetings))
+
+    fetched = [(meeting, files) for meeting, files in zip(meetings, recording_lists) if files is not None]
+    written = await sync_to_async(save_recordings)([m for m, _ in fetched], [files for _, files in fetched])
+    return len(meetings), written, len(meetings) - len(fetched)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Meeting, MeetingAttendee, Recording
+from .models import Meeting, MeetingAttendee, Recording, WebhookEvent
 
 @admin.register(Meeting)
 class MeetingAdmin(admin.ModelAdmin):
@@ -17,4 +17,11 @@ class RecordingAdmin(admin.ModelAdmin):
 class MeetingAttendeeAdmin(admin.ModelAdmin):
     list_display = ('meeting', 'name', 'email', 'duration')
     list_filter = ('meeting',)
-    search_fields = ('name', 'email', 'meeting__title')
+    search_fields = ('name', 'email', 'meeting__topic')
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'provider', 'event', 'status', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('provider', 'event', 'status')
+    readonly_fields = ('received_at', 'processed_at', 'locked_by', 'locked_at')
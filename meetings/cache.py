@@ -0,0 +1,86 @@
+"""
+Versioned cache for the per-organisation meeting list.
+
+Every organisation has a generation counter in the cache. Serialized list
+pages are stored under a key that includes the current generation, and any
+change to the organisation's meetings or recordings bumps the generation
+(see meetings.signals), so stale pages are never read again and simply
+expire. The generation also makes up the ETag, which lets an unchanged poll
+be answered with 304 before any meeting query runs.
+
+Meetings are changed by other processes too (webhook workers, the Zoom
+sync), so pages and ETags are only used when the default cache is shared;
+with a local-memory cache those bumps would never reach the process serving
+the list (is_enabled()).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from actionboard_back import metrics
+from organisations.models import Organisation
+
+
+def is_enabled():
+    return metrics.is_shared()
+
+
+def _generation_key(org_pk):
+    return f"meetings:org-generation:{org_pk}"
+
+
+def get_generation(org_pk):
+    key = _generation_key(org_pk)
+    generation = cache.get(key)
+    if generation is None:
+        # Start from a clock value rather than 1, so a generation that was
+        # evicted can't come back with a number old pages were cached under.
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(org_pk):
+    key = _generation_key(org_pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def get_org_pk(org_id):
+    """
+    Organisation.org_id never changes, so its pk can be cached for good.
+    Returns None for an unknown org_id.
+    """
+    key = f"meetings:org-pk:{org_id}"
+    org_pk = cache.get(key)
+    if org_pk is None:
+        org_pk = Organisation.objects.filter(org_id=org_id).values_list('pk', flat=True).first()
+        if org_pk is not None:
+            cache.set(key, org_pk, timeout=None)
+    return org_pk
+
+
+def forget_org(org_id):
+    cache.delete(f"meetings:org-pk:{org_id}")
+
+
+def list_page_key(org_pk, generation, query_params):
+    params = sorted((key, tuple(query_params.getlist(key))) for key in query_params)
+    digest = hashlib.sha1(repr(params).encode()).hexdigest()
+    return f"meetings:list:{org_pk}:{generation}:{digest}"
+
+
+def list_page_etag(page_key):
+    return f'"{hashlib.sha1(page_key.encode()).hexdigest()}"'
+
+
+def get_list_page(page_key):
+    return cache.get(page_key)
+
+
+def set_list_page(page_key, data):
+    cache.set(page_key, data, timeout=settings.MEETING_LIST_CACHE_TIMEOUT)
@@ -0,0 +1,177 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from actionboard_back.utils import rolled_back
+from integrations.models import OAuthToken
+from meetings.models import Meeting
+from organisations.models import Organisation
+from users.models import CustomUser, EmailOTP
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset, then report EXPLAIN plans and timings of the hot "
+        "lookups with the index plan dropped and restored. Everything, including the "
+        "index changes, runs in a transaction that is rolled back afterwards."
+    )
+
+    INDEXES = [
+        (Meeting, 'meeting_meeting_id_idx'),
+        (Meeting, 'meeting_org_start_idx'),
+        (EmailOTP, 'emailotp_unused_idx'),
+        (EmailOTP, 'emailotp_verified_idx'),
+        (OAuthToken, 'oauth_token_expiry_idx'),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meetings', type=int, default=100000)
+        parser.add_argument('--otps', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--orgs', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=50, help="Executions per query when timing.")
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options)
+
+    def run(self, options):
+        self.stdout.write("Seeding...")
+        sample = self.seed(options)
+        queries = self.queries(sample)
+
+        results = {}
+        self.drop_indexes()
+        self.analyze()
+        results['without indexes'] = self.measure(queries, options['repeat'])
+        self.create_indexes()
+        self.analyze()
+        results['with indexes'] = self.measure(queries, options['repeat'])
+
+        for label, measured in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {label} =="))
+            for name, (plan, median) in measured.items():
+                self.stdout.write(f"{name}: {median:.3f} ms")
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n== summary =="))
+        self.stdout.write(f"{'query':<22} {'without ms':>11} {'with ms':>9} {'speedup':>8}")
+        for name in queries:
+            before = results['without indexes'][name][1]
+            after = results['with indexes'][name][1]
+            self.stdout.write(f"{name:<22} {before:>11.3f} {after:>9.3f} {before / after:>7.1f}x")
+
+    def seed(self, options):
+        run = uuid.uuid4().hex[:8]
+        now = timezone.now()
+
+        users = CustomUser.objects.bulk_create(
+            CustomUser(email=f"bench-{run}-{i}@example.com", password="") for i in range(options['users'])
+        )
+        if not users[0].pk:
+            users = list(CustomUser.objects.filter(email__startswith=f"bench-{run}-"))
+
+        organisations = [
+            Organisation.objects.create(name=f"bench-{run}-{i}", created_by=random.choice(users))
+            for i in range(options['orgs'])
+        ]
+
+        Meeting.objects.bulk_create((
+            Meeting(
+                organisation=random.choice(organisations),
+                meeting_id=f"{run}{i}",
+                topic=f"Meeting {i}",
+                start_time=now - timedelta(minutes=random.randint(0, 60 * 24 * 365)),
+            )
+            for i in range(options['meetings'])
+        ), batch_size=2000)
+
+        otps = []
+        for i in range(options['otps']):
+            verified = random.random() < 0.3
+            otps.append(EmailOTP(
+                email=f"bench-{run}-{random.randrange(options['users'])}@example.com",
+                otp=f"{random.randrange(1000000):06d}",
+                is_used=verified or random.random() < 0.5,
+                is_verified=verified,
+                verified_at=now - timedelta(minutes=random.randint(0, 60 * 24 * 30)) if verified else None,
+            ))
+        EmailOTP.objects.bulk_create(otps, batch_size=2000)
+
+        OAuthToken.objects.bulk_create((
+            OAuthToken(
+                user=user,
+                provider="zoom",
+                access_token="x",
+                refresh_token="x",
+                expires_at=now + timedelta(minutes=random.randint(-60, 60 * 24)),
+            )
+            for user in users
+        ), batch_size=2000)
+
+        otp = random.choice(otps)
+        return {
+            'meeting_id': f"{run}{options['meetings'] // 2}",
+            'organisation': random.choice(organisations),
+            'email': otp.email,
+            'otp': otp.otp,
+            'now': now,
+        }
+
+    def queries(self, sample):
+        return {
+            'meeting by zoom id': Meeting.objects.filter(meeting_id=sample['meeting_id']),
+            'org meeting page': Meeting.objects.filter(
+                organisation=sample['organisation'],
+            ).order_by('-start_time', '-id')[:20],
+            'latest unused otp': EmailOTP.objects.filter(
+                email=sample['email'], otp=sample['otp'], is_used=False,
+            ).order_by('-created_at')[:1],
+            'latest verified otp': EmailOTP.objects.filter(
+                email=sample['email'], is_verified=True, is_used=True,
+            ).order_by('-verified_at')[:1],
+            'tokens due refresh': OAuthToken.objects.filter(
+                provider="zoom", expires_at__lte=sample['now'] + timedelta(minutes=10),
+            ).order_by('expires_at')[:100],
+        }
+
+    def measure(self, queries, repeat):
+        measured = {}
+        for name, queryset in queries.items():
+            plan = queryset.explain()
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            measured[name] = (plan, statistics.median(timings))
+        return measured
+
+    def get_index(self, model, name):
+        return next(index for index in model._meta.indexes if index.name == name)
+
+    def drop_indexes(self):
+        # The schema editor context manager is not usable inside an atomic
+        # block on SQLite, so run the generated SQL directly.
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model, name in self.INDEXES:
+                cursor.execute(str(self.get_index(model, name).remove_sql(model, editor)))
+
+    def create_indexes(self):
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model, name in self.INDEXES:
+                cursor.execute(str(self.get_index(model, name).create_sql(model, editor)))
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            for model in {model for model, _ in self.INDEXES}:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
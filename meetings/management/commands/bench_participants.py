@@ -0,0 +1,91 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from actionboard_back.utils import rolled_back
+from integrations.management.commands.bench_zoom_sync import FakeZoomServer
+from integrations.models import OAuthToken, ZoomProfile
+from integrations.zoom_client import ZoomAPIClient
+from integrations.zoom_participants import fetch_participants
+from meetings.models import Meeting, MeetingAttendee
+from meetings.webhooks import handle_meeting_participants
+from organisations.models import Organisation
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark attendee ingestion (the meeting.participants inbox event) against a local fake Zoom API: the "
+        "participants report paged and merged per person, written with one bulk insert, "
+        "versus saving attendees one by one. Data is created in a transaction that is "
+        "rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default="50,500,2000", help="Comma-separated people per meeting.")
+        parser.add_argument('--latency', type=float, default=20.0, help="Milliseconds the fake API takes per request.")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.stdout.write(f"{options['latency']:.0f} ms per API request")
+        self.stdout.write(f"{'run':<26} {'people':>7} {'joins':>6} {'requests':>9} {'queries':>8} {'s':>7}")
+        for size in sizes:
+            server = FakeZoomServer(1, options['latency'] / 1000, participants=size)
+            server.start()
+            try:
+                unlimited = {category: 10 ** 6 for category in settings.ZOOM_RATE_LIMITS}
+                with override_settings(ZOOM_API_BASE_URL=server.base_url, ZOOM_RATE_LIMITS=unlimited), \
+                        rolled_back():
+                    self.run(server, size)
+            finally:
+                server.stop()
+
+    def run(self, server, size):
+        suffix = uuid.uuid4().hex[:8]
+        user = CustomUser.objects.create_user(email=f"bench-{suffix}@example.com", password=None)
+        organisation = Organisation.objects.create(name=f"bench-{suffix}", created_by=user)
+        oauth_token = OAuthToken.objects.create(
+            user=user, provider='zoom', access_token="bench", refresh_token="bench",
+            expires_at=timezone.now() + timedelta(days=1),
+        )
+        profile = ZoomProfile.objects.create(
+            user=user, oauth_token=oauth_token, zoom_user_id=f"bench-{suffix}", zoom_email=user.email,
+        )
+        listing = server.listing(0)
+        meeting = Meeting.objects.create(
+            organisation=organisation, host=user, meeting_id=str(listing["id"]), topic=listing["topic"],
+            start_time=timezone.now() - timedelta(hours=1), status="started",
+        )
+        payload = {
+            "event": "meeting.participants",
+            "payload": {"object": {"id": listing["id"], "uuid": listing["uuid"], "end_time": timezone.now().isoformat()}},
+        }
+
+        def timed(name, run):
+            requests_before = server.requests
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                run()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{name:<26} {size:>7} {len(server.joins(0)):>6} {server.requests - requests_before:>9} "
+                f"{len(queries):>8} {elapsed:>7.2f}"
+            )
+
+        def one_by_one():
+            participants = fetch_participants(ZoomAPIClient(oauth_token, profile.zoom_account_id), listing["uuid"])
+            MeetingAttendee.objects.filter(meeting=meeting).delete()
+            for attendee in MeetingAttendee.objects.from_zoom(meeting, participants):
+                attendee.save()
+
+        timed("participants, one by one", one_by_one)
+        timed("participants, bulk", lambda: handle_meeting_participants(payload))
+        attendees = MeetingAttendee.objects.filter(meeting=meeting)
+        assert attendees.count() == size, attendees.count()
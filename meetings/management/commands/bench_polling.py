@@ -0,0 +1,74 @@
+import math
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from actionboard_back.utils import rolled_back
+from meetings.models import Meeting, Recording
+from organisations.models import Organisation
+from transcripts.models import Transcript
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Poll the meeting details and transcript endpoints with and without "
+        "If-None-Match and report bytes transferred and latency. Synthetic data "
+        "is created in a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--polls', type=int, default=200)
+        parser.add_argument('--transcript-kb', type=int, default=200, help="Size of the synthetic transcript.")
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options['polls'], options['transcript_kb'])
+
+    def run(self, polls, transcript_kb):
+        suffix = uuid.uuid4().hex[:8]
+        user = CustomUser.objects.create_user(email=f"bench-{suffix}@example.com", password=None)
+        organisation = Organisation.objects.create(name=f"bench-{suffix}", created_by=user)
+        meeting = Meeting.objects.create(
+            organisation=organisation, host=user, meeting_id=f"bench-{suffix}",
+            topic="Polling benchmark", start_time=timezone.now(), status='ended',
+        )
+        Recording.objects.create(meeting=meeting, recording_id=f"bench-{suffix}", file_type="MP4")
+        sentence = "Speaker A: let's go through the remaining action items for this sprint. "
+        Transcript.objects.create(
+            meeting=meeting,
+            full_transcript=sentence * (transcript_kb * 1024 // len(sentence)),
+            summary={"summary": "Synthetic transcript"},
+        )
+
+        client = APIClient()
+        client.force_authenticate(user)
+        endpoints = {
+            "meeting-details": reverse("meeting-details", args=[meeting.meeting_id]) + "?include=transcript,summary",
+            "fetch-transcript": reverse("fetch-transcript", args=[meeting.meeting_id]),
+        }
+
+        self.stdout.write(f"{'endpoint':<18} {'mode':<14} {'bytes/poll':>11} {'p50 ms':>8} {'p95 ms':>8} {'304s':>6}")
+        for name, url in endpoints.items():
+            for mode in ("unconditional", "conditional"):
+                etag = None
+                sizes, latencies, not_modified = [], [], 0
+                for _ in range(polls):
+                    headers = {"HTTP_IF_NONE_MATCH": etag} if mode == "conditional" and etag else {}
+                    started = time.perf_counter()
+                    response = client.get(url, **headers)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    sizes.append(len(response.content))
+                    not_modified += response.status_code == 304
+                    etag = response.get("ETag", etag)
+                latencies.sort()
+                self.stdout.write(
+                    f"{name:<18} {mode:<14} {statistics.mean(sizes):>11.0f} "
+                    f"{statistics.median(latencies):>8.2f} {latencies[math.ceil(len(latencies) * 95 / 100) - 1]:>8.2f} "
+                    f"{not_modified:>6}"
+                )
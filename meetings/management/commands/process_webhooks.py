@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from actionboard_back import metrics
+from actionboard_back.utils import make_worker_id, poll, stop_event
+from meetings.models import WebhookEvent
+from meetings.webhooks import drain_inbox, purge_expired_events
+
+
+class Command(BaseCommand):
+    help = "Process webhook events stored in the inbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the inbox is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the inbox once and exit.")
+        parser.add_argument('--stats', action='store_true', help="Print inbox status counts and dedup counters and exit.")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self.print_stats()
+
+        worker_id = make_worker_id()
+
+        def drain():
+            processed = drain_inbox(worker_id, batch_size=options['batch_size'])
+            if processed:
+                self.stdout.write(f"Processed {processed} webhook events")
+            return processed
+
+        # Idle: a good moment to expire old dedup rows.
+        poll(stop_event(), drain, options['poll_interval'], once=options['once'], on_idle=purge_expired_events)
+
+    def print_stats(self):
+        # Counted from the inbox itself, so they cover every process.
+        counts = dict(WebhookEvent.objects.values_list('status').annotate(Count('pk')).order_by())
+        for status, _ in WebhookEvent.STATUS_CHOICES:
+            self.stdout.write(f"{status}: {counts.get(status, 0)}")
+        self.stdout.write(f"retried: {WebhookEvent.objects.filter(attempts__gt=1).count()}")
+
+        # Duplicates never reach the table; the counters are only worth
+        # printing when the cache is shared with the processes that count.
+        if not metrics.is_shared():
+            self.stdout.write("dedup counters: not shared with other processes, set CACHE_URL to a shared cache")
+            return
+        counters = metrics.snapshot("webhooks.received", "webhooks.duplicates", "webhooks.purged")
+        self.stdout.write(
+            f"received {counters['webhooks.received']}, "
+            f"duplicates skipped {counters['webhooks.duplicates']}, "
+            f"purged {counters['webhooks.purged']}"
+        )
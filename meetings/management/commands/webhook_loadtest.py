@@ -0,0 +1,63 @@
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire a burst of Zoom webhook deliveries at a running server and report latency percentiles, "
+        "e.g. against `python manage.py runserver` or gunicorn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default="http://127.0.0.1:8000/api/meetings/zoom/webhooks/")
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=20)
+
+    def handle(self, *args, **options):
+        total, concurrency = options['requests'], options['concurrency']
+        local = threading.local()
+
+        def fire(i):
+            # One keep-alive session per worker thread.
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+            session = local.session
+            payload = {
+                "event": random.choice(["meeting.ended", "recording.completed"]),
+                "event_ts": int(time.time() * 1000) + i,
+                "payload": {"object": {
+                    "id": f"loadtest-{i}",
+                    "uuid": f"loadtest-{i}==",
+                    "end_time": "2025-01-01T10:00:00Z",
+                    "recording_files": [],
+                }},
+            }
+            started = time.perf_counter()
+            resp = session.post(options['url'], data=json.dumps(payload), headers={"Content-Type": "application/json"})
+            return time.perf_counter() - started, resp.status_code
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(fire, range(total)))
+        except requests.ConnectionError as e:
+            raise CommandError(f"Could not reach {options['url']}: {e}")
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        errors = sum(1 for _, status in results if status != 200)
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+        self.stdout.write(f"{total} requests, concurrency {concurrency}, {total / elapsed:.0f} req/s, {errors} non-200")
+        self.stdout.write(
+            f"latency ms: p50 {percentile(50):.1f}  p95 {percentile(95):.1f}  "
+            f"p99 {percentile(99):.1f}  max {latencies[-1]:.1f}  mean {statistics.mean(latencies):.1f}"
+        )
+
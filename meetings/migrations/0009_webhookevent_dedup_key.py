@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0008_webhookevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookevent',
+            name='dedup_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0009_webhookevent_dedup_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['organisation', '-start_time', '-id'], name='meeting_org_start_idx'),
+        ),
+    ]
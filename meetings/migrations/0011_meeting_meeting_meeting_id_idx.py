@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0010_meeting_meeting_org_start_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['meeting_id'], name='meeting_meeting_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0011_meeting_meeting_meeting_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='sync_hash',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+    ]
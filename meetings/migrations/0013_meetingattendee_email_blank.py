@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0012_meeting_sync_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='meetingattendee',
+            name='email',
+            field=models.EmailField(blank=True, max_length=254),
+        ),
+    ]
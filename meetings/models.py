@@ -1,4 +1,6 @@
 from django.db import models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 # Create your models here.
 class Meeting(models.Model):
@@ -23,29 +25,127 @@ class Meeting(models.Model):
     join_url = models.URLField(max_length=500, blank=True, null=True)
     start_url = models.URLField(max_length=800, blank=True, null=True)
 
+    # sha1 of the Zoom data last synced into this row (integrations.zoom_sync)
+    sync_hash = models.CharField(max_length=40, blank=True, null=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            # Backs the keyset pagination of MeetingListView.
+            models.Index(fields=['organisation', '-start_time', '-id'], name='meeting_org_start_idx'),
+            # Webhooks, details and transcript views all look meetings up by Zoom id.
+            models.Index(fields=['meeting_id'], name='meeting_meeting_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.topic} ({self.start_time})"
 
     
+class MeetingAttendeeManager(models.Manager):
+    def from_zoom(self, meeting, participants):
+        """
+        Unsaved MeetingAttendees for Zoom's past-meeting participants, which
+        list every join separately: one attendee per person, from their
+        first join to their last leave, with the time they were in the
+        meeting (overlapping joins from two devices counted once).
+        """
+        segments = {}
+        for participant in participants:
+            if not participant.get("join_time") or not participant.get("leave_time"):
+                continue
+            # Guests have no id; tell them apart by email, then name.
+            key = participant.get("id") or (participant.get("user_email") or "").lower() or participant.get("name")
+            segments.setdefault(key, []).append(participant)
+
+        attendees = []
+        for joins in segments.values():
+            spans = sorted((parse_datetime(p["join_time"]), parse_datetime(p["leave_time"])) for p in joins)
+            duration, (start, end) = 0, spans[0]
+            for join_time, leave_time in spans[1:]:
+                if join_time > end:
+                    duration += (end - start).total_seconds()
+                    start = join_time
+                end = max(end, leave_time)
+            duration += (end - start).total_seconds()
+            attendees.append(MeetingAttendee(
+                meeting=meeting,
+                name=next((p["name"] for p in joins if p.get("name")), ""),
+                email=next((p["user_email"] for p in joins if p.get("user_email")), ""),
+                external_user_id=joins[0].get("id") or None,
+                join_time=spans[0][0],
+                leave_time=max(leave_time for _, leave_time in spans),
+                duration=int(duration),
+            ))
+        return attendees
+
+    def replace_from_zoom(self, meeting, participants, batch_size=500):
+        """
+        Replace the meeting's attendees with those of Zoom's participants
+        report: one delete and one insert per batch_size attendees.
+        """
+        attendees = self.from_zoom(meeting, participants)
+        self.filter(meeting=meeting).delete()
+        return self.bulk_create(attendees, batch_size=batch_size)
+
+
 class MeetingAttendee(models.Model):
     meeting = models.ForeignKey('meetings.Meeting', on_delete=models.CASCADE, related_name='attendees')
     name = models.CharField(max_length=255)
-    email = models.EmailField()
+    email = models.EmailField(blank=True)  # empty for guests who didn't sign in
     external_user_id = models.CharField(max_length=255, blank=True, null=True)  # Zoom/Google ID
     join_time = models.DateTimeField()
     leave_time = models.DateTimeField()
     duration = models.PositiveIntegerField(help_text="Duration in seconds")
 
+    objects = MeetingAttendeeManager()
+
     def __str__(self):
-        return f"{self.name} - {self.meeting.title}"
+        return f"{self.name} - {self.meeting.topic}"
     
 
+class RecordingManager(models.Manager):
+    def from_zoom(self, meeting, recording_files):
+        """Unsaved Recordings for Zoom's recording_files payload."""
+        return [
+            Recording(
+                meeting=meeting,
+                recording_id=rec["id"],
+                recording_type=rec.get("recording_type"),
+                file_type=rec.get("file_type"),
+                file_size=rec.get("file_size"),
+                play_url=rec.get("play_url"),
+                download_url=rec.get("download_url"),
+                recording_start=parse_datetime(rec["recording_start"]) if rec.get("recording_start") else None,
+                recording_end=parse_datetime(rec["recording_end"]) if rec.get("recording_end") else None,
+            )
+            for rec in recording_files
+            if rec.get("id")
+        ]
+
+    def upsert(self, recordings, batch_size=500):
+        """
+        Insert or update recordings, of any number of meetings, keyed on
+        recording_id: one statement per batch_size rows.
+        """
+        return self.bulk_create(
+            recordings,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['recording_id'],
+            update_fields=['play_url', 'download_url', 'recording_start', 'recording_end', 'updated_at'],
+        )
+
+    def upsert_from_zoom(self, meeting, recording_files):
+        """
+        Insert or update the meeting's recordings from Zoom's recording_files
+        payload in a single statement, keyed on recording_id.
+        """
+        return self.upsert(self.from_zoom(meeting, recording_files))
+
+
 class Recording(models.Model):
     meeting = models.ForeignKey('meetings.Meeting', on_delete=models.CASCADE, related_name='recordings')
     
@@ -62,6 +162,51 @@ class Recording(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RecordingManager()
     
     def __str__(self):
-        return f"Recording {self.recording_id} for {self.meeting.topic}"
\ No newline at end of file
+        return f"Recording {self.recording_id} for {self.meeting.topic}"
+
+class WebhookEvent(models.Model):
+    """
+    Inbox of raw webhook deliveries. The webhook endpoint only appends rows
+    here; the process_webhooks worker runs the handlers.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    provider = models.CharField(max_length=30, default='zoom')
+    event = models.CharField(max_length=100)
+    payload = models.JSONField()
+    # sha256 of event + meeting uuid + event_ts; rows expire after WEBHOOK_DEDUP_TTL
+    dedup_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['received_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='webhook_event_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event} ({self.status})"
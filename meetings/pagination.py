@@ -0,0 +1,68 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+class MeetingCursorPagination:
+    """
+    Keyset pagination over (start_time, id), newest first.
+
+    The cursor is an opaque token holding the (start_time, id) of the last
+    row on the previous page, so each page is an index range scan on
+    (organisation, -start_time, -id) no matter how deep the client pages,
+    unlike OFFSET-based PageNumberPagination.
+    """
+    ordering = ('-start_time', '-id')
+    max_page_size = 100
+
+    def __init__(self, request):
+        self.request = request
+        self.page_size = self.get_page_size()
+
+    def get_page_size(self):
+        default = settings.REST_FRAMEWORK.get('PAGE_SIZE', 10)
+        try:
+            page_size = int(self.request.query_params.get('page_size', default))
+        except ValueError:
+            raise ValidationError({"page_size": "Must be an integer."})
+        if not 1 <= page_size <= self.max_page_size:
+            raise ValidationError({"page_size": f"Must be between 1 and {self.max_page_size}."})
+        return page_size
+
+    @staticmethod
+    def encode_cursor(meeting):
+        raw = json.dumps([meeting.start_time.isoformat(), meeting.pk]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            start_time, pk = json.loads(raw)
+            start_time = parse_datetime(start_time)
+            if start_time is None:
+                raise ValueError
+            return start_time, int(pk)
+        except (ValueError, TypeError):
+            raise ValidationError({"cursor": "Invalid cursor."})
+
+    def paginate_queryset(self, queryset):
+        """
+        Return (page, next_cursor); next_cursor is None on the last page.
+        """
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = self.request.query_params.get('cursor')
+        if cursor:
+            start_time, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(Q(start_time__lt=start_time) | Q(start_time=start_time, pk__lt=pk))
+
+        # One extra row tells us whether there is a next page without a COUNT.
+        page = list(queryset[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        return page, self.encode_cursor(page[-1]) if has_more else None
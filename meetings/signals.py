@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from meetings.cache import bump_generation, forget_org
+from meetings.models import Meeting, Recording
+from organisations.models import Organisation
+
+
+def invalidate_meeting_list(org_pk):
+    # After commit, so a reader can't cache pre-commit data under the new generation.
+    transaction.on_commit(lambda: bump_generation(org_pk))
+
+
+@receiver([post_save, post_delete], sender=Meeting)
+def meeting_changed(sender, instance, **kwargs):
+    invalidate_meeting_list(instance.organisation_id)
+
+
+@receiver([post_save, post_delete], sender=Recording)
+def recording_changed(sender, instance, **kwargs):
+    # Only the organisation id, rather than loading the whole meeting.
+    if Recording.meeting.is_cached(instance):
+        org_pk = instance.meeting.organisation_id
+    else:
+        org_pk = Meeting.objects.filter(pk=instance.meeting_id).values_list('organisation_id', flat=True).first()
+    if org_pk is not None:  # None: deleted along with its meeting, which bumps the generation itself
+        invalidate_meeting_list(org_pk)
+
+
+@receiver(post_delete, sender=Organisation)
+def organisation_deleted(sender, instance, **kwargs):
+    forget_org(instance.org_id)
@@ -1,3 +1,391 @@
-from django.test import TestCase
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from actionboard_back import metrics
+from integrations.models import OAuthToken, ZoomProfile
+from integrations.tests import http_response
+from meetings.models import Meeting, MeetingAttendee, Recording, WebhookEvent
+from meetings.webhooks import (
+    HANDLERS, claim_events, dedup_key_for, drain_inbox, handle_meeting_ended, handle_recording_completed,
+    purge_expired_events, record_webhook_event,
+)
+from organisations.models import Organisation
+from transcripts.models import Transcript
+from users.models import CustomUser
+
+
+def recording_completed_payload(meeting_id, count, play_url="https://zoom.us/rec/play"):
+    return {
+        "event": "recording.completed",
+        "payload": {"object": {
+            "id": meeting_id,
+            "recording_files": [
+                {
+                    "id": f"rec-{i}",
+                    "recording_type": "shared_screen_with_speaker_view",
+                    "file_type": "MP4",
+                    "file_size": 1024 * i,
+                    "play_url": f"{play_url}/{i}",
+                    "download_url": f"https://zoom.us/rec/download/{i}",
+                    "recording_start": "2025-06-01T10:00:00Z",
+                    "recording_end": "2025-06-01T11:00:00Z",
+                }
+                for i in range(count)
+            ],
+        }},
+    }
+
+
+def meeting_ended_delivery(uuid="abc==", event_ts=1748772000000):
+    return {"event": "meeting.ended", "event_ts": event_ts, "payload": {"object": {"id": 555, "uuid": uuid}}}
+
+
+class WebhookDedupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_redelivery_is_dropped_by_the_cache(self):
+        self.assertIsNotNone(record_webhook_event(meeting_ended_delivery()))
+        with self.assertNumQueries(0):
+            self.assertIsNone(record_webhook_event(meeting_ended_delivery()))
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+        self.assertEqual(metrics.snapshot("webhooks.received", "webhooks.duplicates"),
+                         {"webhooks.received": 1, "webhooks.duplicates": 1})
+
+    def test_redelivery_the_cache_missed_hits_the_unique_key(self):
+        record_webhook_event(meeting_ended_delivery())
+        cache.delete(f"webhook-dedup:{dedup_key_for(meeting_ended_delivery())}")  # evicted, or another process
+
+        self.assertIsNone(record_webhook_event(meeting_ended_delivery()))
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+        self.assertEqual(metrics.get("webhooks.duplicates"), 1)
+
+    def test_other_instances_and_deliveries_without_identity_are_kept(self):
+        record_webhook_event(meeting_ended_delivery())
+        record_webhook_event(meeting_ended_delivery(uuid="def=="))
+        record_webhook_event(meeting_ended_delivery(event_ts=None))
+        record_webhook_event(meeting_ended_delivery(event_ts=None))
+        self.assertEqual(WebhookEvent.objects.count(), 4)
+        self.assertEqual(WebhookEvent.objects.filter(dedup_key=None).count(), 2)
+
+    @override_settings(WEBHOOK_DEDUP_TTL=3600)
+    def test_purge_drops_old_processed_events_only(self):
+        old = timezone.now() - timedelta(hours=2)
+        for status, received_at in (("done", old), ("done", timezone.now()), ("failed", old), ("pending", old)):
+            event = WebhookEvent.objects.create(event="meeting.ended", payload={}, status=status)
+            WebhookEvent.objects.filter(pk=event.pk).update(received_at=received_at)
+
+        self.assertEqual(purge_expired_events(), 1)
+        self.assertEqual(sorted(WebhookEvent.objects.values_list("status", flat=True)), ["done", "failed", "pending"])
+        self.assertEqual(metrics.get("webhooks.purged"), 1)
+
+
+@override_settings(WEBHOOK_MAX_ATTEMPTS=2, WEBHOOK_RETRY_BASE_DELAY=10, WEBHOOK_RETRY_MAX_DELAY=60, WEBHOOK_LOCK_TIMEOUT=600)
+class WebhookInboxTests(TestCase):
+    def setUp(self):
+        self.handler = mock.Mock()
+        patcher = mock.patch.dict(HANDLERS, {"test.event": self.handler})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.event = WebhookEvent.objects.create(event="test.event", payload={"n": 1})
+
+    def test_claimed_events_are_not_claimed_by_another_worker(self):
+        self.assertEqual(claim_events("a"), [self.event])
+        self.assertEqual(claim_events("b"), [])
+
+        # Claimed by a worker that died: retried once the lock is stale.
+        WebhookEvent.objects.update(locked_at=timezone.now() - timedelta(seconds=601))
+        [event] = claim_events("b")
+        self.assertEqual((event.locked_by, event.attempts), ("b", 2))
+
+    def test_failures_back_off_then_fail(self):
+        self.handler.side_effect = ValueError("boom")
+        with self.assertLogs("meetings.webhooks", "ERROR"):
+            drain_inbox("worker")
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.status, self.event.last_error, self.event.locked_by), ("pending", "boom", ""))
+        delay = (self.event.next_attempt_at - timezone.now()).total_seconds()
+        self.assertTrue(4 < delay <= 10, delay)  # base delay scaled by 0.5-1.0
+        self.assertEqual(drain_inbox("worker"), 0)  # still backing off
+
+        WebhookEvent.objects.update(next_attempt_at=timezone.now())
+        with self.assertLogs("meetings.webhooks", "ERROR"):
+            drain_inbox("worker")
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.status, self.event.attempts), ("failed", 2))
+        self.assertEqual(self.handler.call_count, 2)
+
+    def test_success_and_unknown_events_are_done(self):
+        WebhookEvent.objects.create(event="meeting.deleted", payload={})
+        self.assertEqual(drain_inbox("worker"), 2)
+        self.assertEqual(set(WebhookEvent.objects.values_list("status", flat=True)), {"done"})
+        self.handler.assert_called_once_with({"n": 1})
+
+
+class RecordingCompletedWebhookTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="host@example.com", password="pass")
+        self.organisation = Organisation.objects.create(name="Org", created_by=self.user)
+        self.meeting = Meeting.objects.create(
+            organisation=self.organisation, host=self.user, meeting_id="555", start_time=timezone.now(),
+        )
+
+    def test_query_count_does_not_grow_with_recording_files(self):
+        # meeting lookup, savepoint, upsert, meeting update, release savepoint
+        with self.assertNumQueries(5):
+            handle_recording_completed(recording_completed_payload(555, 1))
+        with self.assertNumQueries(5):
+            handle_recording_completed(recording_completed_payload(555, 10))
+
+        self.assertEqual(Recording.objects.filter(meeting=self.meeting).count(), 10)
+        self.meeting.refresh_from_db()
+        self.assertTrue(self.meeting.recording_ready)
+
+    def test_redelivery_updates_existing_recordings(self):
+        handle_recording_completed(recording_completed_payload(555, 3))
+        handle_recording_completed(recording_completed_payload(555, 3, play_url="https://zoom.us/rec/new"))
+
+        self.assertEqual(Recording.objects.count(), 3)
+        self.assertEqual(Recording.objects.get(recording_id="rec-2").play_url, "https://zoom.us/rec/new/2")
+
+
+def join(start, end, **participant):
+    day = "2025-06-01T"
+    return {"join_time": f"{day}{start}:00Z", "leave_time": end and f"{day}{end}:00Z", **participant}
+
+
+class MeetingAttendeeFromZoomTests(TestCase):
+    def attendees(self, participants):
+        return {attendee.name: attendee for attendee in MeetingAttendee.objects.from_zoom(None, participants)}
+
+    def test_joins_of_one_person_are_merged(self):
+        ada = self.attendees([
+            join("10:00", "10:30", id="u1", name="Ada", user_email="ada@example.com"),
+            join("10:20", "10:40", id="u1", name="Ada (phone)"),  # second device, overlapping
+            join("11:00", "11:10", id="u1", name="Ada"),  # rejoined after a gap
+        ])["Ada"]
+        self.assertEqual(ada.duration, 50 * 60)
+        self.assertEqual((ada.email, ada.external_user_id), ("ada@example.com", "u1"))
+        self.assertEqual(ada.join_time, datetime(2025, 6, 1, 10, tzinfo=dt_timezone.utc))
+        self.assertEqual(ada.leave_time, datetime(2025, 6, 1, 11, 10, tzinfo=dt_timezone.utc))
+
+    def test_guests_are_told_apart_by_email_then_name(self):
+        attendees = self.attendees([
+            join("10:00", "10:10", name="Guest", user_email="Guest@Example.com"),
+            join("10:05", "10:20", name="Guest 2", user_email="guest@example.com"),
+            join("10:00", "10:10", name="Visitor"),
+            join("10:30", "10:35", name="Visitor"),
+        ])
+        self.assertEqual(sorted(attendees), ["Guest", "Visitor"])
+        self.assertEqual((attendees["Guest"].duration, attendees["Guest"].external_user_id), (20 * 60, None))
+        self.assertEqual(attendees["Visitor"].duration, 15 * 60)
+
+    def test_joins_without_both_times_are_skipped(self):
+        attendees = self.attendees([
+            join("10:00", None, id="u1", name="Ada"),
+            join("10:10", "10:20", id="u1", name="Ada"),
+            join("10:00", None, id="u2", name="Bo"),
+        ])
+        self.assertEqual(list(attendees), ["Ada"])
+        self.assertEqual(attendees["Ada"].duration, 10 * 60)
+
+
+@mock.patch("integrations.zoom_client.http_client.request")
+class MeetingEndedWebhookTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="host@example.com", password="pass")
+        self.organisation = Organisation.objects.create(name="Org", created_by=self.user)
+        self.meeting = Meeting.objects.create(
+            organisation=self.organisation, host=self.user, meeting_id="555", start_time=timezone.now(), status="started",
+        )
+        oauth_token = OAuthToken.objects.create(
+            user=self.user, provider="zoom", access_token="token", refresh_token="refresh",
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        ZoomProfile.objects.create(user=self.user, oauth_token=oauth_token, zoom_user_id="zoom-user", zoom_email=self.user.email)
+        payload = {
+            "event": "meeting.ended", "event_ts": 1748772000000,
+            "payload": {"object": {"id": 555, "uuid": "abc==", "end_time": "2025-06-01T11:00:00Z"}},
+        }
+        WebhookEvent.objects.create(event="meeting.ended", payload=payload)
+        handle_meeting_ended(payload)  # queues the follow-up; the inbox run below is a redelivery
+
+    def statuses(self):
+        return dict(WebhookEvent.objects.values_list("event", "status"))
+
+    def test_participants_are_ingested_in_a_step_of_their_own(self, request):
+        request.return_value = http_response(200, {"participants": [join("10:00", "10:30", id="u1", name="Ada")]})
+        self.assertEqual(drain_inbox("worker"), 2)
+
+        self.assertEqual(self.statuses(), {"meeting.ended": "done", "meeting.participants": "done"})
+        self.assertEqual(list(self.meeting.attendees.values_list("name", flat=True)), ["Ada"])
+
+    def test_meeting_without_a_report_is_not_retried(self, request):
+        request.return_value = http_response(404, {"code": 3001, "message": "Meeting does not exist."})
+        with self.assertLogs("integrations.zoom_participants", "INFO"):
+            drain_inbox("worker")
+
+        self.assertEqual(self.statuses(), {"meeting.ended": "done", "meeting.participants": "done"})
+        self.assertFalse(self.meeting.attendees.exists())
+
+    def test_empty_report_is_retried_without_failing_meeting_ended(self, request):
+        request.return_value = http_response(200, {"participants": []})
+        with self.assertLogs("meetings.webhooks", "INFO") as logs:
+            drain_inbox("worker")
+
+        self.assertEqual(self.statuses(), {"meeting.ended": "done", "meeting.participants": "pending"})
+        self.assertEqual([record.exc_info for record in logs.records], [None])
+        self.meeting.refresh_from_db()
+        self.assertEqual(self.meeting.status, "ended")
+
+
+class MeetingDetailsViewTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="host@example.com", password="pass", first_name="Ada")
+        self.organisation = Organisation.objects.create(name="Org", created_by=self.user)
+        self.meeting = Meeting.objects.create(
+            organisation=self.organisation, host=self.user, meeting_id="777", topic="Planning", start_time=timezone.now(),
+        )
+        Recording.objects.upsert_from_zoom(self.meeting, recording_completed_payload(777, 3)["payload"]["object"]["recording_files"])
+        Transcript.objects.create(
+            meeting=self.meeting,
+            full_transcript="long transcript " * 1000,
+            summary={"summary_text": "- planned", "utterances": []},
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/meetings/zoom/meeting-details/{self.meeting.meeting_id}/"
+
+    def test_details_take_two_queries_without_transcript_text(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        # meeting + host + organisation + transcript metadata, then recordings
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn("full_transcript", queries[0]["sql"])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["host"]["first_name"], "Ada")
+        self.assertEqual(data["organisation"]["org_id"], self.organisation.org_id)
+        self.assertEqual(len(data["recordings"]), 3)
+        self.assertNotIn("full_transcript", data["transcript"])
+        self.assertNotIn("summary", data["transcript"])
+
+    def test_transcript_and_summary_are_opt_in(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"include": "transcript,summary"})
+
+        transcript = response.json()["transcript"]
+        self.assertTrue(transcript["full_transcript"].startswith("long transcript"))
+        self.assertEqual(transcript["summary"]["summary_text"], "- planned")
+
+    def test_meeting_without_transcript(self):
+        Transcript.objects.filter(meeting=self.meeting).delete()
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertIsNone(response.json()["transcript"])
+
+    def test_unknown_include_is_rejected(self):
+        self.assertEqual(self.client.get(self.url, {"include": "everything"}).status_code, 400)
+
+
+class MeetingListCacheTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="host@example.com", password="pass")
+        self.organisation = Organisation.objects.create(name="Org", created_by=self.user)
+        Meeting.objects.create(organisation=self.organisation, host=self.user, meeting_id="1", start_time=timezone.now())
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/meetings/zoom/list-meetings/{self.organisation.org_id}/"
+
+    def test_local_memory_cache_serves_fresh_pages_without_etag(self):
+        response = self.client.get(self.url)
+        self.assertNotIn("ETag", response)
+
+        # A meeting saved by another process can't bump this process's generation.
+        Meeting.objects.bulk_create([
+            Meeting(organisation=self.organisation, host=self.user, meeting_id="2", start_time=timezone.now()),
+        ])
+        self.assertEqual(len(self.client.get(self.url).json()["meetings"]), 2)
+
+    def test_recording_saves_look_up_only_the_organisation_id(self):
+        meeting_pk = Meeting.objects.get(meeting_id="1").pk
+        with mock.patch("meetings.signals.bump_generation") as bump_generation, \
+                self.captureOnCommitCallbacks(execute=True), \
+                CaptureQueriesContext(connection) as queries:
+            Recording(meeting_id=meeting_pk, recording_id="rec-1").save()
+
+        self.assertEqual(len(queries), 2)  # insert, organisation id
+        self.assertNotIn('"topic"', queries[1]["sql"])
+        bump_generation.assert_called_once_with(self.organisation.pk)
+
+    def test_shared_cache_answers_unchanged_polls_with_304(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location},
+        }):
+            try:
+                etag = self.client.get(self.url)["ETag"]
+                self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            finally:
+                caches["default"].close()
+
+
+class MeetingListPaginationTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="host@example.com", password="pass")
+        self.organisation = Organisation.objects.create(name="Org", created_by=self.user)
+        self.start = datetime(2025, 6, 2, 10, tzinfo=dt_timezone.utc)
+        for n in range(6):
+            Meeting.objects.create(
+                organisation=self.organisation, host=self.user, meeting_id=str(n), topic=f"Meeting {n}",
+                start_time=self.start + timedelta(days=n // 2),  # two meetings per day
+                status="ended" if n % 2 else "scheduled",
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/meetings/zoom/list-meetings/{self.organisation.org_id}/"
+
+    def pages(self, **params):
+        pages, cursor = [], None
+        while True:
+            response = self.client.get(self.url, {**params, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append([meeting["id"] for meeting in data["meetings"]])
+            self.assertEqual(data["has_more"], data["next_cursor"] is not None)
+            cursor = data["next_cursor"]
+            if cursor is None:
+                return pages, data["total"]
+
+    def test_cursor_walks_newest_first_with_ties_broken_by_id(self):
+        pages, total = self.pages(page_size=4)
+        self.assertEqual(pages, [["5", "4", "3", "2"], ["1", "0"]])
+        self.assertEqual(total, 6)
+
+        pages, _ = self.pages(page_size=1)
+        self.assertEqual(sum(pages, []), ["5", "4", "3", "2", "1", "0"])
+
+    def test_filters_apply_to_every_page(self):
+        params = {"status": "ended", "from": (self.start + timedelta(days=1)).isoformat(), "page_size": 1}
+        self.assertEqual(self.pages(**params), ([["5"], ["3"]], 2))
+        params = {"status": "ended,scheduled", "to": (self.start + timedelta(days=1)).isoformat(), "page_size": 1}
+        self.assertEqual(self.pages(**params), ([["1"], ["0"]], 2))
+
+    def test_fields_projection(self):
+        meetings = self.client.get(self.url, {"fields": "id,topic", "page_size": 1}).json()["meetings"]
+        self.assertEqual(meetings, [{"id": "5", "topic": "Meeting 5"}])
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in (
+            {"cursor": "not-a-cursor"}, {"page_size": 0}, {"page_size": 101}, {"page_size": "ten"},
+            {"from": "yesterday"}, {"fields": "id,secret"},
+        ):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
@@ -1,5 +1,5 @@
 from django.shortcuts import render
-import requests
+from integrations import tokens
 from django.views import View
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -7,22 +7,27 @@ from rest_framework.views import APIView
 from rest_framework import generics
 from integrations.models import OAuthToken, ZoomProfile
 from integrations.zoom_client import ZoomAPIClient
+from actionboard_back.conditional import not_modified, set_validators
+from meetings import cache as meeting_cache
 from meetings.models import Meeting, Recording
+from meetings.pagination import MeetingCursorPagination
+from meetings.webhooks import record_webhook_event
 from meetings.serializers import MeetingSerializer
 from organisations.models import Organisation
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.utils.dateparse import parse_datetime
 from django.conf import settings
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+import hashlib
 import json
+from django.db.models import Max
 from django.views.generic import ListView
 
-from transcripts.models import Transcript
-
 
 class CreateZoomMeetingView(APIView):
     permission_classes = [IsAuthenticated]
@@ -43,20 +48,8 @@ class CreateZoomMeetingView(APIView):
         # Get organisation by org_id or 404
         organisation = get_object_or_404(Organisation, org_id=org_id)
 
-        # Check OAuth token
-        try:
-            oauth_token = OAuthToken.objects.get(user=request.user, provider="zoom")
-        except OAuthToken.DoesNotExist:
-            return Response({"error": "Zoom not connected"}, status=400)
-
-        # Refresh if expired
-        if oauth_token.expires_at <= timezone.now():
-            if not self.refresh_zoom_token(oauth_token):
-                return Response({"error": "Failed to refresh Zoom token"}, status=400)
-
         zoom_api_url = "https://api.zoom.us/v2/users/me/meetings"
         headers = {
-            "Authorization": f"Bearer {oauth_token.access_token}",
             "Content-Type": "application/json"
         }
         data = {
@@ -72,7 +65,13 @@ class CreateZoomMeetingView(APIView):
         }
         import json
 
-        response = requests.post(zoom_api_url, json=data, headers=headers)
+        # OAuth token refreshed ahead of expiry, and once more if Zoom rejects it
+        try:
+            response = tokens.authorized_request(request.user, "POST", zoom_api_url, json=data, headers=headers)
+        except OAuthToken.DoesNotExist:
+            return Response({"error": "Zoom not connected"}, status=400)
+        except tokens.TokenRefreshError:
+            return Response({"error": "Failed to refresh Zoom token"}, status=400)
         if response.status_code != 201:
             return Response({"error": "Zoom API error", "details": response.json()}, status=response.status_code)
 
@@ -103,207 +102,240 @@ class CreateZoomMeetingView(APIView):
             }
         })
 
-    def refresh_zoom_token(self, oauth_token):
-        refresh_url = "https://zoom.us/oauth/token"
-        auth = (settings.ZOOM_CLIENT_ID, settings.ZOOM_CLIENT_SECRET)
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": oauth_token.refresh_token
-        }
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
-
-        resp = requests.post(refresh_url, data=data, headers=headers, auth=auth)
-        if resp.status_code != 200:
-            return False
-
-        token_data = resp.json()
-        oauth_token.access_token = token_data["access_token"]
-        oauth_token.refresh_token = token_data["refresh_token"]
-        oauth_token.expires_at = timezone.now() + timezone.timedelta(seconds=token_data["expires_in"])
-        oauth_token.save()
-        return True
 
 
 @method_decorator(csrf_exempt, name='dispatch')
 class ZoomWebhookView(View):
+    """
+    Acknowledge Zoom webhooks immediately. Deliveries are only stored in the
+    WebhookEvent inbox here; meetings.webhooks handles them out of band
+    (python manage.py process_webhooks), so slow work never delays the
+    response and triggers Zoom retries.
+    """
 
     def post(self, request):
-        data = json.loads(request.body)
-        print("==== Received webhook data ====")
-        print(json.dumps(data, indent=2))  # Pretty-print JSON for readability!
-
-        event = data.get("event")
-        print(f"==== Event: {event} ====")
-
-        if event == "meeting.ended":
-            meeting_id = data["payload"]["object"]["id"]
-            print(f"==== Meeting Ended ID: {meeting_id} ====")
-
-            meeting = Meeting.objects.filter(meeting_id=str(meeting_id)).first()
-            if meeting:
-                meeting.status = "ended"
-                meeting.end_time = parse_datetime(data["payload"]["object"]["end_time"])
-                meeting.save()
-                print(f"==== Updated Meeting {meeting_id} as ended ====")
-
-        elif event == "recording.completed":
-            meeting_id = data["payload"]["object"]["id"]
-            recording_files = data["payload"]["object"]["recording_files"]
-            meeting = Meeting.objects.filter(meeting_id=str(meeting_id)).first()
-            if meeting and recording_files:
-                for rec in recording_files:
-                    recording_id = rec.get("id")
-                    recording, created = Recording.objects.get_or_create(
-                        recording_id=recording_id,
-                        defaults={
-                            "meeting": meeting,
-                            "recording_type": rec.get("recording_type"),
-                            "file_type": rec.get("file_type"),
-                            "file_size": rec.get("file_size"),
-                            "play_url": rec.get("play_url"),
-                            "download_url": rec.get("download_url"),
-                            "recording_start": parse_datetime(rec.get("recording_start")),
-                            "recording_end": parse_datetime(rec.get("recording_end")),
-                        }
-                    )
-                    if not created:
-                        recording.play_url = rec.get("play_url")
-                        recording.download_url = rec.get("download_url")
-                        recording.recording_start = parse_datetime(rec.get("recording_start"))
-                        recording.recording_end = parse_datetime(rec.get("recording_end"))
-                        recording.save()
-
-                    # If this is a transcript file
-                    if rec.get("file_type") in ["TIMELINE_TRANSCRIPT", "TRANSCRIPT"]:
-                        transcript_url = rec.get("download_url")
-                        oauth_token = self.get_zoom_oauth_token_for_meeting(meeting)
-                        if not oauth_token:
-                            print("Zoom not connected for this meeting's host!")
-                            continue
-
-                        headers = {
-                            "Authorization": f"Bearer {oauth_token.access_token}"
-                        }
-                        transcript_response = requests.get(transcript_url, headers=headers)
-                        if transcript_response.status_code == 200:
-                            full_transcript_text = transcript_response.text
-                            Transcript.objects.update_or_create(
-                                meeting=meeting,
-                                defaults={
-                                    "full_transcript": full_transcript_text,
-                                    "summary": {},
-                                    "language": "en"
-                                }
-                            )
-                        else:
-                            print("Failed to download Zoom transcript file.")
-
-                meeting.recording_ready = True
-                meeting.save()
-
-        return JsonResponse({"status": "received"})
-
-    def get(self, request, *args, **kwargs):
-        return JsonResponse({"error": "GET method not allowed"}, status=405)
-
-    def get_zoom_oauth_token_for_meeting(self, meeting):
-        """
-        Helper to get a valid Zoom OAuth token for the meeting's host.
-        Refreshes if expired.
-        """
-        host = meeting.host
-        if not host:
-            return None
         try:
-            oauth_token = OAuthToken.objects.get(user=host, provider="zoom")
-        except OAuthToken.DoesNotExist:
-            return None
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON"}, status=400)
 
-        if oauth_token.expires_at <= timezone.now():
-            if not self.refresh_zoom_token(oauth_token):
-                return None
-        return oauth_token
+        event = data.get("event") if isinstance(data, dict) else None
+        if not event:
+            return JsonResponse({"error": "Missing event"}, status=400)
 
-    def refresh_zoom_token(self, oauth_token):
-        refresh_url = "https://zoom.us/oauth/token"
-        auth = (settings.ZOOM_CLIENT_ID, settings.ZOOM_CLIENT_SECRET)
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": oauth_token.refresh_token
-        }
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        # Redeliveries are dropped here and still acknowledged.
+        record_webhook_event(data)
 
-        resp = requests.post(refresh_url, data=data, headers=headers, auth=auth)
-        if resp.status_code != 200:
-            return False
+        return JsonResponse({"status": "received"})
 
-        token_data = resp.json()
-        oauth_token.access_token = token_data["access_token"]
-        oauth_token.refresh_token = token_data["refresh_token"]
-        oauth_token.expires_at = timezone.now() + timezone.timedelta(seconds=token_data["expires_in"])
-        oauth_token.save()
-        return True
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({"error": "GET method not allowed"}, status=405)
 
 
 class MeetingListView(APIView):
+    """
+    Meetings of an organisation, newest first, one cursor page at a time.
+
+    Query params:
+        cursor      next_cursor from the previous page
+        page_size   1 to 100, defaults to PAGE_SIZE
+        status      comma separated, e.g. status=active,ended
+        from, to    ISO8601 bounds on start_time (from inclusive, to exclusive)
+        fields      comma separated subset of the meeting keys to return
+
+    `total` counts every meeting matching the filters, not just the page.
+
+    Pages are cached per organisation generation (meetings.cache) and carry
+    an ETag, so a dashboard re-polling an unchanged list gets a 304 without
+    any meeting query. Without a shared cache every request builds the page.
+    """
     permission_classes = [IsAuthenticated]
 
+    # Response key -> model columns it needs.
+    FIELDS = {
+        'id': ['meeting_id'],
+        'topic': ['topic'],
+        'start_time': ['start_time'],
+        'duration': ['duration'],
+        'status': ['status'],
+        'join_url': ['join_url'],
+        'agenda': [],
+        'source': [],
+        'recordings': [],
+    }
+
     def get(self, request, org_id):
-        try:
-            # Get the organization
-            organisation = get_object_or_404(Organisation, org_id=org_id)
-            
-            # Get meetings for this organization
-            meetings = Meeting.objects.filter(organisation=organisation).prefetch_related('recordings')
-            
-            # Format meetings data for frontend
-            meetings_data = []
-            for meeting in meetings:
-                # Format recordings
-                recordings_data = []
-                for rec in meeting.recordings.all():
-                    recordings_data.append({
+        # Get the organization
+        org_pk = meeting_cache.get_org_pk(org_id)
+        if org_pk is None:
+            raise Http404("No Organisation matches the given query.")
+
+        if not meeting_cache.is_enabled():
+            return Response(self.build_page(request, org_pk))
+
+        page_key = meeting_cache.list_page_key(org_pk, meeting_cache.get_generation(org_pk), request.query_params)
+        etag = meeting_cache.list_page_etag(page_key)
+        response = not_modified(request, etag=etag)
+        if response is not None:
+            return response
+
+        data = meeting_cache.get_list_page(page_key)
+        if data is None:
+            data = self.build_page(request, org_pk)
+            meeting_cache.set_list_page(page_key, data)
+
+        return set_validators(Response(data), etag=etag)
+
+    def build_page(self, request, org_pk):
+        fields = self.get_fields(request)
+        meetings = self.filter_meetings(Meeting.objects.filter(organisation_id=org_pk), request)
+
+        columns = {'id', 'start_time'}  # needed for the cursor
+        for field in fields:
+            columns.update(self.FIELDS[field])
+        meetings = meetings.only(*columns)
+        if 'recordings' in fields:
+            meetings = meetings.prefetch_related('recordings')
+
+        paginator = MeetingCursorPagination(request)
+        page, next_cursor = paginator.paginate_queryset(meetings)
+
+        return {
+            'meetings': [self.serialize_meeting(meeting, fields) for meeting in page],
+            'total': meetings.count(),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+        }
+
+    def get_fields(self, request):
+        requested = request.query_params.get('fields')
+        if not requested:
+            return list(self.FIELDS)
+        fields = [field.strip() for field in requested.split(',') if field.strip()]
+        unknown = [field for field in fields if field not in self.FIELDS]
+        if unknown:
+            raise ValidationError({"fields": f"Unknown fields: {', '.join(unknown)}"})
+        return fields
+
+    def filter_meetings(self, meetings, request):
+        statuses = request.query_params.get('status')
+        if statuses:
+            meetings = meetings.filter(status__in=[value.strip() for value in statuses.split(',')])
+
+        for param, lookup in (('from', 'start_time__gte'), ('to', 'start_time__lt')):
+            value = request.query_params.get(param)
+            if value:
+                parsed = parse_datetime(value)
+                if parsed is None:
+                    raise ValidationError({param: "Invalid datetime format."})
+                meetings = meetings.filter(**{lookup: parsed})
+        return meetings
+
+    def serialize_meeting(self, meeting, fields):
+        # Format meeting data to match frontend expectations
+        data = {}
+        for field in fields:
+            if field == 'id':
+                data['id'] = meeting.meeting_id  # Use meeting_id as the ID
+            elif field == 'start_time':
+                data['start_time'] = meeting.start_time.isoformat() if meeting.start_time else None
+            elif field == 'status':
+                data['status'] = meeting.status or 'scheduled'
+            elif field == 'agenda':
+                data['agenda'] = getattr(meeting, 'agenda', '')  # Add if you have this field
+            elif field == 'source':
+                data['source'] = 'Zoom'
+            elif field == 'recordings':
+                data['recordings'] = [
+                    {
                         'id': rec.recording_id,
                         'play_url': rec.play_url,
                         'download_url': rec.download_url,
                         'file_type': rec.file_type,
-                        'recording_start': rec.recording_start,
-                        'recording_end': rec.recording_end,
-                    })
-
-                # Format meeting data to match frontend expectations
-                meetings_data.append({
-                    'id': meeting.meeting_id,  # Use meeting_id as the ID
-                    'topic': meeting.topic,
-                    'start_time': meeting.start_time.isoformat() if meeting.start_time else None,
-                    'duration': meeting.duration,
-                    'status': meeting.status or 'scheduled',
-                    'join_url': meeting.join_url,
-                    'agenda': getattr(meeting, 'agenda', ''),  # Add if you have this field
-                    'source': 'Zoom',  # Add source field
-                    'recordings': recordings_data,
-                })
+                        'recording_start': rec.recording_start.isoformat() if rec.recording_start else None,
+                        'recording_end': rec.recording_end.isoformat() if rec.recording_end else None,
+                    }
+                    for rec in meeting.recordings.all()
+                ]
+            else:
+                data[field] = getattr(meeting, field)
+        return data
+
+
+
+def calculate_meeting_status(status, start_time, end_time, duration):
+    """
+    Calculate meeting status based on times if status is 'active'
+    """
+    calculated_status = status
+    if status == 'active' and start_time:
+        now = timezone.now()
+
+        if end_time and now > end_time:
+            calculated_status = 'ended'
+        elif now >= start_time:
+            if duration:
+                estimated_end = start_time + timezone.timedelta(minutes=duration)
+                if now > estimated_end:
+                    calculated_status = 'ended'
+                else:
+                    calculated_status = 'started'
+            else:
+                calculated_status = 'started'
+        else:
+            calculated_status = 'scheduled'
+    return calculated_status
 
-            return Response({
-                'meetings': meetings_data,
-                'total': len(meetings_data)
-            })
-            
-        except Exception as e:
-            return Response({
-                'error': str(e)
-            }, status=500)
 
+def meeting_details_etag(meeting_pk, updated_at, calculated_status, transcript_updated_at, recordings_updated_at, include):
+    raw = "|".join(str(part) for part in (
+        meeting_pk, updated_at.isoformat(), calculated_status,
+        transcript_updated_at.isoformat() if transcript_updated_at else '',
+        recordings_updated_at.isoformat() if recordings_updated_at else '',
+        ",".join(sorted(include)),
+    ))
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
 
 
 class MeetingDetailsView(APIView):
+    """
+    Meeting with its host, organisation, recordings and transcript metadata
+    in two queries (meeting + joins, recordings).
+
+    The transcript text and summary can be hundreds of KB, so they are only
+    loaded and returned when asked for: ?include=transcript,summary
+
+    Responses carry an ETag and Last-Modified. A conditional request is
+    first checked with one narrow query that never reads the transcript
+    body, and answered with 304 when nothing changed.
+    """
     permission_classes = [IsAuthenticated]
 
+    INCLUDES = {'transcript', 'summary'}
+
     def get(self, request, meeting_id):
+        include = {value.strip() for value in request.query_params.get('include', '').split(',') if value.strip()}
+        unknown = include - self.INCLUDES
+        if unknown:
+            return Response({'error': f"Unknown include: {', '.join(sorted(unknown))}"}, status=400)
+
+        if request.META.get('HTTP_IF_NONE_MATCH') or request.META.get('HTTP_IF_MODIFIED_SINCE'):
+            response = self.check_not_modified(request, meeting_id, include)
+            if response is not None:
+                return response
+
+        meetings = (
+            Meeting.objects
+            .select_related('host', 'organisation', 'transcript')
+            .prefetch_related('recordings')
+        )
+        if include:
+            meetings = meetings.select_related('transcript__body')
+
+        # Get the meeting by meeting_id
+        meeting = get_object_or_404(meetings, meeting_id=meeting_id)
+
         try:
-            # Get the meeting by meeting_id
-            meeting = get_object_or_404(Meeting, meeting_id=meeting_id)
-            
             # Check if user has access to this meeting
             # Since we don't have a members relationship, we'll check if user is the host
             # or you can modify this based on your actual organization access logic
@@ -313,53 +345,36 @@ class MeetingDetailsView(APIView):
                 # You might want to add organization membership check here
                 pass
             
-            # Get recordings for this meeting
+            # Get recordings for this meeting (prefetched)
             recordings_data = []
-            if hasattr(meeting, 'recordings'):
-                for rec in meeting.recordings.all():
-                    recordings_data.append({
-                        'id': rec.recording_id,
-                        'play_url': rec.play_url,
-                        'download_url': rec.download_url,
-                        'file_type': rec.file_type,
-                        'recording_type': rec.recording_type,
-                        'file_size': rec.file_size,
-                        'recording_start': rec.recording_start.isoformat() if rec.recording_start else None,
-                        'recording_end': rec.recording_end.isoformat() if rec.recording_end else None,
-                    })
+            for rec in meeting.recordings.all():
+                recordings_data.append({
+                    'id': rec.recording_id,
+                    'play_url': rec.play_url,
+                    'download_url': rec.download_url,
+                    'file_type': rec.file_type,
+                    'recording_type': rec.recording_type,
+                    'file_size': rec.file_size,
+                    'recording_start': rec.recording_start.isoformat() if rec.recording_start else None,
+                    'recording_end': rec.recording_end.isoformat() if rec.recording_end else None,
+                })
 
-            # Get transcript if exists
+            # Transcript metadata is joined in; text and summary only if included
             transcript_data = None
-            try:
-                transcript = Transcript.objects.get(meeting=meeting)
+            transcript = getattr(meeting, 'transcript', None)
+            if transcript:
                 transcript_data = {
-                    'full_transcript': transcript.full_transcript,
-                    'summary': transcript.summary,
                     'language': transcript.language,
-                    'created_at': transcript.created_at.isoformat() if hasattr(transcript, 'created_at') else None,
+                    'created_at': transcript.created_at.isoformat(),
                 }
-            except Transcript.DoesNotExist:
-                pass
+                if 'transcript' in include:
+                    transcript_data['full_transcript'] = transcript.full_transcript
+                if 'summary' in include:
+                    transcript_data['summary'] = transcript.summary
 
-            # Calculate meeting status based on times if status is 'active'
-            calculated_status = meeting.status
-            if meeting.status == 'active' and meeting.start_time:
-                from django.utils import timezone
-                now = timezone.now()
-                
-                if meeting.end_time and now > meeting.end_time:
-                    calculated_status = 'ended'
-                elif now >= meeting.start_time:
-                    if meeting.duration:
-                        estimated_end = meeting.start_time + timezone.timedelta(minutes=meeting.duration)
-                        if now > estimated_end:
-                            calculated_status = 'ended'
-                        else:
-                            calculated_status = 'started'
-                    else:
-                        calculated_status = 'started'
-                else:
-                    calculated_status = 'scheduled'
+            calculated_status = calculate_meeting_status(
+                meeting.status, meeting.start_time, meeting.end_time, meeting.duration,
+            )
 
             # Format host data based on your CustomUser model
             host_data = None
@@ -416,13 +431,43 @@ class MeetingDetailsView(APIView):
                 'updated_at': meeting.updated_at.isoformat(),
             }
 
-            return Response(meeting_data)
+            recordings_updated_at = max((rec.updated_at for rec in meeting.recordings.all()), default=None)
+            transcript_updated_at = transcript.updated_at if transcript else None
+            etag = meeting_details_etag(
+                meeting.pk, meeting.updated_at, calculated_status, transcript_updated_at, recordings_updated_at, include,
+            )
+            last_modified = max(filter(None, (meeting.updated_at, transcript_updated_at, recordings_updated_at)))
+            return set_validators(Response(meeting_data), etag=etag, last_modified=last_modified)
             
         except Exception as e:
             return Response({
                 'error': f'Failed to retrieve meeting details: {str(e)}'
             }, status=500)
 
+    def check_not_modified(self, request, meeting_id, include):
+        validators = (
+            Meeting.objects
+            .filter(meeting_id=meeting_id)
+            .values('pk', 'updated_at', 'status', 'start_time', 'end_time', 'duration', 'transcript__updated_at')
+            .annotate(recordings_updated_at=Max('recordings__updated_at'))
+            .first()
+        )
+        if not validators:
+            return None
+
+        calculated_status = calculate_meeting_status(
+            validators['status'], validators['start_time'], validators['end_time'], validators['duration'],
+        )
+        etag = meeting_details_etag(
+            validators['pk'], validators['updated_at'], calculated_status,
+            validators['transcript__updated_at'], validators['recordings_updated_at'], include,
+        )
+        last_modified = max(filter(None, (
+            validators['updated_at'], validators['transcript__updated_at'], validators['recordings_updated_at'],
+        )))
+        return not_modified(request, etag=etag, last_modified=last_modified)
+
+
 # @method_decorator(csrf_exempt, name='dispatch')
 # class ZoomWebhookView(View):
 
@@ -0,0 +1,269 @@
+"""
+Out-of-band processing of Zoom webhooks.
+
+ZoomWebhookView only stores each delivery as a WebhookEvent; drain_inbox()
+(run by `python manage.py process_webhooks`) claims due events and runs the
+matching handler, retrying failures with exponential backoff. Slow
+follow-up work gets an event of its own (meeting.participants), so its
+retries don't hold up or fail the delivery that queued it.
+"""
+import hashlib
+import logging
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from actionboard_back import metrics
+from actionboard_back.utils import retry_delay
+from integrations.models import OAuthToken
+from integrations.zoom_client import ZoomAPIClient
+from integrations.zoom_participants import ParticipantsNotReady, ingest_participants
+from meetings.models import Meeting, Recording, WebhookEvent
+from transcripts.action_items import extract_action_items
+from transcripts.jobs import save_transcript
+
+logger = logging.getLogger(__name__)
+
+
+def dedup_key_for(data):
+    """
+    Identity of a Zoom delivery: the same event for the same meeting
+    instance at the same event timestamp is a redelivery.
+    """
+    obj = (data.get("payload") or {}).get("object") or {}
+    meeting_uuid = obj.get("uuid") or obj.get("id")
+    event_ts = data.get("event_ts")
+    if meeting_uuid is None or event_ts is None:
+        return None
+    return hashlib.sha256(f"{data.get('event')}|{meeting_uuid}|{event_ts}".encode()).hexdigest()
+
+
+def record_webhook_event(data, provider="zoom"):
+    """
+    Append a delivery to the inbox unless it's a replay of one we've already
+    accepted. Replays are usually rejected by the cache without a query; the
+    unique dedup_key column catches the rest (other processes, evictions).
+    Returns the new WebhookEvent, or None for a duplicate.
+    """
+    key = dedup_key_for(data)
+    cache_key = f"webhook-dedup:{key}"
+    if key and not cache.add(cache_key, 1, timeout=settings.WEBHOOK_DEDUP_TTL):
+        metrics.incr("webhooks.duplicates")
+        return None
+
+    try:
+        with transaction.atomic():
+            webhook_event = WebhookEvent.objects.create(
+                provider=provider, event=data["event"], payload=data, dedup_key=key,
+            )
+    except IntegrityError:
+        metrics.incr("webhooks.duplicates")
+        return None
+    except Exception:
+        # Don't let a failed insert mark the delivery as seen.
+        if key:
+            cache.delete(cache_key)
+        raise
+
+    metrics.incr("webhooks.received")
+    return webhook_event
+
+
+def purge_expired_events():
+    """
+    Drop processed events older than WEBHOOK_DEDUP_TTL; failed events are
+    kept for inspection. Returns the number of rows deleted.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.WEBHOOK_DEDUP_TTL)
+    deleted, _ = WebhookEvent.objects.filter(status=WebhookEvent.STATUS_DONE, received_at__lt=cutoff).delete()
+    if deleted:
+        metrics.incr("webhooks.purged", deleted)
+    return deleted
+
+
+def handle_meeting_ended(payload):
+    meeting_id = payload["payload"]["object"]["id"]
+
+    meeting = Meeting.objects.filter(meeting_id=str(meeting_id)).first()
+    if meeting:
+        meeting.status = "ended"
+        meeting.end_time = parse_datetime(payload["payload"]["object"]["end_time"])
+        meeting.save()
+        queue_followup(payload, "meeting.participants")
+
+
+def queue_followup(payload, event):
+    """
+    Append `event` for the same meeting instance to the inbox, to run and
+    retry apart from the delivery being handled. A redelivery of that one
+    queues nothing new, as the follow-up's dedup_key is derived from it.
+    """
+    data = {**payload, "event": event}
+    try:
+        with transaction.atomic():
+            WebhookEvent.objects.create(event=event, payload=data, dedup_key=dedup_key_for(data))
+    except IntegrityError:
+        pass
+
+
+def handle_meeting_participants(payload):
+    meeting_id = payload["payload"]["object"]["id"]
+    meeting = Meeting.objects.filter(meeting_id=str(meeting_id)).first()
+    if meeting:
+        # Raises until Zoom has the participants report, so the inbox retries with backoff.
+        ingest_participants(meeting, payload["payload"]["object"].get("uuid") or meeting_id)
+
+
+def handle_recording_completed(payload):
+    meeting_id = payload["payload"]["object"]["id"]
+    recording_files = payload["payload"]["object"]["recording_files"]
+    meeting = Meeting.objects.filter(meeting_id=str(meeting_id)).first()
+    if not meeting or not recording_files:
+        return
+
+    # A constant number of queries however many files the recording has.
+    with transaction.atomic():
+        Recording.objects.upsert_from_zoom(meeting, recording_files)
+        meeting.recording_ready = True
+        meeting.save(update_fields=['recording_ready', 'updated_at'])
+
+    # Transcript downloads happen outside the transaction.
+    for rec in recording_files:
+        if rec.get("file_type") in ["TIMELINE_TRANSCRIPT", "TRANSCRIPT"]:
+            save_zoom_transcript(meeting, rec.get("download_url"))
+
+
+def save_zoom_transcript(meeting, transcript_url):
+    if not meeting.host:
+        return
+    try:
+        client = ZoomAPIClient.for_user(meeting.host)
+    except OAuthToken.DoesNotExist:
+        logger.warning("Zoom not connected for the host of meeting %s", meeting.meeting_id)
+        return
+
+    transcript_response = client.download(transcript_url)
+    # Raising lets the inbox retry the event with backoff.
+    transcript_response.raise_for_status()
+
+    # Stored like an AssemblyAI result so the utterances become searchable.
+    transcript = save_transcript(meeting, transcript_response.text, {"utterances": parse_vtt(transcript_response.text)})
+    extract_action_items(transcript)
+
+
+VTT_CUE = re.compile(r"(\d+:\d{2}:\d{2}\.\d{3}) --> (\d+:\d{2}:\d{2}\.\d{3})[^\n]*\n(.+?)(?:\n\s*\n|\Z)", re.S)
+
+
+def _vtt_seconds(timestamp):
+    hours, minutes, seconds = timestamp.split(":")
+    return round(int(hours) * 3600 + int(minutes) * 60 + float(seconds), 2)
+
+
+def parse_vtt(text):
+    """
+    Utterances from Zoom's WebVTT transcript, whose cues read
+    "Speaker Name: what was said". Returns [] for anything else.
+    """
+    utterances = []
+    for start, end, body in VTT_CUE.findall(text or ""):
+        body = " ".join(line.strip() for line in body.splitlines()).strip()
+        speaker, separator, said = body.partition(": ")
+        if not separator:
+            speaker, said = "", body
+        utterances.append({
+            "speaker": speaker,
+            "start": _vtt_seconds(start),
+            "end": _vtt_seconds(end),
+            "text": said,
+        })
+    return utterances
+
+
+HANDLERS = {
+    "meeting.ended": handle_meeting_ended,
+    "meeting.participants": handle_meeting_participants,
+    "recording.completed": handle_recording_completed,
+}
+
+
+def claim_events(worker_id, batch_size=50):
+    """
+    Claim up to batch_size due events for this worker. Events left in
+    processing by a worker that died are picked up again once their lock
+    is older than WEBHOOK_LOCK_TIMEOUT.
+    """
+    now = timezone.now()
+    WebhookEvent.objects.filter(
+        status=WebhookEvent.STATUS_PROCESSING,
+        locked_at__lt=now - timedelta(seconds=settings.WEBHOOK_LOCK_TIMEOUT),
+    ).update(status=WebhookEvent.STATUS_PENDING, locked_by='')
+
+    with transaction.atomic():
+        event_ids = list(
+            WebhookEvent.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=WebhookEvent.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        WebhookEvent.objects.filter(pk__in=event_ids, status=WebhookEvent.STATUS_PENDING).update(
+            status=WebhookEvent.STATUS_PROCESSING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+
+    return list(WebhookEvent.objects.filter(
+        pk__in=event_ids, status=WebhookEvent.STATUS_PROCESSING, locked_by=worker_id,
+    ).order_by('received_at'))
+
+
+def process_event(webhook_event):
+    handler = HANDLERS.get(webhook_event.event)
+    try:
+        if handler:
+            handler(webhook_event.payload)
+    except ParticipantsNotReady as e:
+        # Expected while Zoom builds the report; not worth a traceback.
+        logger.info("Webhook event %s (%s) will be retried: %s", webhook_event.pk, webhook_event.event, e)
+        return schedule_retry(webhook_event, e)
+    except Exception as e:
+        logger.exception("Webhook event %s (%s) failed", webhook_event.pk, webhook_event.event)
+        return schedule_retry(webhook_event, e)
+
+    webhook_event.status = WebhookEvent.STATUS_DONE
+    webhook_event.last_error = ''
+    webhook_event.processed_at = timezone.now()
+    webhook_event.save(update_fields=['status', 'last_error', 'processed_at'])
+    return True
+
+
+def schedule_retry(webhook_event, e):
+    """Put a failed event back in the inbox with backoff, or fail it for good. Returns False."""
+    webhook_event.last_error = str(e)
+    webhook_event.locked_by = ''
+    if webhook_event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+        webhook_event.status = WebhookEvent.STATUS_FAILED
+    else:
+        webhook_event.status = WebhookEvent.STATUS_PENDING
+        webhook_event.next_attempt_at = timezone.now() + retry_delay(
+            webhook_event.attempts, settings.WEBHOOK_RETRY_BASE_DELAY, settings.WEBHOOK_RETRY_MAX_DELAY,
+        )
+    webhook_event.save(update_fields=['status', 'last_error', 'locked_by', 'next_attempt_at'])
+    return False
+
+
+def drain_inbox(worker_id, batch_size=50):
+    """
+    Process one batch of due events. Returns the number of events handled.
+    """
+    events = claim_events(worker_id, batch_size=batch_size)
+    for webhook_event in events:
+        process_event(webhook_event)
+    return len(events)
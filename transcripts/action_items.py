@@ -0,0 +1,298 @@
+"""
+Action item extraction stage of the transcription pipeline.
+
+Rule-based extractors read the diarized utterances and the summary text
+and propose action items; everything runs in-process. Assignees are
+resolved against the members of the meeting's organisation, deadlines like
+"by Friday" or "next week" are resolved relative to the meeting date.
+
+Every extracted item carries a fingerprint of its content and assignee, so
+re-transcribing a meeting doesn't duplicate items: save_action_items() adds
+the new ones, keeps the ones that are still there, and drops pending ones
+that no longer appear.
+
+Pick extractors with the ACTION_ITEM_EXTRACTORS setting, any of
+"commitments", "assignments" and "summary".
+"""
+import calendar
+import hashlib
+import logging
+import re
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from organisations.models import OrganisationMembership
+from transcripts.models import ActionItem
+
+logger = logging.getLogger(__name__)
+
+# One proposed item. `assignee` is a name as spoken, `start_ms` is None for
+# items that come from the summary.
+Candidate = namedtuple('Candidate', 'content assignee start_ms')
+
+MAX_CONTENT_LENGTH = 500
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+WEEKDAYS = {name.lower(): index for index, name in enumerate(calendar.day_name)}
+MONTHS = {name.lower(): index for index, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): index for index, name in enumerate(calendar.month_abbr) if name})
+
+
+def sentences(text):
+    return [s.strip() for s in SENTENCE_SPLIT.split(text or "") if s.strip()]
+
+
+def clean_task(task):
+    task = task.strip().rstrip('.!?,;').strip()
+    return task[:1].upper() + task[1:MAX_CONTENT_LENGTH]
+
+
+class CommitmentExtractor:
+    """
+    First-person commitments: the speaker is the assignee, when the speaker
+    is a name (Zoom's transcripts). AssemblyAI's diarization labels ("A",
+    "B") say nothing about who spoke and can change between runs, so those
+    items are left unassigned.
+    """
+    name = "commitments"
+
+    SPEAKER_LABEL = re.compile(r"^(?:[A-Z]{1,2}|[Ss]peaker ?\d+)$")
+
+    PATTERN = re.compile(
+        r"\b(?:I(?:'ll| will| shall|'m going to| am going to)|let me)\s+(?P<task>.+)",
+        re.IGNORECASE,
+    )
+    # "I'll be honest", "I'll think about it" and the like are not tasks.
+    FILLERS = re.compile(r"^(?:also|then|just|definitely|quickly|go ahead and)\s+", re.IGNORECASE)
+    NOT_TASKS = ("be ", "think", "know", "try to remember", "let you know if", "say ", "admit", "guess", "see ")
+
+    def extract(self, utterances, summary_text):
+        for speaker, start_ms, text in utterances:
+            for sentence in sentences(text):
+                match = self.PATTERN.search(sentence)
+                if not match:
+                    continue
+                task = self.FILLERS.sub("", match.group('task'))
+                if len(task.split()) < 2 or task.lower().startswith(self.NOT_TASKS):
+                    continue
+                yield Candidate(clean_task(task), self.assignee(speaker), start_ms)
+
+    def assignee(self, speaker):
+        speaker = (speaker or "").strip()
+        if not speaker or self.SPEAKER_LABEL.match(speaker):
+            return None
+        return speaker
+
+
+class AssignmentExtractor:
+    """
+    Tasks handed to someone by name: "Bob, can you send the deck?",
+    "Bob will send the deck", "Action item for Bob: send the deck".
+    """
+    name = "assignments"
+
+    NAME = r"(?P<name>[A-Z][\w'-]+(?: [A-Z][\w'-]+)?)"
+    PATTERNS = (
+        re.compile(rf"^{NAME},? (?:can|could|would) you (?:please )?(?P<task>.+?)\??$"),
+        re.compile(rf"^(?:action item|todo|to-do) (?:for|to) {NAME}\s*[:,-]\s*(?P<task>.+)$", re.IGNORECASE),
+        re.compile(rf"^{NAME} (?:will|is going to|needs to|should) (?P<task>.+)$"),
+    )
+    # Capitalised words that start sentences but aren't people.
+    NOT_NAMES = frozenset("""
+        I We You They He She It This That There Then So And But Also Someone Everyone Nobody Who What
+        Which Where When Why How Let Please Maybe Okay Ok Yes No Next Today Tomorrow
+    """.split())
+
+    def match(self, sentence):
+        for pattern in self.PATTERNS:
+            match = pattern.match(sentence)
+            if match and match.group('name').split()[0] not in self.NOT_NAMES:
+                return match.group('name'), match.group('task')
+        return None
+
+    def extract(self, utterances, summary_text):
+        for speaker, start_ms, text in utterances:
+            for sentence in sentences(text):
+                found = self.match(sentence)
+                if found:
+                    yield Candidate(clean_task(found[1]), found[0], start_ms)
+
+
+class SummaryExtractor:
+    """
+    Bullets of the summary text that read like assignments, e.g. the
+    provider's "- Bob will send the revised numbers by Friday."
+    """
+    name = "summary"
+
+    def __init__(self):
+        self.assignments = AssignmentExtractor()
+
+    def extract(self, utterances, summary_text):
+        for line in (summary_text or "").splitlines():
+            line = line.strip().lstrip('-*• ').strip()
+            for sentence in sentences(line):
+                found = self.assignments.match(sentence)
+                if found:
+                    yield Candidate(clean_task(found[1]), found[0], None)
+
+
+EXTRACTORS = {
+    cls.name: cls for cls in (CommitmentExtractor, AssignmentExtractor, SummaryExtractor)
+}
+
+
+def get_extractors(names=None):
+    names = names if names is not None else settings.ACTION_ITEM_EXTRACTORS
+    try:
+        return [EXTRACTORS[name]() for name in names]
+    except KeyError as e:
+        raise ValueError(f"Unknown action item extractor {e}, expected any of: {', '.join(EXTRACTORS)}")
+
+
+class MemberDirectory:
+    """
+    Resolves spoken names ("Bob", "Bob Smith", "bob@example.com") to members
+    of an organisation. Loads the members once, in one query.
+    """
+
+    def __init__(self, organisation_id):
+        self.by_key = {}
+        ambiguous = set()
+        memberships = OrganisationMembership.objects.filter(organisation_id=organisation_id).select_related('user')
+        for membership in memberships:
+            user = membership.user
+            first, last = (user.first_name or '').strip(), (user.last_name or '').strip()
+            keys = {user.email.lower(), user.email.split('@')[0].lower()}
+            if first:
+                keys.add(first.lower())
+                if last:
+                    keys.add(f"{first} {last}".lower())
+            for key in keys:
+                if key in self.by_key and self.by_key[key] != user:
+                    ambiguous.add(key)
+                self.by_key[key] = user
+        for key in ambiguous:
+            del self.by_key[key]
+
+    def resolve(self, name):
+        if not name:
+            return None
+        name = " ".join(name.split()).lower()
+        return self.by_key.get(name) or self.by_key.get(name.split()[0])
+
+
+def parse_due_date(text, reference):
+    """
+    The deadline mentioned in `text`, relative to the date `reference`,
+    or None when there isn't one.
+    """
+    text = text.lower()
+    if re.search(r"\b(?:today|tonight|end of (?:the )?day|eod)\b", text):
+        return reference
+    if re.search(r"\btomorrow\b", text):
+        return reference + timedelta(days=1)
+    if re.search(r"\bend of (?:the )?week\b|\beow\b", text):
+        return reference + timedelta(days=(4 - reference.weekday()) % 7)
+    if re.search(r"\bnext week\b", text):
+        return reference + timedelta(days=7 - reference.weekday())
+    if re.search(r"\bend of (?:the )?month\b", text):
+        return reference.replace(day=calendar.monthrange(reference.year, reference.month)[1])
+
+    match = re.search(r"\bin (\d+|a|an|one|two|three) (day|week)s?\b", text)
+    if match:
+        count = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3}.get(match.group(1)) or int(match.group(1))
+        return reference + timedelta(days=count * (7 if match.group(2) == "week" else 1))
+
+    match = re.search(r"\b(?:by|on|before|until|next|this) (" + "|".join(WEEKDAYS) + r")\b", text)
+    if match:
+        days_ahead = (WEEKDAYS[match.group(1)] - reference.weekday()) % 7 or 7
+        return reference + timedelta(days=days_ahead)
+
+    match = re.search(r"\b(" + "|".join(MONTHS) + r")\.? (\d{1,2})(?:st|nd|rd|th)?\b", text)
+    if match:
+        month, day = MONTHS[match.group(1)], int(match.group(2))
+        year = reference.year + (1 if month < reference.month else 0)
+        try:
+            return reference.replace(year=year, month=month, day=day)
+        except ValueError:
+            return None
+    return None
+
+
+def fingerprint(content, assignee_key):
+    normalized = " ".join(re.findall(r"\w+", content.lower()))
+    return hashlib.sha1(f"{assignee_key}|{normalized}".encode()).hexdigest()
+
+
+def build_action_items(meeting, utterances, summary_text, extractors=None, directory=None):
+    """
+    Run the extractors and turn their candidates into unsaved ActionItems,
+    one per fingerprint, in the order they were said.
+    """
+    extractors = extractors if extractors is not None else get_extractors()
+    directory = directory or MemberDirectory(meeting.organisation_id)
+    reference = timezone.localdate(meeting.start_time) if meeting.start_time else timezone.localdate()
+    default_due = reference + timedelta(days=settings.ACTION_ITEM_DEFAULT_DUE_DAYS)
+
+    items = {}
+    for extractor in extractors:
+        for candidate in extractor.extract(utterances, summary_text):
+            user = directory.resolve(candidate.assignee)
+            key = fingerprint(candidate.content, user.pk if user else (candidate.assignee or '').lower())
+            if key in items:
+                continue
+            items[key] = ActionItem(
+                meeting=meeting,
+                assigned_to=user,
+                content=candidate.content,
+                due_date=parse_due_date(candidate.content, reference) or default_due,
+                fingerprint=key,
+                start_ms=candidate.start_ms,
+            )
+    return sorted(items.values(), key=lambda item: (item.start_ms is None, item.start_ms or 0))
+
+
+@transaction.atomic
+def save_action_items(meeting, items):
+    """
+    Make the meeting's extracted items match `items`: create new ones in
+    one bulk insert, keep existing ones (and whatever was done to them), and
+    delete pending ones that the latest transcript no longer yields.
+    Manually created items (no fingerprint) are never touched.
+    """
+    wanted = {item.fingerprint: item for item in items}
+    extracted = ActionItem.objects.filter(meeting=meeting).exclude(fingerprint='')
+
+    stale = extracted.filter(status='pending').exclude(fingerprint__in=wanted.keys())
+    removed, _ = stale.delete()
+
+    existing = set(extracted.filter(fingerprint__in=wanted.keys()).values_list('fingerprint', flat=True))
+    # ignore_conflicts: a concurrent run may have inserted the same items.
+    created = ActionItem.objects.bulk_create(
+        [item for key, item in wanted.items() if key not in existing],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    return created, removed
+
+
+def extract_action_items(transcript, extractors=None):
+    """
+    Extraction stage: read the transcript's utterances and summary, and
+    store the resulting action items for its meeting.
+    """
+    meeting = transcript.meeting
+    utterances = list(transcript.utterances.order_by('start_ms').values_list('speaker', 'start_ms', 'text'))
+    summary = transcript.summary if isinstance(transcript.summary, dict) else {}
+    items = build_action_items(meeting, utterances, summary.get('summary_text') or '', extractors=extractors)
+    created, removed = save_action_items(meeting, items)
+    logger.info(
+        "Meeting %s: %d action items extracted, %d new, %d stale removed",
+        meeting.meeting_id, len(items), len(created), removed,
+    )
+    return items
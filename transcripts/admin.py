@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Transcript, ActionItem
+from .models import Transcript, ActionItem, TranscriptionJob
 
 @admin.register(Transcript)
 class TranscriptAdmin(admin.ModelAdmin):
@@ -12,3 +12,11 @@ class ActionItemAdmin(admin.ModelAdmin):
     list_display = ('meeting', 'assigned_to', 'content', 'due_date', 'status')
     list_filter = ('status', 'due_date')
     search_fields = ('content', 'assigned_to__email')
+
+
+@admin.register(TranscriptionJob)
+class TranscriptionJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'meeting', 'requested_by', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('meeting__meeting_id', 'meeting__topic', 'requested_by__email')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'updated_at', 'heartbeat_at', 'worker_id')
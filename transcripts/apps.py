@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class TranscriptsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'transcripts'
+
+    def ready(self):
+        from transcripts.search import repair_search_index
+
+        post_migrate.connect(repair_search_index, sender=self)
@@ -1,45 +1,39 @@
+import logging
+import tempfile
 import time
+from urllib.parse import urlparse
+
 import requests
-import os
+from integrations import http_client, rate_limit, tokens
 from integrations.models import OAuthToken
-from django.utils import timezone
+from integrations.zoom_client import ZoomAPIClient
 from rest_framework.response import Response
 from django.conf import settings
-import assemblyai as aai
+from transcripts.summarizers import get_summarizer
+
 
+logger = logging.getLogger(__name__)
 
-ASSEMBLYAI_API_KEY = "b9d094c60c6a4aa78fd4d54feadc7d73"
-ASSEMBLYAI_ENDPOINT = "https://api.assemblyai.com/v2"
 
-headers = {
-    "authorization": settings.ASSEMBLYAI_API_KEY,
-    "content-type": "application/json"
-}
+def assemblyai_headers():
+    return {"authorization": settings.ASSEMBLYAI_API_KEY}
 
-aai.settings.api_key = ASSEMBLYAI_API_KEY
 
-def transcribe_recording_with_secure_url(meeting_id, user):
+def transcribe_recording_with_secure_url(meeting_id, user, on_stage=None):
     """
     Downloads fresh Zoom audio recording, uploads to AssemblyAI for transcription,
     and returns (transcript_text, summary).
+    on_stage, if given, is called with the name of each stage as it starts
+    (downloading, uploading, transcribing, summarizing).
     """
-    # 1️⃣ Get Zoom OAuth token for the user
+    on_stage = on_stage or (lambda stage: None)
+
+    # 1️⃣ Get the recordings with the user's Zoom OAuth token
     try:
-        oauth_token = OAuthToken.objects.get(user=user, provider='zoom')
+        client = ZoomAPIClient.for_user(user)
     except OAuthToken.DoesNotExist:
         raise Exception("Zoom OAuth token not found for user.")
-
-    if oauth_token.expires_at <= timezone.now():
-        if not refresh_zoom_token(oauth_token):
-            raise Exception("Failed to refresh Zoom token")
-
- 
-    recordings_resp = requests.get(
-        f"https://api.zoom.us/v2/meetings/{meeting_id}/recordings",
-        headers={"Authorization": f"Bearer {oauth_token.access_token}"}
-    )
-    recordings_resp.raise_for_status()
-    recordings_data = recordings_resp.json()
+    recordings_data = client.get_meeting_recordings(meeting_id)
 
     audio_file = next(
         (f for f in recordings_data.get('recording_files', [])
@@ -50,21 +44,25 @@ def transcribe_recording_with_secure_url(meeting_id, user):
         raise Exception("No audio recording found for this meeting.")
 
 
-    download_url = f"{audio_file['download_url']}?access_token={oauth_token.access_token}"
-
-
-    local_audio_file = 'audio_file.m4a'
-    download_audio_to_file(download_url, local_audio_file)
-
-
-    assemblyai_audio_url = upload_audio_file_to_assemblyai(local_audio_file)
-
-
-    transcript_text, summary, utterances = transcribe_with_assembly_ai(assemblyai_audio_url)
-
+    # The download is streamed by the relay, outside the client, so take its token here.
+    rate_limit.bucket_for(client.account_id, urlparse(audio_file['download_url']).path).wait()
+    access_token = client.oauth_token.access_token
+    try:
+        assemblyai_audio_url = relay_audio_to_assemblyai(
+            f"{audio_file['download_url']}?access_token={access_token}", on_stage=on_stage,
+        )
+    except requests.HTTPError as e:
+        # Only a rejected Zoom token is worth another try, not an AssemblyAI error.
+        if e.response is None or e.response.status_code != 401 or e.response.url.startswith(settings.ASSEMBLYAI_ENDPOINT):
+            raise
+        access_token = tokens.reauthorize(user, access_token)
+        assemblyai_audio_url = relay_audio_to_assemblyai(
+            f"{audio_file['download_url']}?access_token={access_token}", on_stage=on_stage,
+        )
 
 
-    os.remove(local_audio_file)
+    on_stage("transcribing")
+    transcript_text, summary, utterances = transcribe_with_assembly_ai(assemblyai_audio_url, on_stage=on_stage)
 
     return transcript_text, {
         "summary_text": summary,
@@ -80,193 +78,127 @@ def transcribe_recording_with_secure_url(meeting_id, user):
     }
 
 
-def download_audio_to_file(audio_url, output_file):
-    with requests.get(audio_url, stream=True) as r:
+def relay_audio_to_assemblyai(download_url, chunk_size=None, on_stage=None):
+    """
+    Streams the Zoom download straight into the AssemblyAI upload request
+    body, so the recording never touches the disk and memory use is bounded
+    by the chunk size rather than the recording size.
+    If the relay breaks part way (the stream can't be replayed), the
+    recording is downloaded again into a spooled temp file owned by this
+    call and uploaded from there. Errors before the relay starts (the
+    download request itself) and HTTP error responses are raised as they
+    are, since a second download would only fail the same way.
+    Returns the AssemblyAI upload_url.
+    """
+    on_stage = on_stage or (lambda stage: None)
+    chunk_size = chunk_size or settings.AUDIO_RELAY_CHUNK_SIZE
+
+    on_stage("downloading")
+    with http_client.get(download_url, stream=True) as r:
         r.raise_for_status()
-        with open(output_file, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                f.write(chunk)
-
-
-def upload_audio_file_to_assemblyai(file_path):
-    headers = {"authorization": ASSEMBLYAI_API_KEY}
-    with open(file_path, 'rb') as f:
-        upload_resp = requests.post(
-            f"{ASSEMBLYAI_ENDPOINT}/upload",
-            headers=headers,
-            data=f
-        )
+        on_stage("uploading")
+        try:
+            return upload_audio_to_assemblyai(r.iter_content(chunk_size=chunk_size))
+        except requests.HTTPError:
+            raise
+        except requests.RequestException as e:
+            logger.warning("Streaming audio relay failed (%s), retrying through a spooled temp file", e)
+
+    with tempfile.SpooledTemporaryFile(max_size=settings.AUDIO_RELAY_SPOOL_MAX_MEMORY) as spool:
+        on_stage("downloading")
+        download_audio_to_file(download_url, spool, chunk_size=chunk_size)
+        spool.seek(0)
+        on_stage("uploading")
+        return upload_audio_to_assemblyai(spool)
+
+
+def download_audio_to_file(audio_url, output_file, chunk_size=None):
+    chunk_size = chunk_size or settings.AUDIO_RELAY_CHUNK_SIZE
+    with http_client.get(audio_url, stream=True) as r:
+        r.raise_for_status()
+        for chunk in r.iter_content(chunk_size=chunk_size):
+            output_file.write(chunk)
+
+
+def upload_audio_to_assemblyai(data):
+    """
+    Upload audio to AssemblyAI. data can be a file object or an iterator of
+    byte chunks (sent with chunked transfer encoding).
+    """
+    upload_resp = http_client.post(
+        f"{settings.ASSEMBLYAI_ENDPOINT}/upload",
+        headers=assemblyai_headers(),
+        data=data,
+        timeout=(settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_UPLOAD_READ_TIMEOUT),
+        # A streamed body can't be replayed; the caller falls back to a spooled file instead.
+        retries=hasattr(data, 'seek'),
+    )
     upload_resp.raise_for_status()
     return upload_resp.json().get('upload_url')
 
 
 
-def transcribe_with_assembly_ai(audio_url, poll_interval=5, timeout=600):
+def start_transcript(audio_url, **options):
     """
-    Transcribes audio from AssemblyAI using both:
-    - REST API: to get diarized utterances
-    - SDK: to get transcript text + summary
-    Returns: (full_text, summary_text, utterances_list)
+    Submit one AssemblyAI transcription job and return its id.
     """
-    import requests
-
-    # REST API: Start transcription with speaker labels
-    headers = {"authorization": ASSEMBLYAI_API_KEY}
-    start_resp = requests.post(
-        f"{ASSEMBLYAI_ENDPOINT}/transcript",
-        headers=headers,
-        json={
-            "audio_url": audio_url,
-            "speaker_labels": True
-        }
+    start_resp = http_client.post(
+        f"{settings.ASSEMBLYAI_ENDPOINT}/transcript",
+        headers=assemblyai_headers(),
+        json={"audio_url": audio_url, **options}
     )
     start_resp.raise_for_status()
-    transcript_id = start_resp.json()['id']
+    return start_resp.json()['id']
+
 
-    # Polling loop
+def wait_for_transcript(transcript_id, poll_interval=5, timeout=600):
+    """
+    Poll a transcription job until it completes and return the job payload.
+    """
     total_wait = 0
     while total_wait < timeout:
-        poll_resp = requests.get(
-            f"{ASSEMBLYAI_ENDPOINT}/transcript/{transcript_id}",
-            headers=headers
+        poll_resp = http_client.get(
+            f"{settings.ASSEMBLYAI_ENDPOINT}/transcript/{transcript_id}",
+            headers=assemblyai_headers()
         )
         poll_resp.raise_for_status()
         data = poll_resp.json()
         if data['status'] == 'completed':
-            diarized_utterances = data.get('utterances', [])
-            full_text = data.get('text', '')
-            break
+            return data
         elif data['status'] == 'error':
             raise Exception(f"AssemblyAI transcription error: {data.get('error')}")
         time.sleep(poll_interval)
         total_wait += poll_interval
-    else:
-        raise TimeoutError("AssemblyAI REST transcription timed out")
-
-    # SDK: Fetch summary separately using same audio_url
-    config = aai.TranscriptionConfig(
-        summarization=True,
-        summary_model=aai.SummarizationModel.informative,
-        summary_type=aai.SummarizationType.bullets
-    )
-    transcriber = aai.Transcriber()
-    summary_transcript = transcriber.transcribe(audio_url, config=config)
 
-    # Poll for summary
-    total_wait = 0
-    while summary_transcript.status not in ['completed', 'error']:
-        if total_wait > timeout:
-            raise TimeoutError("AssemblyAI SDK transcription timed out")
-        time.sleep(poll_interval)
-        summary_transcript.refresh()
-        total_wait += poll_interval
+    raise TimeoutError("AssemblyAI transcription timed out")
+
+
+def transcribe_with_assembly_ai(audio_url, poll_interval=5, timeout=600, on_stage=None, summarizer=None):
+    """
+    Transcribes audio with a single AssemblyAI job that returns the text,
+    the diarized utterances and (when the summarizer wants it) the summary.
+    The summary stage itself is delegated to the summarizer, see
+    transcripts.summarizers.
+    Returns: (full_text, summary_text, utterances_list)
+    """
+    on_stage = on_stage or (lambda stage: None)
+    summarizer = summarizer or get_summarizer()
+
+    options = {"speaker_labels": True}
+    if summarizer.uses_provider_summary:
+        options.update({
+            "summarization": True,
+            "summary_model": "informative",
+            "summary_type": "bullets",
+        })
+
+    transcript_id = start_transcript(audio_url, **options)
+    data = wait_for_transcript(transcript_id, poll_interval=poll_interval, timeout=timeout)
+
+    full_text = data.get('text') or ''
+    diarized_utterances = data.get('utterances') or []
+
+    on_stage("summarizing")
+    summary = summarizer.summarize(full_text, diarized_utterances, provider_summary=data.get('summary'))
 
-    if summary_transcript.status == 'error':
-        raise Exception(f"AssemblyAI summary transcription error: {summary_transcript.error}")
-
-    return full_text, summary_transcript.summary, diarized_utterances
-
-
-
-# def transcribe_with_assembly_ai(audio_url, poll_interval=5, timeout=600):
-#     """
-#     Transcribe audio URL with AssemblyAI SDK and get both transcript and summary.
-#     """
-#     # Configure transcription with summarization
-#     config = aai.TranscriptionConfig(
-#         summarization=True,
-#         summary_model=aai.SummarizationModel.informative,  # or 'conversational'
-#         summary_type=aai.SummarizationType.bullets          # or 'paragraph', 'headline'
-#     )
-    
-#     transcriber = aai.Transcriber()
-    
-#     # Start transcription (using public URL)
-#     transcript = transcriber.transcribe(audio_url, config=config)
-    
-#     # Wait for completion (polling)
-#     total_wait = 0
-#     while transcript.status not in ['completed', 'error']:
-#         if total_wait > timeout:
-#             raise TimeoutError("AssemblyAI transcription timed out")
-#         time.sleep(poll_interval)
-#         transcript.refresh()  # refresh the status
-#         total_wait += poll_interval
-    
-#     if transcript.status == 'error':
-#         raise Exception(f"AssemblyAI transcription error: {transcript.error}")
-    
-#     # transcript.text -> full transcript text
-#     # transcript.summary -> summary string (bullets or paragraph depending on config)
-#     return transcript.text, transcript.summary
-
-
-# def transcribe_with_assembly_ai(audio_url, poll_interval=5, timeout=600):
-#     headers = {
-#         "authorization": ASSEMBLYAI_API_KEY
-#     }
-#     transcript_request = {
-#         "audio_url": audio_url,
-#         # "auto_chapters": True,
-#         # "summary_enabled": True,
-#         # "summary_model": "general",
-#         # "summary_type": "bullets"
-#     }
-
-#     response = requests.post(
-#         f"{ASSEMBLYAI_ENDPOINT}/transcript",
-#         json=transcript_request,
-#         headers=headers
-#     )
-#     response.raise_for_status()
-#     transcript_id = response.json()["id"]
-
-#     total_wait = 0
-#     while total_wait < timeout:
-#         poll_resp = requests.get(
-#             f"{ASSEMBLYAI_ENDPOINT}/transcript/{transcript_id}",
-#             headers=headers
-#         )
-#         poll_resp.raise_for_status()
-#         data = poll_resp.json()
-
-#         if data.get("status") == "completed":
-#             transcript_text = data.get("text", "")
-#             summary_text = data.get("summary", "")  # AssemblyAI text summary
-#             summary = {"text": summary_text}       # Wrap in dict for JSONField
-#             return transcript_text, summary
-
-#         elif data.get("status") == "error":
-#             raise Exception(f"Transcription failed: {data.get('error')}")
-
-#         time.sleep(poll_interval)
-#         total_wait += poll_interval
-
-#     raise TimeoutError("Transcription polling timed out.")
-
-
-
-
-
-
-
-
-def refresh_zoom_token(oauth_token):
-        refresh_url = "https://zoom.us/oauth/token"
-        auth = (settings.ZOOM_CLIENT_ID, settings.ZOOM_CLIENT_SECRET)
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": oauth_token.refresh_token
-        }
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
-
-        resp = requests.post(refresh_url, data=data, headers=headers, auth=auth)
-        if resp.status_code != 200:
-            return False
-
-        token_data = resp.json()
-        oauth_token.access_token = token_data["access_token"]
-        oauth_token.refresh_token = token_data["refresh_token"]
-        oauth_token.expires_at = timezone.now() + timezone.timedelta(seconds=token_data["expires_in"])
-        oauth_token.save()
-        return True
\ No newline at end of file
+    return full_text, summary, diarized_utterances
@@ -0,0 +1,52 @@
+"""
+zlib-compressed model fields for large transcript bodies.
+
+Values are plain str / JSON in Python and compressed bytes in the database.
+"""
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class CompressedField(models.BinaryField):
+    compression_level = 6
+
+    def encode(self, value):
+        raise NotImplementedError
+
+    def decode(self, data):
+        raise NotImplementedError
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.decode(zlib.decompress(value))
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is not None:
+            value = zlib.compress(self.encode(value), self.compression_level)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def to_python(self, value):
+        return value
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+
+class CompressedTextField(CompressedField):
+    def encode(self, value):
+        return value.encode()
+
+    def decode(self, data):
+        return data.decode()
+
+
+class CompressedJSONField(CompressedField):
+    def encode(self, value):
+        return json.dumps(value, cls=DjangoJSONEncoder).encode()
+
+    def decode(self, data):
+        return json.loads(data)
@@ -0,0 +1,183 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from actionboard_back.utils import retry_delay
+from transcripts.action_items import extract_action_items
+from transcripts.assembly_ai import transcribe_recording_with_secure_url
+from transcripts.models import Transcript, TranscriptionJob, TranscriptPassage, Utterance
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_transcription(meeting, user):
+    """
+    Queue a transcription for the meeting and return the job.
+    A meeting that already has an unfinished job gets that job back instead
+    of a duplicate, so repeated clicks don't transcribe the recording twice.
+    Concurrent clicks are settled by the one-unfinished-job-per-meeting
+    constraint.
+    """
+    unfinished = TranscriptionJob.objects.filter(meeting=meeting).exclude(status__in=TranscriptionJob.FINISHED_STATUSES)
+    job = unfinished.first()
+    if job:
+        return job
+    try:
+        with transaction.atomic():
+            return TranscriptionJob.objects.create(meeting=meeting, requested_by=user)
+    except IntegrityError:
+        # Another request queued one in the meantime.
+        return unfinished.get()
+
+
+def claim_next_job(worker_id):
+    """
+    Atomically take the oldest queued job that is due (retries wait out
+    their backoff). Returns None when the queue is empty.
+
+    SKIP LOCKED keeps concurrent workers off the same row on Postgres; the
+    conditional UPDATE is what actually guarantees a single owner, so this is
+    also safe on SQLite where row locks are not available.
+    """
+    while True:
+        with transaction.atomic():
+            job_id = (
+                TranscriptionJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(status=TranscriptionJob.STATUS_QUEUED, next_attempt_at__lte=timezone.now())
+                .order_by('created_at')
+                .values_list('pk', flat=True)
+                .first()
+            )
+            if job_id is None:
+                return None
+
+            now = timezone.now()
+            claimed = TranscriptionJob.objects.filter(
+                pk=job_id, status=TranscriptionJob.STATUS_QUEUED
+            ).update(
+                status=TranscriptionJob.STATUS_DOWNLOADING,
+                worker_id=worker_id,
+                heartbeat_at=now,
+                started_at=now,
+                attempts=F('attempts') + 1,
+                updated_at=now,
+            )
+        if claimed:
+            return TranscriptionJob.objects.select_related('meeting', 'requested_by').get(pk=job_id)
+        # Another worker won the race for this row, try the next one.
+
+
+def set_job_status(job, status, **fields):
+    now = timezone.now()
+    fields.update(status=status, heartbeat_at=now, updated_at=now)
+    TranscriptionJob.objects.filter(pk=job.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(job, name, value)
+
+
+def heartbeat(worker_ids):
+    """
+    Mark the jobs held by these workers as alive.
+    """
+    return TranscriptionJob.objects.filter(
+        worker_id__in=worker_ids,
+        status__in=TranscriptionJob.ACTIVE_STATUSES,
+    ).update(heartbeat_at=timezone.now())
+
+
+def requeue_stale_jobs(stale_after=None, max_attempts=None):
+    """
+    Put jobs whose worker stopped heartbeating (crash, deploy, restart) back
+    on the queue, or fail them once they've used up their attempts.
+    Returns (requeued, failed).
+    """
+    stale_after = stale_after or settings.TRANSCRIPTION_JOB_STALE_AFTER
+    max_attempts = max_attempts or settings.TRANSCRIPTION_JOB_MAX_ATTEMPTS
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+
+    stale = TranscriptionJob.objects.filter(
+        status__in=TranscriptionJob.ACTIVE_STATUSES,
+        heartbeat_at__lt=cutoff,
+    )
+    now = timezone.now()
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=TranscriptionJob.STATUS_FAILED,
+        error="Worker stopped responding",
+        finished_at=now,
+        updated_at=now,
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(
+        status=TranscriptionJob.STATUS_QUEUED,
+        worker_id='',
+        updated_at=now,
+    )
+    return requeued, failed
+
+
+@transaction.atomic
+def save_transcript(meeting, transcript_text, summary):
+    transcript, created = Transcript.objects.get_or_create(
+        meeting=meeting,
+        defaults={
+            "full_transcript": transcript_text,
+            "summary": summary
+        }
+    )
+    if not created:
+        transcript.full_transcript = transcript_text
+        transcript.summary = summary
+        transcript.save()
+        transcript.utterances.all().delete()
+        transcript.passages.all().delete()
+
+    utterances = Utterance.from_summary(transcript, summary.get("utterances") or [])
+    Utterance.objects.bulk_create(utterances, batch_size=500)
+    if not utterances:
+        # Without utterances the text is only searchable through passages.
+        TranscriptPassage.objects.bulk_create(TranscriptPassage.from_text(transcript, transcript_text), batch_size=500)
+    return transcript
+
+
+def run_job(job):
+    """
+    Run a claimed job to completion, recording every stage on the row.
+    A failed attempt is queued again with exponential backoff, like webhook
+    events, until TRANSCRIPTION_JOB_MAX_ATTEMPTS have been used. Once the
+    transcript is saved the job succeeds: a failed action item extraction
+    is only logged, as retrying would pay for the transcription again.
+    """
+    meeting = job.meeting
+    try:
+        transcript_text, summary = transcribe_recording_with_secure_url(
+            meeting.meeting_id,
+            job.requested_by,
+            on_stage=lambda stage: set_job_status(job, stage),
+        )
+        transcript = save_transcript(meeting, transcript_text, summary)
+    except Exception as e:
+        logger.exception("Transcription job %s failed (attempt %s)", job.pk, job.attempts)
+        if job.attempts >= settings.TRANSCRIPTION_JOB_MAX_ATTEMPTS:
+            set_job_status(job, TranscriptionJob.STATUS_FAILED, error=str(e), finished_at=timezone.now())
+        else:
+            set_job_status(
+                job, TranscriptionJob.STATUS_QUEUED, error=str(e), worker_id='',
+                next_attempt_at=timezone.now() + retry_delay(
+                    job.attempts, settings.TRANSCRIPTION_JOB_RETRY_BASE_DELAY, settings.TRANSCRIPTION_JOB_RETRY_MAX_DELAY,
+                ),
+            )
+        return job
+
+    set_job_status(job, TranscriptionJob.STATUS_EXTRACTING)
+    try:
+        extract_action_items(transcript)
+    except Exception:
+        # Extraction is idempotent, so it can be re-run on the saved transcript.
+        logger.exception("Action item extraction failed for transcription job %s", job.pk)
+
+    set_job_status(job, TranscriptionJob.STATUS_DONE, error='', finished_at=timezone.now())
+    return job
@@ -0,0 +1,99 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from actionboard_back.utils import rolled_back
+from meetings.models import Meeting
+from organisations.models import Organisation, OrganisationMembership
+from transcripts.action_items import build_action_items, extract_action_items, get_extractors, MemberDirectory
+from transcripts.jobs import save_transcript
+from transcripts.models import ActionItem
+from users.models import CustomUser
+
+NAMES = ["Ada", "Bob", "Chen", "Dana", "Eli", "Fatima", "Gus", "Hana"]
+CHATTER = [
+    "I think the numbers look fine overall.",
+    "We talked about this last week already.",
+    "The customer feedback was mostly positive.",
+    "Let me know if that works for everyone.",
+    "I'll be honest, the timeline is tight.",
+    "Okay, moving on to the next topic.",
+]
+TASKS = [
+    "send the revised budget", "book the venue", "update the roadmap", "review the pull request",
+    "draft the announcement", "call the vendor", "share the slides", "fix the onboarding bug",
+]
+DEADLINES = ["by Friday", "tomorrow", "next week", "by March 3rd", "in two days", ""]
+
+
+def synthetic_utterance(speaker):
+    roll = random.random()
+    task = f"{random.choice(TASKS)} {random.choice(DEADLINES)}".strip()
+    if roll < 0.05:
+        return f"I'll {task}."
+    if roll < 0.10:
+        return f"{random.choice(NAMES)}, can you {task}?"
+    return " ".join(random.sample(CHATTER, 2))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark action item extraction on a large synthetic transcript: extractor "
+        "throughput, the save step, and a re-run to check idempotency. Data is created "
+        "in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--utterances', type=int, default=20000)
+        parser.add_argument('--members', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options)
+
+    def run(self, options):
+        suffix = uuid.uuid4().hex[:8]
+        owner = CustomUser.objects.create_user(email=f"bench-{suffix}@example.com", password=None)
+        organisation = Organisation.objects.create(name=f"bench-{suffix}", created_by=owner)
+        for i in range(options['members']):
+            name = NAMES[i] if i < len(NAMES) else f"Member{i}"
+            user = CustomUser.objects.create_user(email=f"bench-{suffix}-{i}@example.com", password=None, first_name=name)
+            OrganisationMembership.objects.create(user=user, organisation=organisation, role='member')
+        meeting = Meeting.objects.create(
+            organisation=organisation, meeting_id=f"bench-{suffix}", topic="Extraction benchmark", start_time=timezone.now(),
+        )
+
+        utterances = []
+        for n in range(options['utterances']):
+            speaker = random.choice(NAMES)
+            utterances.append({"speaker": speaker, "start": n * 5.0, "end": n * 5.0 + 4.5, "text": synthetic_utterance(speaker)})
+        summary_text = "\n".join(f"- {random.choice(NAMES)} will {random.choice(TASKS)}." for _ in range(20))
+        transcript = save_transcript(
+            meeting, " ".join(u["text"] for u in utterances), {"summary_text": summary_text, "utterances": utterances},
+        )
+        rows = [(u["speaker"], round(u["start"] * 1000), u["text"]) for u in utterances]
+
+        started = time.perf_counter()
+        directory = MemberDirectory(organisation.pk)
+        self.stdout.write(f"member directory ({options['members']} members): {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        self.stdout.write(f"{'extractor':<14} {'ms':>9} {'utterances/s':>14} {'items':>7}")
+        for extractor in get_extractors(["commitments", "assignments", "summary"]):
+            started = time.perf_counter()
+            items = build_action_items(meeting, rows, summary_text, extractors=[extractor], directory=directory)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{extractor.name:<14} {elapsed * 1000:>9.1f} {len(rows) / elapsed:>14.0f} {len(items):>7}")
+
+        for run in ("first run", "re-run"):
+            started = time.perf_counter()
+            items = extract_action_items(transcript)
+            elapsed = time.perf_counter() - started
+            stored = ActionItem.objects.filter(meeting=meeting).count()
+            assigned = ActionItem.objects.filter(meeting=meeting, assigned_to__isnull=False).count()
+            self.stdout.write(
+                f"{run}: {elapsed * 1000:.1f} ms end to end ({len(rows) / elapsed:.0f} utterances/s), "
+                f"{len(items)} extracted, {stored} stored, {assigned} assigned"
+            )
@@ -0,0 +1,123 @@
+import math
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from actionboard_back.utils import rolled_back
+from meetings.models import Meeting
+from organisations.models import Organisation
+from transcripts.models import Transcript, TranscriptBody, Utterance
+from transcripts.search import search_transcripts
+from users.models import CustomUser
+
+COMMON = (
+    "we need to review the roadmap release customer feedback next sprint deadline action item "
+    "follow up design marketing numbers hiring plan launch demo I think that makes sense "
+    "let's move on can you send it by Friday agreed okay"
+).split()
+RARE = ["Q3 budget", "kubernetes migration", "invoice latency", "churn", "onboarding", "retention"]
+
+QUERIES = ["Q3 budget", "kubernetes migration", "churn", "retention onboarding", "customer feedback"]
+
+
+def synthetic_utterance():
+    words = [random.choice(COMMON) for _ in range(random.randint(8, 30))]
+    if random.random() < 0.05:
+        words.insert(random.randrange(len(words)), random.choice(RARE))
+    return " ".join(words).capitalize() + "."
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark transcript search on a synthetic corpus (default 10k transcripts): "
+        "indexing cost and query latency of the full-text backend against a plain "
+        "icontains scan. Data is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transcripts', type=int, default=10000)
+        parser.add_argument('--utterances', type=int, default=30, help="Utterances per transcript.")
+        parser.add_argument('--orgs', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options)
+
+    def run(self, options):
+        suffix = uuid.uuid4().hex[:8]
+        user = CustomUser.objects.create_user(email=f"bench-{suffix}@example.com", password=None)
+        organisations = [
+            Organisation.objects.create(name=f"bench-{suffix}-{i}", created_by=user) for i in range(options['orgs'])
+        ]
+
+        self.stdout.write(f"Seeding {options['transcripts']} transcripts on {connection.vendor}...")
+        started = time.perf_counter()
+        meetings = Meeting.objects.bulk_create((
+            Meeting(
+                organisation=organisations[i % len(organisations)],
+                meeting_id=f"bench-{suffix}-{i}",
+                topic=synthetic_utterance()[:200],
+                start_time=timezone.now(),
+            )
+            for i in range(options['transcripts'])
+        ), batch_size=1000)
+        if meetings[0].pk is None:
+            meetings = list(Meeting.objects.filter(meeting_id__startswith=f"bench-{suffix}-"))
+        transcripts = Transcript.objects.bulk_create(
+            (Transcript(meeting=meeting) for meeting in meetings), batch_size=1000,
+        )
+        if transcripts[0].pk is None:
+            transcripts = list(Transcript.objects.filter(meeting__in=meetings))
+        TranscriptBody.objects.bulk_create(
+            (TranscriptBody(transcript=transcript, full_transcript="", summary={}) for transcript in transcripts),
+            batch_size=1000,
+        )
+        seeded = time.perf_counter() - started
+
+        # Utterance inserts go through the search index (triggers / GIN).
+        started = time.perf_counter()
+        batch = []
+        for transcript in transcripts:
+            for n in range(options['utterances']):
+                batch.append(Utterance(
+                    transcript=transcript, speaker=random.choice("ABCD"),
+                    start_ms=n * 5000, end_ms=n * 5000 + 4500, text=synthetic_utterance(),
+                ))
+            if len(batch) >= 5000:
+                Utterance.objects.bulk_create(batch)
+                batch = []
+        Utterance.objects.bulk_create(batch)
+        indexed = time.perf_counter() - started
+        utterance_count = options['transcripts'] * options['utterances']
+        self.stdout.write(
+            f"meetings/transcripts: {seeded:.1f}s, {utterance_count} utterances inserted and indexed: "
+            f"{indexed:.1f}s ({utterance_count / indexed:.0f}/s)"
+        )
+
+        organisation = organisations[0]
+        self.stdout.write(f"{'query':<22} {'backend p50':>12} {'p95':>8} {'icontains p50':>14} {'results':>8}")
+        for query in QUERIES:
+            search_timings, scan_timings = [], []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                results = search_transcripts(organisation.pk, query)
+                search_timings.append((time.perf_counter() - started) * 1000)
+
+                started = time.perf_counter()
+                scan = Utterance.objects.filter(transcript__meeting__organisation=organisation)
+                for term in query.split():
+                    scan = scan.filter(text__icontains=term)
+                list(scan.values('transcript__meeting_id', 'start_ms')[:200])
+                scan_timings.append((time.perf_counter() - started) * 1000)
+            search_timings.sort()
+            self.stdout.write(
+                f"{query:<22} {statistics.median(search_timings):>10.1f}ms "
+                f"{search_timings[math.ceil(len(search_timings) * 95 / 100) - 1]:>6.1f}ms "
+                f"{statistics.median(scan_timings):>12.1f}ms {len(results):>8}"
+            )
@@ -0,0 +1,97 @@
+import json
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from actionboard_back.utils import rolled_back
+from meetings.models import Meeting
+from organisations.models import Organisation
+from transcripts.models import Transcript, TranscriptBody
+from users.models import CustomUser
+
+WORDS = (
+    "we need to review the budget roadmap release customer feedback next sprint deadline "
+    "action item follow up design marketing numbers quarter hiring plan launch demo "
+    "I think that makes sense let's move on can you send it by Friday agreed okay"
+).split()
+
+
+def synthetic_transcript(minutes):
+    utterances = []
+    start = 0.0
+    for _ in range(minutes * 12):
+        length = random.randint(8, 40)
+        text = " ".join(random.choice(WORDS) for _ in range(length)).capitalize() + "."
+        end = start + length * 0.4
+        utterances.append({"speaker": random.choice("ABCD"), "start": round(start, 2), "end": round(end, 2), "text": text})
+        start = end
+    full_text = " ".join(u["text"] for u in utterances)
+    return full_text, {"summary_text": "- Synthetic meeting", "utterances": utterances}
+
+
+class Command(BaseCommand):
+    help = (
+        "Report storage size and load times of transcripts on a synthetic corpus of "
+        "long transcripts: inline vs compressed body size, and metadata-only vs "
+        "body loads. Data is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transcripts', type=int, default=200)
+        parser.add_argument('--minutes', type=int, default=60, help="Length of each synthetic meeting.")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options)
+
+    def run(self, options):
+        suffix = uuid.uuid4().hex[:8]
+        user = CustomUser.objects.create_user(email=f"bench-{suffix}@example.com", password=None)
+        organisation = Organisation.objects.create(name=f"bench-{suffix}", created_by=user)
+
+        inline_bytes = 0
+        meeting_ids = []
+        for i in range(options['transcripts']):
+            meeting = Meeting.objects.create(
+                organisation=organisation, host=user, meeting_id=f"bench-{suffix}-{i}", start_time=timezone.now(),
+            )
+            full_text, summary = synthetic_transcript(options['minutes'])
+            # What the old TextField / JSONField columns held.
+            inline_bytes += len(full_text.encode()) + len(json.dumps(summary).encode())
+            Transcript.objects.create(meeting=meeting, full_transcript=full_text, summary=summary)
+            meeting_ids.append(meeting.pk)
+
+        stored = TranscriptBody.objects.filter(transcript__meeting__in=meeting_ids).aggregate(
+            text=Sum(Length('full_transcript')), summary=Sum(Length('summary')),
+        )
+        stored_bytes = stored['text'] + stored['summary']
+
+        transcripts = Transcript.objects.filter(meeting__in=meeting_ids)
+        loads = {
+            "metadata only": lambda: [t.language for t in transcripts.all()],
+            "meeting + transcript check": lambda: [
+                hasattr(m, 'transcript') for m in Meeting.objects.filter(pk__in=meeting_ids).select_related('transcript')
+            ],
+            "metadata + body": lambda: [len(t.full_transcript) for t in transcripts.select_related('body')],
+        }
+
+        self.stdout.write(f"{options['transcripts']} transcripts of {options['minutes']} minutes")
+        self.stdout.write(f"inline text + JSON:      {inline_bytes / 1024 / 1024:>8.2f} MB")
+        self.stdout.write(
+            f"compressed body table:   {stored_bytes / 1024 / 1024:>8.2f} MB "
+            f"({inline_bytes / stored_bytes:.1f}x smaller)"
+        )
+        for name, load in loads.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                load()
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(f"{name + ':':<28} {statistics.median(timings):>8.1f} ms")
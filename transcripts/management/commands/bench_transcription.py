@@ -0,0 +1,133 @@
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from transcripts.assembly_ai import start_transcript, transcribe_with_assembly_ai, wait_for_transcript
+from transcripts.summarizers import ProviderSummarizer
+
+
+class FakeAssemblyAI(ThreadingHTTPServer):
+    """
+    Minimal stand-in for the AssemblyAI transcript API. Every job takes
+    `processing_time` seconds to complete; requests and jobs are counted.
+    """
+    daemon_threads = True
+
+    def __init__(self, processing_time):
+        super().__init__(("127.0.0.1", 0), FakeAssemblyAIHandler)
+        self.processing_time = processing_time
+        self.jobs = {}
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def reset(self):
+        with self.lock:
+            self.jobs.clear()
+            self.request_count = 0
+
+
+class FakeAssemblyAIHandler(BaseHTTPRequestHandler):
+    UTTERANCES = [
+        {"speaker": "A", "start": 0, "end": 4200, "text": "Let's review the Q3 budget."},
+        {"speaker": "B", "start": 4300, "end": 9100, "text": "I will send the revised numbers by Friday."},
+    ]
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        options = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        job_id = uuid.uuid4().hex
+        with self.server.lock:
+            self.server.request_count += 1
+            self.server.jobs[job_id] = {"options": options, "submitted": time.monotonic()}
+        self.send_json({"id": job_id, "status": "queued"})
+
+    def do_GET(self):
+        job_id = self.path.rstrip("/").rsplit("/", 1)[-1]
+        with self.server.lock:
+            self.server.request_count += 1
+            job = self.server.jobs.get(job_id)
+        if job is None:
+            return self.send_json({"error": "not found"}, status=404)
+
+        if time.monotonic() - job["submitted"] < self.server.processing_time:
+            return self.send_json({"id": job_id, "status": "processing"})
+
+        options = job["options"]
+        self.send_json({
+            "id": job_id,
+            "status": "completed",
+            "text": " ".join(u["text"] for u in self.UTTERANCES),
+            "utterances": self.UTTERANCES if options.get("speaker_labels") else None,
+            "summary": "- Q3 budget reviewed\n- Revised numbers due Friday" if options.get("summarization") else None,
+        })
+
+
+def two_pass(audio_url, poll_interval):
+    """The previous flow: one job for utterances, then a second one for the summary."""
+    data = wait_for_transcript(start_transcript(audio_url, speaker_labels=True), poll_interval=poll_interval)
+    summary = wait_for_transcript(
+        start_transcript(audio_url, summarization=True, summary_model="informative", summary_type="bullets"),
+        poll_interval=poll_interval,
+    )
+    return data["text"], summary["summary"], data["utterances"]
+
+
+def single_pass(audio_url, poll_interval):
+    return transcribe_with_assembly_ai(audio_url, poll_interval=poll_interval, summarizer=ProviderSummarizer())
+
+
+class Command(BaseCommand):
+    help = "Compare the two-job and single-job AssemblyAI flows against a local fake AssemblyAI server."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processing-time', type=float, default=1.0, help="Seconds the fake server takes per job.")
+        parser.add_argument('--poll-interval', type=float, default=0.1)
+        parser.add_argument('--runs', type=int, default=3)
+
+    def handle(self, *args, **options):
+        server = FakeAssemblyAI(options['processing_time'])
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+            with override_settings(ASSEMBLYAI_ENDPOINT=server.url):
+                results = {}
+                for name, flow in (("two-pass", two_pass), ("single-pass", single_pass)):
+                    server.reset()
+                    started = time.perf_counter()
+                    for _ in range(options['runs']):
+                        text, summary, utterances = flow("https://example.com/audio.m4a", options['poll_interval'])
+                        assert text and summary and utterances
+                    elapsed = (time.perf_counter() - started) / options['runs']
+                    results[name] = (elapsed, server.request_count / options['runs'], len(server.jobs) / options['runs'])
+        finally:
+            server.shutdown()
+
+        self.stdout.write(f"{'flow':<12} {'wall-clock':>12} {'requests':>10} {'provider jobs':>14}")
+        for name, (elapsed, requests, jobs) in results.items():
+            self.stdout.write(f"{name:<12} {elapsed:>11.2f}s {requests:>10.1f} {jobs:>14.1f}")
+
+        before, after = results["two-pass"], results["single-pass"]
+        self.stdout.write(
+            f"single-pass: {before[0] / after[0]:.2f}x faster, "
+            f"{100 * (1 - after[1] / before[1]):.0f}% fewer requests, "
+            f"{100 * (1 - after[2] / before[2]):.0f}% less provider time"
+        )
@@ -0,0 +1,58 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from actionboard_back.utils import make_worker_id, poll, stop_event
+from transcripts.jobs import claim_next_job, heartbeat, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Run a pool of workers that process queued transcription jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Number of worker threads.")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--heartbeat-interval', type=float, default=30.0, help="Seconds between heartbeats.")
+
+    def handle(self, *args, **options):
+        self.stop = stop_event()
+
+        worker_ids = [make_worker_id(i) for i in range(options['workers'])]
+        threads = [
+            threading.Thread(target=self.work, args=(worker_id, options['poll_interval']), name=worker_id, daemon=True)
+            for worker_id in worker_ids
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Started {len(threads)} transcription workers")
+
+        # The main thread keeps held jobs alive and rescues jobs left behind
+        # by workers that died, so a restart never loses a transcription.
+        while not self.stop.is_set():
+            close_old_connections()
+            heartbeat(worker_ids)
+            requeued, failed = requeue_stale_jobs()
+            if requeued or failed:
+                self.stdout.write(f"Requeued {requeued} stale jobs, failed {failed}")
+            self.stop.wait(min(options['heartbeat_interval'], settings.TRANSCRIPTION_JOB_STALE_AFTER / 2))
+
+        self.stdout.write("Stopping, waiting for running jobs to finish...")
+        for thread in threads:
+            thread.join()
+
+    def work(self, worker_id, poll_interval):
+        def drain():
+            job = claim_next_job(worker_id)
+            if job is None:
+                return False
+            self.stdout.write(f"[{worker_id}] Processing job {job.pk} for meeting {job.meeting.meeting_id}")
+            run_job(job)
+            self.stdout.write(f"[{worker_id}] Job {job.pk} finished: {job.status}")
+            return True
+
+        try:
+            poll(self.stop, drain, poll_interval)
+        finally:
+            connection.close()
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from transcripts.reminders import dispatch_reminders
+
+
+class Command(BaseCommand):
+    help = "Email every assignee one digest of their due, unreminded action items. Meant to run from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Items read per query.")
+        parser.add_argument('--batch-size', type=int, default=100, help="Digests sent, one at a time, before their items are flagged.")
+        parser.add_argument('--dry-run', action='store_true', help="Build the digests without sending or flagging them.")
+
+    def handle(self, *args, **options):
+        result = dispatch_reminders(
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        if result is None:
+            self.stdout.write("Another reminder run is in progress, skipping")
+            return
+        digests, reminded = result
+        self.stdout.write(f"{'Would send' if options['dry_run'] else 'Sent'} {digests} digests covering {reminded} action items")
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+import transcripts.fields
+
+
+def move_bodies(apps, schema_editor):
+    Transcript = apps.get_model('transcripts', 'Transcript')
+    TranscriptBody = apps.get_model('transcripts', 'TranscriptBody')
+    transcripts = Transcript.objects.only('pk', 'full_transcript', 'summary').iterator(chunk_size=100)
+    batch = []
+    for transcript in transcripts:
+        batch.append(TranscriptBody(
+            transcript_id=transcript.pk,
+            full_transcript=transcript.full_transcript,
+            summary=transcript.summary,
+        ))
+        if len(batch) == 100:
+            TranscriptBody.objects.bulk_create(batch)
+            batch = []
+    TranscriptBody.objects.bulk_create(batch)
+
+
+def restore_bodies(apps, schema_editor):
+    Transcript = apps.get_model('transcripts', 'Transcript')
+    TranscriptBody = apps.get_model('transcripts', 'TranscriptBody')
+    for body in TranscriptBody.objects.iterator(chunk_size=100):
+        Transcript.objects.filter(pk=body.transcript_id).update(
+            full_transcript=body.full_transcript,
+            summary=body.summary,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0003_transcript_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptBody',
+            fields=[
+                ('transcript', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='body', serialize=False, to='transcripts.transcript')),
+                ('full_transcript', transcripts.fields.CompressedTextField()),
+                ('summary', transcripts.fields.CompressedJSONField(help_text='Structured summary: attendees, decisions, action_items')),
+            ],
+        ),
+        # Lets the field removals be reversed on a table that has rows.
+        migrations.AlterField(
+            model_name='transcript',
+            name='full_transcript',
+            field=models.TextField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='transcript',
+            name='summary',
+            field=models.JSONField(help_text='Structured summary: attendees, decisions, action_items', null=True),
+        ),
+        migrations.RunPython(move_bodies, restore_bodies),
+        migrations.RemoveField(
+            model_name='transcript',
+            name='full_transcript',
+        ),
+        migrations.RemoveField(
+            model_name='transcript',
+            name='summary',
+        ),
+    ]
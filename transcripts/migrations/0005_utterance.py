@@ -0,0 +1,47 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_utterances(apps, schema_editor):
+    TranscriptBody = apps.get_model('transcripts', 'TranscriptBody')
+    Utterance = apps.get_model('transcripts', 'Utterance')
+    for body in TranscriptBody.objects.only('transcript_id', 'summary').iterator(chunk_size=100):
+        summary = body.summary if isinstance(body.summary, dict) else {}
+        Utterance.objects.bulk_create([
+            Utterance(
+                transcript_id=body.transcript_id,
+                speaker=str(u.get('speaker') or ''),
+                start_ms=round(u['start'] * 1000),
+                end_ms=round(u['end'] * 1000),
+                text=u.get('text') or '',
+            )
+            for u in summary.get('utterances') or []
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0004_transcriptbody'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Utterance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('speaker', models.CharField(max_length=50)),
+                ('start_ms', models.PositiveIntegerField()),
+                ('end_ms', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('transcript', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='utterances', to='transcripts.transcript')),
+            ],
+            options={
+                'ordering': ['start_ms'],
+                'indexes': [models.Index(fields=['transcript', 'start_ms'], name='utterance_time_idx'), models.Index(fields=['transcript', 'speaker', 'start_ms'], name='utterance_speaker_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_utterances, migrations.RunPython.noop),
+    ]
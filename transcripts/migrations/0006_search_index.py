@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from transcripts.search import ensure_search_index
+
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        ensure_search_index(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    from transcripts.search import drop_search_index
+
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        drop_search_index()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0011_meeting_meeting_meeting_id_idx'),
+        ('transcripts', '0005_utterance'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
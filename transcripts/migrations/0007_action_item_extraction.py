@@ -0,0 +1,32 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0006_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actionitem',
+            name='fingerprint',
+            field=models.CharField(blank=True, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='actionitem',
+            name='start_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='transcriptionjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('downloading', 'Downloading'), ('uploading', 'Uploading'), ('transcribing', 'Transcribing'), ('summarizing', 'Summarizing'), ('extracting', 'Extracting action items'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='actionitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('fingerprint', ''), _negated=True), fields=('meeting', 'fingerprint'), name='action_item_fingerprint_uniq'),
+        ),
+    ]
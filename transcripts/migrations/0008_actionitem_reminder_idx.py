@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0007_action_item_extraction'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actionitem',
+            index=models.Index(condition=models.Q(('reminder_sent', False), ('status', 'pending')), fields=['assigned_to', 'id'], name='action_item_reminder_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.8 on 2026-10-18 13:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def fail_duplicate_jobs(apps, schema_editor):
+    """Keep the oldest unfinished job of each meeting, so the constraint can be added."""
+    TranscriptionJob = apps.get_model('transcripts', 'TranscriptionJob')
+    seen = set()
+    duplicates = []
+    for job_id, meeting_id in (
+        TranscriptionJob.objects.exclude(status__in=['done', 'failed']).order_by('created_at').values_list('pk', 'meeting_id')
+    ):
+        if meeting_id in seen:
+            duplicates.append(job_id)
+        seen.add(meeting_id)
+    TranscriptionJob.objects.filter(pk__in=duplicates).update(
+        status='failed', error='Duplicate of an earlier job', finished_at=django.utils.timezone.now(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0008_actionitem_reminder_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcriptionjob',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(fail_duplicate_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='transcriptionjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['done', 'failed']), _negated=True), fields=('meeting',), name='transcript_job_one_unfinished'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.8 on 2026-10-18 13:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_passages(apps, schema_editor):
+    """Passages for the transcripts saved without utterances."""
+    from transcripts.models import TranscriptPassage as CurrentPassage
+
+    TranscriptBody = apps.get_model('transcripts', 'TranscriptBody')
+    TranscriptPassage = apps.get_model('transcripts', 'TranscriptPassage')
+    bodies = TranscriptBody.objects.filter(transcript__utterances__isnull=True).only('transcript_id', 'full_transcript')
+    for body in bodies.iterator(chunk_size=100):
+        TranscriptPassage.objects.bulk_create([
+            TranscriptPassage(transcript_id=body.transcript_id, position=passage.position, text=passage.text)
+            for passage in CurrentPassage.from_text(None, body.full_transcript)
+        ], batch_size=500)
+
+
+def create_search_index(apps, schema_editor):
+    from transcripts.search import ensure_search_index
+
+    ensure_search_index(schema_editor)
+
+
+def drop_passage_index(apps, schema_editor):
+    from transcripts.search import SQLiteSearchBackend
+
+    # The PostgreSQL index goes with the table; SQLite's FTS table doesn't.
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SQLiteSearchBackend.PASSAGE_FTS}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0009_transcriptionjob_retry_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptPassage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('transcript', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='passages', to='transcripts.transcript')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='transcriptpassage',
+            constraint=models.UniqueConstraint(fields=('transcript', 'position'), name='transcript_passage_position'),
+        ),
+        migrations.RunPython(backfill_passages, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_passage_index),
+    ]
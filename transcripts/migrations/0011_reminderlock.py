@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-18 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0010_transcriptpassage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderLock',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('locked_by', models.CharField(blank=True, max_length=255)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
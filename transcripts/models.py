@@ -1,17 +1,153 @@
 from django.db import models
+from django.utils import timezone
+
+from transcripts.fields import CompressedJSONField, CompressedTextField
 
 # Create your models here.
 class Transcript(models.Model):
+    """
+    Transcript metadata. The text and summary live in TranscriptBody and
+    are only loaded when `full_transcript` or `summary` is accessed (or the
+    body is joined with select_related('body')).
+    """
     meeting = models.OneToOneField('meetings.Meeting', on_delete=models.CASCADE, related_name='transcript')
-    full_transcript = models.TextField()
-    summary = models.JSONField(help_text="Structured summary: attendees, decisions, action_items")
     language = models.CharField(max_length=50, default='en')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Transcript for {self.meeting.topic}"
+
+    def get_body(self):
+        try:
+            return self.body
+        except TranscriptBody.DoesNotExist:
+            self.body = TranscriptBody(transcript=self if self.pk else None, full_transcript='', summary={})
+            return self.body
+
+    @property
+    def full_transcript(self):
+        return self.get_body().full_transcript
+
+    @full_transcript.setter
+    def full_transcript(self, value):
+        self.get_body().full_transcript = value
+        self._body_changed = True
+
+    @property
+    def summary(self):
+        return self.get_body().summary
+
+    @summary.setter
+    def summary(self, value):
+        self.get_body().summary = value
+        self._body_changed = True
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if getattr(self, '_body_changed', False):
+            body = self.body
+            body.transcript = self
+            body.save(force_insert=body._state.adding)
+            self._body_changed = False
+
+
+class TranscriptBody(models.Model):
+    """
+    Transcript text and summary (with utterances), zlib-compressed and kept
+    out of the Transcript row so metadata queries never read them.
+    """
+    transcript = models.OneToOneField(
+        'transcripts.Transcript', on_delete=models.CASCADE, primary_key=True, related_name='body',
+    )
+    full_transcript = CompressedTextField()
+    summary = CompressedJSONField(help_text="Structured summary: attendees, decisions, action_items")
+
+    def __str__(self):
+        return f"Body of transcript {self.transcript_id}"
+
+
+class Utterance(models.Model):
+    """
+    One diarized segment of a transcript, so time windows and a speaker's
+    segments can be queried without loading the transcript body.
+    """
+    transcript = models.ForeignKey(
+        'transcripts.Transcript', on_delete=models.CASCADE, related_name='utterances',
+        db_index=False,  # covered by the composite indexes below
+    )
+    speaker = models.CharField(max_length=50)
+    start_ms = models.PositiveIntegerField()
+    end_ms = models.PositiveIntegerField()
+    text = models.TextField()
+
+    class Meta:
+        ordering = ['start_ms']
+        indexes = [
+            models.Index(fields=['transcript', 'start_ms'], name='utterance_time_idx'),
+            models.Index(fields=['transcript', 'speaker', 'start_ms'], name='utterance_speaker_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.speaker} @ {self.start_ms}ms"
+
+    @classmethod
+    def from_summary(cls, transcript, utterances):
+        """
+        Build unsaved rows from the utterances stored in a transcript summary
+        (start/end in seconds).
+        """
+        return [
+            cls(
+                transcript=transcript,
+                speaker=str(u.get("speaker") or ""),
+                start_ms=round(u["start"] * 1000),
+                end_ms=round(u["end"] * 1000),
+                text=u.get("text") or "",
+            )
+            for u in utterances
+        ]
+
+
+class TranscriptPassage(models.Model):
+    """
+    A slice of the text of a transcript that has no diarized utterances, in
+    plain text so the search index can cover it (the body is compressed).
+    """
+    transcript = models.ForeignKey('transcripts.Transcript', on_delete=models.CASCADE, related_name='passages')
+    position = models.PositiveIntegerField()
+    text = models.TextField()
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['transcript', 'position'], name='transcript_passage_position'),
+        ]
 
     def __str__(self):
-        return f"Transcript for {self.meeting.title}"
-    
-    
+        return f"Passage {self.position} of transcript {self.transcript_id}"
+
+    @classmethod
+    def from_text(cls, transcript, text, size=2000):
+        """
+        Build unsaved rows of at most about `size` characters each, split
+        at line breaks or, failing that, at spaces.
+        """
+        passages = []
+        text = (text or "").strip()
+        while text:
+            cut = len(text)
+            if cut > size:
+                cut = text.rfind("\n", 0, size)
+                if cut <= 0:
+                    cut = text.rfind(" ", 0, size)
+                if cut <= 0:
+                    cut = size
+            passages.append(cls(transcript=transcript, position=len(passages), text=text[:cut].strip()))
+            text = text[cut:].strip()
+        return passages
+
+
 class ActionItem(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -25,7 +161,104 @@ class ActionItem(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     reminder_sent = models.BooleanField(default=False)
 
+    # Set on items extracted from a transcript (transcripts.action_items):
+    # identifies the item across re-transcriptions, and where it was said.
+    fingerprint = models.CharField(max_length=40, blank=True)
+    start_ms = models.PositiveIntegerField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['meeting', 'fingerprint'],
+                condition=~models.Q(fingerprint=''),
+                name='action_item_fingerprint_uniq',
+            ),
+        ]
+        indexes = [
+            # Unreminded open items in the dispatcher's keyset order (transcripts.reminders).
+            models.Index(
+                fields=['assigned_to', 'id'],
+                condition=models.Q(reminder_sent=False, status='pending'),
+                name='action_item_reminder_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.content
+
+
+class ReminderLock(models.Model):
+    """
+    Lease on the reminder dispatcher (transcripts.reminders), one row. A run
+    takes it with a conditional UPDATE, so only one process at a time can
+    hold it; a lease older than ACTION_ITEM_REMINDER_LOCK_TIMEOUT is taken
+    over from a run that died.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.locked_by or 'free'})"
+
+class TranscriptionJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_DOWNLOADING = 'downloading'
+    STATUS_UPLOADING = 'uploading'
+    STATUS_TRANSCRIBING = 'transcribing'
+    STATUS_SUMMARIZING = 'summarizing'
+    STATUS_EXTRACTING = 'extracting'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_DOWNLOADING, 'Downloading'),
+        (STATUS_UPLOADING, 'Uploading'),
+        (STATUS_TRANSCRIBING, 'Transcribing'),
+        (STATUS_SUMMARIZING, 'Summarizing'),
+        (STATUS_EXTRACTING, 'Extracting action items'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    # Statuses a worker moves through while it holds the job.
+    ACTIVE_STATUSES = (
+        STATUS_DOWNLOADING, STATUS_UPLOADING, STATUS_TRANSCRIBING, STATUS_SUMMARIZING, STATUS_EXTRACTING,
+    )
+    FINISHED_STATUSES = (STATUS_DONE, STATUS_FAILED)
+
+    meeting = models.ForeignKey('meetings.Meeting', on_delete=models.CASCADE, related_name='transcription_jobs')
+    requested_by = models.ForeignKey('users.CustomUser', on_delete=models.SET_NULL, null=True, blank=True, related_name='transcription_jobs')
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    worker_id = models.CharField(max_length=255, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Last sign of life from the worker
+    next_attempt_at = models.DateTimeField(default=timezone.now)  # Not claimed before this (retry backoff)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='transcript_job_status_idx'),
+        ]
+        constraints = [
+            # At most one unfinished job per meeting, however many requests race to queue one.
+            models.UniqueConstraint(
+                fields=['meeting'],
+                condition=~models.Q(status__in=['done', 'failed']),
+                name='transcript_job_one_unfinished',
+            ),
+        ]
+
     def __str__(self):
-        return self.content
\ No newline at end of file
+        return f"Transcription job {self.pk} ({self.status}) for {self.meeting.topic}"
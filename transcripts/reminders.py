@@ -0,0 +1,174 @@
+"""
+Action item reminder dispatcher.
+
+Every run selects the open, unreminded items that are due within
+ACTION_ITEM_REMINDER_LEAD_DAYS, sends each assignee one digest email and
+marks the items as reminded. Items are read in keyset chunks ordered by
+(assigned_to, id), which action_item_reminder_idx serves directly, so a run
+holds at most one chunk plus one assignee's items in memory however many
+items are due.
+
+Digests go out in batches over a single SMTP connection; the items of a
+batch whose digests were sent are flipped with one UPDATE. A digest that
+fails to send is logged, left unreminded and retried by the next run,
+without stopping the others.
+
+Runs from several hosts (cron on every app server) are serialised by a
+lease on the ReminderLock row, so each digest goes out once.
+"""
+import itertools
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from actionboard_back import metrics
+from actionboard_back.utils import make_worker_id
+from transcripts.models import ActionItem, ReminderLock
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = "action-item-reminders"
+DIGEST_FIELDS = (
+    'id', 'content', 'due_date', 'assigned_to_id', 'assigned_to__email', 'assigned_to__first_name',
+    'meeting__topic', 'meeting__start_time',
+)
+
+
+def acquire_lock(worker_id):
+    """Take the dispatcher lease unless a live run holds it. Returns whether it was taken."""
+    now = timezone.now()
+    ReminderLock.objects.get_or_create(name=LOCK_NAME)
+    expired = now - timedelta(seconds=settings.ACTION_ITEM_REMINDER_LOCK_TIMEOUT)
+    return bool(
+        ReminderLock.objects
+        .filter(Q(locked_by='') | Q(locked_at__lt=expired), name=LOCK_NAME)
+        .update(locked_by=worker_id, locked_at=now)
+    )
+
+
+def release_lock(worker_id):
+    ReminderLock.objects.filter(name=LOCK_NAME, locked_by=worker_id).update(locked_by='', locked_at=None)
+
+
+def due_items(due_by, chunk_size=1000):
+    """
+    Yield due, unreminded items as dicts, ordered by (assigned_to, id),
+    one keyset chunk at a time.
+    """
+    items = (
+        ActionItem.objects
+        .filter(reminder_sent=False, status='pending', assigned_to__isnull=False, due_date__lte=due_by)
+        .order_by('assigned_to_id', 'id')
+        .values(*DIGEST_FIELDS)
+    )
+    last = None
+    while True:
+        chunk = items
+        if last is not None:
+            chunk = chunk.filter(Q(assigned_to_id__gt=last[0]) | Q(assigned_to_id=last[0], id__gt=last[1]))
+        rows = list(chunk[:chunk_size])
+        if not rows:
+            return
+        yield from rows
+        last = (rows[-1]['assigned_to_id'], rows[-1]['id'])
+
+
+def build_digest(items, today):
+    first = items[0]
+    lines = [f"Hi {first['assigned_to__first_name'] or 'there'},", ""]
+    overdue = sum(1 for item in items if item['due_date'] < today)
+    lines.append(
+        f"You have {len(items)} action item{'s' if len(items) != 1 else ''} due soon"
+        + (f", {overdue} of them overdue:" if overdue else ":")
+    )
+    lines.append("")
+    for item in items:
+        meeting = item['meeting__topic'] or "a meeting"
+        if item['meeting__start_time']:
+            meeting += f" ({timezone.localtime(item['meeting__start_time']):%b %d})"
+        lines.append(f"- {item['content']} (due {item['due_date']:%a %b %d}, from {meeting})")
+    return EmailMessage(
+        subject=f"Reminder: {len(items)} action item{'s' if len(items) != 1 else ''} due",
+        body="\n".join(lines),
+        to=[first['assigned_to__email']],
+    )
+
+
+def send_batch(connection, batch):
+    """
+    Send a batch of (message, item ids) one digest at a time and flag the
+    items of the digests that went out. Returns (digests sent, items
+    reminded).
+    """
+    item_ids = []
+    sent = 0
+    for message, ids in batch:
+        try:
+            connection.send_messages([message])
+        except (smtplib.SMTPException, OSError) as e:
+            logger.exception("Reminder digest to %s failed", ", ".join(message.to))
+            metrics.incr("reminders.digests_failed")
+            if not isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                # The server may have dropped us; reconnect for the next digest.
+                connection.close()
+                try:
+                    connection.open()
+                except OSError:
+                    pass
+            continue
+        sent += 1
+        item_ids.extend(ids)
+    ActionItem.objects.filter(pk__in=item_ids).update(reminder_sent=True)
+    metrics.incr("reminders.digests_sent", sent)
+    metrics.incr("reminders.items_reminded", len(item_ids))
+    return sent, len(item_ids)
+
+
+def flush(connection, batch, dry_run):
+    if dry_run:
+        return len(batch), sum(len(ids) for _, ids in batch)
+    return send_batch(connection, batch)
+
+
+def dispatch_reminders(today=None, chunk_size=1000, batch_size=100, connection=None, dry_run=False):
+    """
+    One dispatcher run. Returns (digests sent, items reminded), or None when
+    another run holds the lock.
+    """
+    worker_id = make_worker_id()
+    if not acquire_lock(worker_id):
+        logger.info("Another reminder run is in progress")
+        return None
+
+    today = today or timezone.localdate()
+    due_by = today + timedelta(days=settings.ACTION_ITEM_REMINDER_LEAD_DAYS)
+    connection = connection or get_connection()
+    digests = reminded = 0
+    batch = []
+    try:
+        if not dry_run:
+            connection.open()
+        for _, items in itertools.groupby(due_items(due_by, chunk_size), key=lambda item: item['assigned_to_id']):
+            items = list(items)
+            batch.append((build_digest(items, today), [item['id'] for item in items]))
+            if len(batch) >= batch_size:
+                sent, items_reminded = flush(connection, batch, dry_run)
+                digests += sent
+                reminded += items_reminded
+                batch = []
+        if batch:
+            sent, items_reminded = flush(connection, batch, dry_run)
+            digests += sent
+            reminded += items_reminded
+    finally:
+        if not dry_run:
+            connection.close()
+        release_lock(worker_id)
+
+    logger.info("Sent %d reminder digests covering %d action items", digests, reminded)
+    return digests, reminded
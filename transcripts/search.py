@@ -0,0 +1,436 @@
+"""
+Full-text search over an organisation's transcripts and meeting topics.
+
+The searchable unit is the Utterance row, so every hit carries its speaker
+and timestamps, plus the meeting topic. Transcripts without utterances are
+searched through their TranscriptPassage rows (plain-text slices of
+full_transcript), whose hits have no speaker or timestamps. Three backends
+share one interface:
+
+* PostgreSQL: GIN indexes over to_tsvector('english', ...) expressions,
+  queried with SearchVector / SearchRank / SearchHeadline.
+* SQLite: FTS5 external-content tables over the utterance, passage and
+  meeting tables, kept in sync by triggers.
+* Anything else (e.g. MySQL): unindexed icontains lookups, so search keeps
+  working, only slower.
+
+Both indexes are maintained by the database itself, so they follow every
+transcript save (save_transcript replaces the utterance rows) without a
+separate indexing step. ensure_search_index() creates them from a
+migration. SQLite drops a table's triggers when Django rebuilds that table
+for a later migration, so repair_search_index() recreates missing triggers
+after every migrate (see TranscriptsConfig.ready).
+
+Snippets are HTML: the backends mark matches with control characters,
+and highlight() escapes the text before turning those into <mark> tags,
+so transcript and topic text can't inject markup.
+"""
+import re
+
+from django.db import connection
+from django.utils.html import escape
+
+# Placeholders the backends wrap matches in, replaced by highlight().
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_STOP = "\x03"
+MATCHES_PER_MEETING = 3
+# Topic hits weigh more than a single utterance hit.
+TOPIC_WEIGHT = 2.0
+
+
+def search_terms(query):
+    return re.findall(r"\w+", query)
+
+
+def highlight(snippet):
+    """HTML for a backend snippet: the text escaped, matches in <mark>."""
+    if snippet is None:
+        return None
+    return escape(snippet).replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_STOP, "</mark>")
+
+
+class SQLiteSearchBackend:
+    UTTERANCE_FTS = "transcripts_utterance_fts"
+    PASSAGE_FTS = "transcripts_transcriptpassage_fts"
+    TOPIC_FTS = "meetings_meeting_topic_fts"
+
+    TRIGGERS = {
+        "transcripts_utterance_fts_ai": (
+            "AFTER INSERT ON transcripts_utterance BEGIN "
+            "INSERT INTO transcripts_utterance_fts(rowid, text) VALUES (new.id, new.text); END"
+        ),
+        "transcripts_utterance_fts_ad": (
+            "AFTER DELETE ON transcripts_utterance BEGIN "
+            "INSERT INTO transcripts_utterance_fts(transcripts_utterance_fts, rowid, text) "
+            "VALUES ('delete', old.id, old.text); END"
+        ),
+        "transcripts_utterance_fts_au": (
+            "AFTER UPDATE OF text ON transcripts_utterance BEGIN "
+            "INSERT INTO transcripts_utterance_fts(transcripts_utterance_fts, rowid, text) "
+            "VALUES ('delete', old.id, old.text); "
+            "INSERT INTO transcripts_utterance_fts(rowid, text) VALUES (new.id, new.text); END"
+        ),
+        "transcripts_transcriptpassage_fts_ai": (
+            "AFTER INSERT ON transcripts_transcriptpassage BEGIN "
+            "INSERT INTO transcripts_transcriptpassage_fts(rowid, text) VALUES (new.id, new.text); END"
+        ),
+        "transcripts_transcriptpassage_fts_ad": (
+            "AFTER DELETE ON transcripts_transcriptpassage BEGIN "
+            "INSERT INTO transcripts_transcriptpassage_fts(transcripts_transcriptpassage_fts, rowid, text) "
+            "VALUES ('delete', old.id, old.text); END"
+        ),
+        "transcripts_transcriptpassage_fts_au": (
+            "AFTER UPDATE OF text ON transcripts_transcriptpassage BEGIN "
+            "INSERT INTO transcripts_transcriptpassage_fts(transcripts_transcriptpassage_fts, rowid, text) "
+            "VALUES ('delete', old.id, old.text); "
+            "INSERT INTO transcripts_transcriptpassage_fts(rowid, text) VALUES (new.id, new.text); END"
+        ),
+        "meetings_meeting_topic_fts_ai": (
+            "AFTER INSERT ON meetings_meeting BEGIN "
+            "INSERT INTO meetings_meeting_topic_fts(rowid, topic) VALUES (new.id, new.topic); END"
+        ),
+        "meetings_meeting_topic_fts_ad": (
+            "AFTER DELETE ON meetings_meeting BEGIN "
+            "INSERT INTO meetings_meeting_topic_fts(meetings_meeting_topic_fts, rowid, topic) "
+            "VALUES ('delete', old.id, old.topic); END"
+        ),
+        "meetings_meeting_topic_fts_au": (
+            "AFTER UPDATE OF topic ON meetings_meeting BEGIN "
+            "INSERT INTO meetings_meeting_topic_fts(meetings_meeting_topic_fts, rowid, topic) "
+            "VALUES ('delete', old.id, old.topic); "
+            "INSERT INTO meetings_meeting_topic_fts(rowid, topic) VALUES (new.id, new.topic); END"
+        ),
+    }
+
+    def sources(self):
+        return (
+            (self.UTTERANCE_FTS, "text", "transcripts_utterance"),
+            (self.PASSAGE_FTS, "text", "transcripts_transcriptpassage"),
+            (self.TOPIC_FTS, "topic", "meetings_meeting"),
+        )
+
+    def ensure_index(self, cursor, schema_editor=None):
+        # Migrations before the passage table was added index what exists so far.
+        tables = set(connection.introspection.table_names(cursor))
+        created = []
+        for table, column, content in self.sources():
+            if content in tables and table not in tables:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {table} USING fts5("
+                    f"{column}, content='{content}', content_rowid='id', tokenize='porter unicode61')"
+                )
+                created.append(table)
+        self.repair_index(cursor)
+        for table in created:
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+    def repair_index(self, cursor):
+        """Create the missing triggers of every FTS table that exists."""
+        tables = set(connection.introspection.table_names(cursor))
+        indexed = {table for table, _, content in self.sources() if table in tables and content in tables}
+        for name, body in self.TRIGGERS.items():
+            if name.rsplit("_", 1)[0] in indexed:
+                cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+    def drop_index(self, cursor):
+        for name in self.TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for table, _, _ in self.sources():
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+    def match_expression(self, query):
+        # Quote every term so user input can't use FTS5 query syntax.
+        return " ".join(f'"{term}"' for term in search_terms(query))
+
+    def utterance_hits(self, organisation_id, query, limit):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT t.meeting_id, u.speaker, u.start_ms, u.end_ms,
+                       snippet({self.UTTERANCE_FTS}, 0, %s, %s, '…', 16),
+                       -bm25({self.UTTERANCE_FTS})
+                FROM {self.UTTERANCE_FTS}
+                JOIN transcripts_utterance u ON u.id = {self.UTTERANCE_FTS}.rowid
+                JOIN transcripts_transcript t ON t.id = u.transcript_id
+                JOIN meetings_meeting m ON m.id = t.meeting_id
+                WHERE {self.UTTERANCE_FTS} MATCH %s AND m.organisation_id = %s
+                ORDER BY bm25({self.UTTERANCE_FTS})
+                LIMIT %s
+                """,
+                [HIGHLIGHT_START, HIGHLIGHT_STOP, expression, organisation_id, limit],
+            )
+            return cursor.fetchall()
+
+    def passage_hits(self, organisation_id, query, limit):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT t.meeting_id,
+                       snippet({self.PASSAGE_FTS}, 0, %s, %s, '…', 16),
+                       -bm25({self.PASSAGE_FTS})
+                FROM {self.PASSAGE_FTS}
+                JOIN transcripts_transcriptpassage p ON p.id = {self.PASSAGE_FTS}.rowid
+                JOIN transcripts_transcript t ON t.id = p.transcript_id
+                JOIN meetings_meeting m ON m.id = t.meeting_id
+                WHERE {self.PASSAGE_FTS} MATCH %s AND m.organisation_id = %s
+                ORDER BY bm25({self.PASSAGE_FTS})
+                LIMIT %s
+                """,
+                [HIGHLIGHT_START, HIGHLIGHT_STOP, expression, organisation_id, limit],
+            )
+            return cursor.fetchall()
+
+    def topic_hits(self, organisation_id, query, limit):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT m.id,
+                       highlight({self.TOPIC_FTS}, 0, %s, %s),
+                       -bm25({self.TOPIC_FTS})
+                FROM {self.TOPIC_FTS}
+                JOIN meetings_meeting m ON m.id = {self.TOPIC_FTS}.rowid
+                WHERE {self.TOPIC_FTS} MATCH %s AND m.organisation_id = %s
+                ORDER BY bm25({self.TOPIC_FTS})
+                LIMIT %s
+                """,
+                [HIGHLIGHT_START, HIGHLIGHT_STOP, expression, organisation_id, limit],
+            )
+            return cursor.fetchall()
+
+
+class PostgresSearchBackend:
+    CONFIG = "english"
+
+    def indexes(self):
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+
+        from meetings.models import Meeting
+        from transcripts.models import TranscriptPassage, Utterance
+
+        # Built from the same SearchVector expressions the queries use, so
+        # the planner can match them.
+        return [
+            (Utterance, GinIndex(SearchVector("text", config=self.CONFIG), name="utterance_search_idx")),
+            (TranscriptPassage, GinIndex(SearchVector("text", config=self.CONFIG), name="passage_search_idx")),
+            (Meeting, GinIndex(SearchVector("topic", config=self.CONFIG), name="meeting_topic_search_idx")),
+        ]
+
+    def ensure_index(self, cursor, schema_editor=None):
+        if schema_editor is None:
+            with connection.schema_editor() as schema_editor:
+                return self.ensure_index(cursor, schema_editor)
+        tables = set(connection.introspection.table_names(cursor))
+        for model, index in self.indexes():
+            if model._meta.db_table not in tables:
+                continue  # created by a later migration, which indexes it
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", [index.name])
+            if cursor.fetchone() is None:
+                schema_editor.add_index(model, index)
+
+    def repair_index(self, cursor):
+        # Expression indexes survive table rewrites on PostgreSQL.
+        pass
+
+    def drop_index(self, cursor):
+        for _, index in self.indexes():
+            cursor.execute(f"DROP INDEX IF EXISTS {connection.ops.quote_name(index.name)}")
+
+    def search(self, field, query):
+        from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+
+        vector = SearchVector(field, config=self.CONFIG)
+        search_query = SearchQuery(query, config=self.CONFIG, search_type="websearch")
+        return {
+            "vector": vector,
+            "query": search_query,
+            "rank": SearchRank(vector, search_query),
+            "headline": SearchHeadline(
+                field, search_query, config=self.CONFIG,
+                start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP, max_words=24, min_words=8,
+            ),
+        }
+
+    def utterance_hits(self, organisation_id, query, limit):
+        from transcripts.models import Utterance
+
+        search = self.search("text", query)
+        hits = (
+            Utterance.objects
+            .annotate(document=search["vector"])
+            .filter(document=search["query"], transcript__meeting__organisation_id=organisation_id)
+            .annotate(rank=search["rank"], snippet=search["headline"])
+            .order_by("-rank")
+            .values_list("transcript__meeting_id", "speaker", "start_ms", "end_ms", "snippet", "rank")
+        )
+        return list(hits[:limit])
+
+    def passage_hits(self, organisation_id, query, limit):
+        from transcripts.models import TranscriptPassage
+
+        search = self.search("text", query)
+        hits = (
+            TranscriptPassage.objects
+            .annotate(document=search["vector"])
+            .filter(document=search["query"], transcript__meeting__organisation_id=organisation_id)
+            .annotate(rank=search["rank"], snippet=search["headline"])
+            .order_by("-rank")
+            .values_list("transcript__meeting_id", "snippet", "rank")
+        )
+        return list(hits[:limit])
+
+    def topic_hits(self, organisation_id, query, limit):
+        from meetings.models import Meeting
+
+        search = self.search("topic", query)
+        hits = (
+            Meeting.objects
+            .filter(organisation_id=organisation_id)
+            .annotate(document=search["vector"])
+            .filter(document=search["query"])
+            .annotate(rank=search["rank"], snippet=search["headline"])
+            .order_by("-rank")
+            .values_list("id", "snippet", "rank")
+        )
+        return list(hits[:limit])
+
+
+class ContainsSearchBackend:
+    """
+    Fallback for databases without a full-text index here: every term must
+    occur (icontains), every hit scores 1 and the snippet is cut in Python.
+    """
+    SNIPPET_CHARS = 60
+
+    def ensure_index(self, cursor, schema_editor=None):
+        pass
+
+    def repair_index(self, cursor):
+        pass
+
+    def drop_index(self, cursor):
+        pass
+
+    def matching(self, queryset, field, query):
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+        for term in terms:
+            queryset = queryset.filter(**{f"{field}__icontains": term})
+        return queryset
+
+    def snippet(self, text, query):
+        terms = search_terms(query)
+        pattern = re.compile("|".join(re.escape(term) for term in terms), re.I)
+        first = pattern.search(text)
+        start = max(first.start() - self.SNIPPET_CHARS, 0) if first else 0
+        end = min(start + 2 * self.SNIPPET_CHARS, len(text))
+        snippet = pattern.sub(lambda match: f"{HIGHLIGHT_START}{match.group()}{HIGHLIGHT_STOP}", text[start:end])
+        return f"{'…' if start else ''}{snippet}{'…' if end < len(text) else ''}"
+
+    def utterance_hits(self, organisation_id, query, limit):
+        from transcripts.models import Utterance
+
+        hits = self.matching(
+            Utterance.objects.filter(transcript__meeting__organisation_id=organisation_id), "text", query,
+        ).values_list("transcript__meeting_id", "speaker", "start_ms", "end_ms", "text")
+        return [
+            (meeting_pk, speaker, start_ms, end_ms, self.snippet(text, query), 1.0)
+            for meeting_pk, speaker, start_ms, end_ms, text in hits[:limit]
+        ]
+
+    def passage_hits(self, organisation_id, query, limit):
+        from transcripts.models import TranscriptPassage
+
+        hits = self.matching(
+            TranscriptPassage.objects.filter(transcript__meeting__organisation_id=organisation_id), "text", query,
+        ).values_list("transcript__meeting_id", "text")
+        return [(meeting_pk, self.snippet(text, query), 1.0) for meeting_pk, text in hits[:limit]]
+
+    def topic_hits(self, organisation_id, query, limit):
+        from meetings.models import Meeting
+
+        hits = self.matching(Meeting.objects.filter(organisation_id=organisation_id), "topic", query)
+        return [(pk, self.snippet(topic, query), 1.0) for pk, topic in hits.values_list("id", "topic")[:limit]]
+
+
+def get_backend():
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    if connection.vendor == "sqlite":
+        return SQLiteSearchBackend()
+    return ContainsSearchBackend()
+
+
+def ensure_search_index(schema_editor=None):
+    with connection.cursor() as cursor:
+        get_backend().ensure_index(cursor, schema_editor)
+
+
+def repair_search_index(**kwargs):
+    with connection.cursor() as cursor:
+        get_backend().repair_index(cursor)
+
+
+def drop_search_index():
+    with connection.cursor() as cursor:
+        get_backend().drop_index(cursor)
+
+
+def search_transcripts(organisation_id, query, limit=20):
+    """
+    Meetings of the organisation whose transcript or topic matches `query`,
+    best first. Each result carries its best utterance matches with
+    highlighted snippets and timestamps (speaker and timestamps are None
+    for passage matches).
+    """
+    from meetings.models import Meeting
+
+    backend = get_backend()
+    candidates = limit * MATCHES_PER_MEETING * 4
+    results = {}
+
+    for meeting_pk, speaker, start_ms, end_ms, snippet, score in backend.utterance_hits(organisation_id, query, candidates):
+        result = results.setdefault(meeting_pk, {"score": 0.0, "topic_snippet": None, "matches": []})
+        result["score"] = max(result["score"], score)
+        if len(result["matches"]) < MATCHES_PER_MEETING:
+            result["matches"].append({
+                "speaker": speaker,
+                "start_ms": start_ms,
+                "end_ms": end_ms,
+                "snippet": highlight(snippet),
+            })
+
+    for meeting_pk, snippet, score in backend.passage_hits(organisation_id, query, candidates):
+        result = results.setdefault(meeting_pk, {"score": 0.0, "topic_snippet": None, "matches": []})
+        result["score"] = max(result["score"], score)
+        if len(result["matches"]) < MATCHES_PER_MEETING:
+            result["matches"].append({"speaker": None, "start_ms": None, "end_ms": None, "snippet": highlight(snippet)})
+
+    for meeting_pk, snippet, score in backend.topic_hits(organisation_id, query, limit):
+        result = results.setdefault(meeting_pk, {"score": 0.0, "topic_snippet": None, "matches": []})
+        result["score"] = max(result["score"], score * TOPIC_WEIGHT)
+        result["topic_snippet"] = highlight(snippet)
+
+    ranked = sorted(results.items(), key=lambda item: item[1]["score"], reverse=True)[:limit]
+    meetings = Meeting.objects.in_bulk([pk for pk, _ in ranked])
+    return [
+        {
+            "meeting_id": meetings[pk].meeting_id,
+            "topic": meetings[pk].topic,
+            "start_time": meetings[pk].start_time.isoformat() if meetings[pk].start_time else None,
+            "score": round(result["score"], 6),
+            "topic_snippet": result["topic_snippet"],
+            "matches": result["matches"],
+        }
+        for pk, result in ranked
+    ]
@@ -0,0 +1,81 @@
+"""
+Summary stage of the transcription pipeline.
+
+AssemblyAI can produce the summary in the same job that produces the
+transcript and utterances. A summarizer decides whether that job should ask
+for one (`uses_provider_summary`) and turns the finished transcript into the
+summary text that ends up in `Transcript.summary["summary_text"]`.
+
+Pick one with the TRANSCRIPT_SUMMARIZER setting: "provider" (default),
+"local" or "none".
+"""
+import re
+from collections import Counter
+
+from django.conf import settings
+
+
+class ProviderSummarizer:
+    """Use the summary AssemblyAI returned alongside the transcript."""
+    name = "provider"
+    uses_provider_summary = True
+
+    def summarize(self, text, utterances, provider_summary=None):
+        return provider_summary or ""
+
+
+class LocalSummarizer:
+    """
+    Extractive summary computed in-process: keeps the sentences that carry
+    the most frequent content words, in their original order, as bullets.
+    """
+    name = "local"
+    uses_provider_summary = False
+
+    STOPWORDS = frozenset("""
+        a about after all also am an and any are as at be because been but by can could did do does
+        for from get got had has have he her here him his how i if in into is it its just know like
+        me more my no not now of on one or our out so some that the their them then there these they
+        this to too up us was we well were what when which who will with would yeah yes you your
+    """.split())
+
+    def __init__(self, max_sentences=5):
+        self.max_sentences = max_sentences
+
+    def summarize(self, text, utterances, provider_summary=None):
+        sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', text or "") if len(s.split()) > 3]
+        if not sentences:
+            return ""
+
+        words = lambda sentence: [w for w in re.findall(r"[a-z']+", sentence.lower()) if w not in self.STOPWORDS]
+        frequencies = Counter(w for sentence in sentences for w in words(sentence))
+
+        def score(sentence):
+            tokens = words(sentence)
+            return sum(frequencies[w] for w in tokens) / (len(tokens) or 1)
+
+        ranked = sorted(range(len(sentences)), key=lambda i: score(sentences[i]), reverse=True)
+        chosen = sorted(ranked[:self.max_sentences])
+        return "\n".join(f"- {sentences[i]}" for i in chosen)
+
+
+class NoSummarizer:
+    """Skip the summary stage entirely."""
+    name = "none"
+    uses_provider_summary = False
+
+    def summarize(self, text, utterances, provider_summary=None):
+        return ""
+
+
+SUMMARIZERS = {
+    cls.name: cls for cls in (ProviderSummarizer, LocalSummarizer, NoSummarizer)
+}
+
+
+def get_summarizer(name=None):
+    name = name or settings.TRANSCRIPT_SUMMARIZER
+    try:
+        return SUMMARIZERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown summarizer '{name}', expected one of: {', '.join(SUMMARIZERS)}")
@@ -1,3 +1,433 @@
-from django.test import TestCase
+import io
+import smtplib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from meetings.models import Meeting
+from organisations.models import Organisation, OrganisationMembership
+from transcripts import reminders, search
+from transcripts.action_items import extract_action_items
+from transcripts.assembly_ai import relay_audio_to_assemblyai
+from transcripts.jobs import claim_next_job, enqueue_transcription, run_job, save_transcript
+from transcripts.models import ActionItem, ReminderLock, Transcript, TranscriptBody, TranscriptionJob, TranscriptPassage
+from users.models import CustomUser
+
+
+class TranscriptionJobTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="host@example.com", password="pass")
+        self.organisation = Organisation.objects.create(name="Org", created_by=self.user)
+        self.meeting = Meeting.objects.create(
+            organisation=self.organisation, host=self.user, meeting_id="555", start_time=timezone.now(),
+        )
+
+    def test_one_unfinished_job_per_meeting(self):
+        job = enqueue_transcription(self.meeting, self.user)
+        self.assertEqual(enqueue_transcription(self.meeting, self.user), job)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TranscriptionJob.objects.create(meeting=self.meeting, requested_by=self.user)
+
+        job.status = TranscriptionJob.STATUS_DONE
+        job.save()
+        self.assertNotEqual(enqueue_transcription(self.meeting, self.user), job)
+
+    def test_concurrent_enqueue_returns_the_winner(self):
+        winner = TranscriptionJob.objects.create(meeting=self.meeting, requested_by=self.user)
+        # The racing request saw no job before the winner was inserted.
+        with mock.patch.object(TranscriptionJob.objects, 'filter') as filter_:
+            filter_.return_value.exclude.return_value.first.return_value = None
+            filter_.return_value.exclude.return_value.get.return_value = winner
+            self.assertEqual(enqueue_transcription(self.meeting, self.user), winner)
+
+    @override_settings(TRANSCRIPTION_JOB_MAX_ATTEMPTS=2)
+    def test_failed_attempts_are_retried_with_backoff(self):
+        enqueue_transcription(self.meeting, self.user)
+        with mock.patch('transcripts.jobs.transcribe_recording_with_secure_url', side_effect=ConnectionError("reset")), \
+                self.assertLogs('transcripts.jobs', 'ERROR'):
+            job = run_job(claim_next_job("worker"))
+            self.assertEqual(job.status, TranscriptionJob.STATUS_QUEUED)
+            self.assertGreater(job.next_attempt_at, timezone.now())
+            self.assertIsNone(claim_next_job("worker"))  # still backing off
+
+            TranscriptionJob.objects.update(next_attempt_at=timezone.now())
+            job = run_job(claim_next_job("worker"))
+        self.assertEqual(job.status, TranscriptionJob.STATUS_FAILED)
+        self.assertEqual(job.error, "reset")
+
+    def test_failed_extraction_does_not_transcribe_again(self):
+        enqueue_transcription(self.meeting, self.user)
+        with mock.patch('transcripts.jobs.transcribe_recording_with_secure_url', return_value=("Hello.", {})) as transcribe, \
+                mock.patch('transcripts.jobs.extract_action_items', side_effect=ValueError("bug")), \
+                self.assertLogs('transcripts.jobs', 'ERROR'):
+            job = run_job(claim_next_job("worker"))
+        self.assertEqual(job.status, TranscriptionJob.STATUS_DONE)
+        self.assertEqual(self.meeting.transcript.full_transcript, "Hello.")
+        self.assertIsNone(claim_next_job("worker"))
+        self.assertEqual(transcribe.call_count, 1)
+
+
+class TranscriptBodyTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="host@example.com", password="pass")
+        self.organisation = Organisation.objects.create(name="Org", created_by=self.user)
+        self.meeting = Meeting.objects.create(
+            organisation=self.organisation, host=self.user, meeting_id="555", start_time=timezone.now(),
+        )
+
+    def test_text_and_summary_round_trip_compressed(self):
+        text = "Ünïcode – we agreed to ship 🚀. " * 500
+        summary = {"summary_text": "Ship it", "utterances": [{"speaker": "Ada", "start": 0.5, "end": 1, "text": "Ship"}]}
+        save_transcript(self.meeting, text, summary)
+
+        body = TranscriptBody.objects.get(transcript__meeting=self.meeting)
+        self.assertEqual((body.full_transcript, body.summary), (text, summary))
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT full_transcript FROM transcripts_transcriptbody WHERE transcript_id = %s", [body.pk])
+            stored = bytes(cursor.fetchone()[0])
+        self.assertLess(len(stored), len(text.encode()) // 10)
+
+    def test_transcript_accessors_load_and_save_the_body(self):
+        transcript = Transcript(meeting=self.meeting)
+        self.assertEqual((transcript.full_transcript, transcript.summary), ("", {}))
+        transcript.full_transcript = "Hello."
+        transcript.summary = {"summary_text": "Greeting"}
+        transcript.save()
+
+        transcript = Transcript.objects.get(pk=transcript.pk)
+        with self.assertNumQueries(1):  # the body, on first access only
+            self.assertEqual(transcript.full_transcript, "Hello.")
+            self.assertEqual(transcript.summary, {"summary_text": "Greeting"})
+
+        transcript.summary = {"summary_text": "Updated"}
+        transcript.save()
+        self.assertEqual(TranscriptBody.objects.get(pk=transcript.pk).summary, {"summary_text": "Updated"})
+
+
+class TranscriptBodyMigrationTests(TransactionTestCase):
+    before = [("transcripts", "0003_transcript_updated_at")]
+    after = [("transcripts", "0004_transcriptbody")]
+
+    def migrate(self, targets):
+        """Migrate to `targets` and return the models of everything applied."""
+        MigrationExecutor(connection).migrate(targets)
+        executor = MigrationExecutor(connection)
+        return executor.loader.project_state(list(executor.loader.applied_migrations)).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_existing_transcripts_are_moved_to_bodies_and_back(self):
+        apps = self.migrate(self.before)
+        user = apps.get_model("users", "CustomUser").objects.create(email="host@example.com")
+        organisation = apps.get_model("organisations", "Organisation").objects.create(name="Org", created_by_id=user.pk)
+        meeting = apps.get_model("meetings", "Meeting").objects.create(
+            organisation_id=organisation.pk, host_id=user.pk, meeting_id="555", start_time=timezone.now(),
+        )
+        apps.get_model("transcripts", "Transcript").objects.create(
+            meeting_id=meeting.pk, full_transcript="Old text", summary={"summary_text": "Old"},
+        )
+
+        apps = self.migrate(self.after)
+        body = apps.get_model("transcripts", "TranscriptBody").objects.get()
+        self.assertEqual((body.full_transcript, body.summary), ("Old text", {"summary_text": "Old"}))
+
+        apps = self.migrate(self.before)
+        transcript = apps.get_model("transcripts", "Transcript").objects.get()
+        self.assertEqual((transcript.full_transcript, transcript.summary), ("Old text", {"summary_text": "Old"}))
+
+
+def download_response(status=200, body=b"audio"):
+    response = requests.Response()
+    response.status_code = status
+    response.raw = io.BytesIO(body)
+    response.url = "https://zoom.us/rec/download/1"
+    return response
+
+
+class AudioRelayTests(TestCase):
+    @mock.patch('transcripts.assembly_ai.upload_audio_to_assemblyai')
+    @mock.patch('transcripts.assembly_ai.http_client.get')
+    def test_download_error_is_raised_without_a_second_download(self, get, upload):
+        get.return_value = download_response(status=403)
+        with self.assertRaises(requests.HTTPError):
+            relay_audio_to_assemblyai("https://zoom.us/rec/download/1")
+        self.assertEqual(get.call_count, 1)
+        upload.assert_not_called()
+
+    @mock.patch('transcripts.assembly_ai.upload_audio_to_assemblyai')
+    @mock.patch('transcripts.assembly_ai.http_client.get')
+    def test_broken_relay_falls_back_to_a_spooled_file(self, get, upload):
+        get.side_effect = lambda *args, **kwargs: download_response()
+        uploaded = []
+
+        def upload_once(data):
+            if not uploaded:
+                uploaded.append(None)
+                raise requests.ConnectionError("reset mid-stream")
+            uploaded.append(data.read())
+            return "https://cdn.assemblyai.com/upload/1"
+
+        upload.side_effect = upload_once
+        with self.assertLogs('transcripts.assembly_ai', 'WARNING'):
+            upload_url = relay_audio_to_assemblyai("https://zoom.us/rec/download/1")
+        self.assertEqual(upload_url, "https://cdn.assemblyai.com/upload/1")
+        self.assertEqual(get.call_count, 2)
+        self.assertEqual(uploaded[1], b"audio")
+
+
+class TranscriptSearchTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="host@example.com", password="pass")
+        self.organisation = Organisation.objects.create(name="Org", created_by=self.user)
+        self.diarized = Meeting.objects.create(
+            organisation=self.organisation, host=self.user, meeting_id="1", topic="Budget review", start_time=timezone.now(),
+        )
+        save_transcript(self.diarized, "We approved the budget.", {"utterances": [
+            {"speaker": "Ada", "start": 1.5, "end": 3.0, "text": "We approved the budget."},
+        ]})
+        self.plain = Meeting.objects.create(
+            organisation=self.organisation, host=self.user, meeting_id="2", topic="Standup", start_time=timezone.now(),
+        )
+        save_transcript(self.plain, "The migration to the new warehouse slipped a week.", {"utterances": []})
+
+    def search(self, query):
+        return {result["meeting_id"]: result for result in search.search_transcripts(self.organisation.pk, query)}
+
+    def test_transcripts_without_utterances_are_found_by_their_text(self):
+        self.assertEqual(TranscriptPassage.objects.count(), 1)
+        match = self.search("warehouse")["2"]["matches"][0]
+        self.assertIsNone(match["speaker"])
+        self.assertIn("<mark>warehouse</mark>", match["snippet"])
+
+    def test_utterance_and_topic_hits(self):
+        results = self.search("budget")
+        self.assertEqual(list(results), ["1"])
+        self.assertEqual(results["1"]["matches"][0]["start_ms"], 1500)
+        self.assertIn("<mark>Budget</mark>", results["1"]["topic_snippet"])
+
+    def test_resaving_with_utterances_drops_the_passages(self):
+        save_transcript(self.plain, "Warehouse moved.", {"utterances": [
+            {"speaker": "Bo", "start": 0, "end": 1, "text": "Warehouse moved."},
+        ]})
+        self.assertFalse(TranscriptPassage.objects.exists())
+        self.assertEqual(self.search("warehouse")["2"]["matches"][0]["speaker"], "Bo")
+
+    def test_other_databases_fall_back_to_contains_lookups(self):
+        with mock.patch.object(search.connection, "vendor", "mysql"):
+            self.assertIsInstance(search.get_backend(), search.ContainsSearchBackend)
+        with mock.patch.object(search, "get_backend", return_value=search.ContainsSearchBackend()):
+            results = self.search("WAREHOUSE week")
+            self.assertEqual(list(results), ["2"])
+            self.assertIn("<mark>warehouse</mark>", results["2"]["matches"][0]["snippet"])
+            self.assertEqual(self.search("budget")["1"]["matches"][0]["speaker"], "Ada")
+
+    def test_snippets_escape_transcript_and_topic_text(self):
+        meeting = Meeting.objects.create(
+            organisation=self.organisation, host=self.user, meeting_id="3", topic="<b>Launch</b>", start_time=timezone.now(),
+        )
+        save_transcript(meeting, "", {"utterances": [
+            {"speaker": "Eve", "start": 0, "end": 1, "text": "<script>alert(1)</script> launch plan"},
+        ]})
+        for backend in (search.get_backend(), search.ContainsSearchBackend()):
+            with mock.patch.object(search, "get_backend", return_value=backend):
+                result = self.search("launch")["3"]
+            self.assertIn("&lt;script&gt;alert(1)&lt;/script&gt; <mark>launch</mark>", result["matches"][0]["snippet"])
+            self.assertEqual(result["topic_snippet"], "&lt;b&gt;<mark>Launch</mark>&lt;/b&gt;")
+
+    def test_long_text_is_split_into_passages(self):
+        passages = TranscriptPassage.from_text(None, "word " * 1000, size=100)
+        self.assertTrue(all(len(passage.text) <= 100 for passage in passages))
+        self.assertEqual(sum(passage.text.count("word") for passage in passages), 1000)
+
+
+def utterance(speaker, start, text):
+    return {"speaker": speaker, "start": start, "end": start + 1, "text": text}
+
+
+class ActionItemExtractionTests(TestCase):
+    def setUp(self):
+        self.host = CustomUser.objects.create_user(email="ada@example.com", password="pass", first_name="Ada")
+        self.bob = CustomUser.objects.create_user(email="bob@example.com", password="pass", first_name="Bob")
+        self.organisation = Organisation.objects.create(name="Org", created_by=self.host)
+        for user in (self.host, self.bob):
+            OrganisationMembership.objects.create(user=user, organisation=self.organisation, role="member")
+        self.meeting = Meeting.objects.create(
+            organisation=self.organisation, host=self.host, meeting_id="9", start_time=timezone.now(),
+        )
+
+    def extract(self, utterances, summary_text=""):
+        transcript = save_transcript(self.meeting, "", {"summary_text": summary_text, "utterances": utterances})
+        extract_action_items(transcript)
+        return {item.content: item.assigned_to for item in ActionItem.objects.filter(meeting=self.meeting)}
+
+    def test_commitments_are_assigned_to_named_speakers_only(self):
+        items = self.extract([
+            utterance("Bob", 0, "I'll send the revised deck tomorrow."),
+            utterance("A", 5, "I will update the roadmap page."),
+            utterance("Speaker 2", 9, "Let me book the venue for the offsite."),
+        ])
+        self.assertEqual(items, {
+            "Send the revised deck tomorrow": self.bob,
+            "Update the roadmap page": None,
+            "Book the venue for the offsite": None,
+        })
+
+    def test_assignments_and_summary_bullets(self):
+        items = self.extract(
+            [utterance("A", 0, "Bob, can you review the contract?")],
+            summary_text="- Ada will share the hiring plan by Friday.",
+        )
+        self.assertEqual(items, {
+            "Review the contract": self.bob,
+            "Share the hiring plan by Friday": self.host,
+        })
+
+    def test_re_extraction_is_idempotent(self):
+        self.extract([
+            utterance("A", 0, "Bob, can you review the contract?"),
+            utterance("B", 4, "I'll draft the memo today."),
+            utterance("B", 8, "I'll order new chairs."),
+        ])
+        ActionItem.objects.filter(content="Review the contract").update(status="done")
+        memo = ActionItem.objects.get(content="Draft the memo today")
+        manual = ActionItem.objects.create(meeting=self.meeting, content="Manual", due_date=timezone.localdate())
+
+        # Diarization labels swapped between runs, and the chairs are no longer mentioned.
+        items = self.extract([utterance("A", 0, "I'll draft the memo today.")])
+        self.assertEqual(set(items), {"Review the contract", "Draft the memo today", "Manual"})
+        self.assertEqual(ActionItem.objects.get(content="Draft the memo today").pk, memo.pk)
+        self.assertEqual(ActionItem.objects.get(content="Review the contract").status, "done")
+        self.assertTrue(ActionItem.objects.filter(pk=manual.pk).exists())
+
+
+class FetchTranscriptConditionalTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(email="host@example.com", password="pass")
+        organisation = Organisation.objects.create(name="Org", created_by=user)
+        self.meeting = Meeting.objects.create(organisation=organisation, host=user, meeting_id="8", start_time=timezone.now())
+        save_transcript(self.meeting, "First draft.", {"utterances": []})
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.url = reverse("fetch-transcript", args=["8"])
+
+    def test_unchanged_transcript_is_answered_with_304_without_reading_the_body(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_saving_the_transcript_changes_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        save_transcript(self.meeting, "Second draft.", {"utterances": []})
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["full_transcript"], "Second draft.")
+
+
+class TranscriptUtterancesViewTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(email="host@example.com", password="pass")
+        organisation = Organisation.objects.create(name="Org", created_by=user)
+        self.meeting = Meeting.objects.create(organisation=organisation, host=user, meeting_id="7", start_time=timezone.now())
+        save_transcript(self.meeting, "", {"utterances": [
+            utterance("A", 0, "Hello."), utterance("B", 2, "Hi."), utterance("A", 2, "Agenda?"),
+            utterance("B", 10, "Budget."), utterance("A", 20, "Bye."),
+        ]})
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.url = reverse("transcript-utterances", args=["7"])
+
+    def get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def texts(self, data):
+        return [utterance["text"] for utterance in data["utterances"]]
+
+    def test_pages_follow_the_cursor_in_time_order(self):
+        pages, params = [], {"limit": 2}
+        while True:
+            data = self.get(**params)
+            pages.append(self.texts(data))
+            if not data["has_more"]:
+                break
+            params["cursor"] = data["next_cursor"]
+        # Equal start times are ordered by insertion.
+        self.assertEqual(pages, [["Hello.", "Hi."], ["Agenda?", "Budget."], ["Bye."]])
+        self.assertIsNone(data["next_cursor"])
+
+    def test_time_window_and_speaker_filters(self):
+        self.assertEqual(self.texts(self.get(start_ms=2500, end_ms=10500)), ["Hi.", "Agenda?", "Budget."])
+        self.assertEqual(self.texts(self.get(start_ms=2500, speaker="A")), ["Agenda?", "Bye."])
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({"start_ms": "soon"}, {"end_ms": -1}, {"limit": 0}, {"limit": 1001}, {"cursor": "abc"}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+    def test_missing_meeting_or_transcript_is_404(self):
+        self.assertEqual(self.client.get(reverse("transcript-utterances", args=["404"])).status_code, 404)
+        Transcript.objects.filter(meeting=self.meeting).delete()
+        response = self.client.get(self.url)
+        self.assertEqual((response.status_code, response.json()), (404, {"error": "Transcript not found"}))
+
+
+class ReminderDispatchTests(TestCase):
+    def setUp(self):
+        users = [
+            CustomUser.objects.create_user(email=f"{name}@example.com", password="pass", first_name=name.title())
+            for name in ("ada", "bob", "cy")
+        ]
+        organisation = Organisation.objects.create(name="Org", created_by=users[0])
+        meeting = Meeting.objects.create(organisation=organisation, host=users[0], meeting_id="3", start_time=timezone.now())
+        for user in users:
+            ActionItem.objects.create(meeting=meeting, assigned_to=user, content="Task", due_date=timezone.localdate())
+        self.connection = mock.Mock()
+
+    def test_a_failed_digest_does_not_stop_the_others(self):
+        def send_messages(messages):
+            if messages[0].to == ["bob@example.com"]:
+                raise smtplib.SMTPRecipientsRefused({"bob@example.com": (550, b"No such user")})
+            return 1
+
+        self.connection.send_messages.side_effect = send_messages
+        with self.assertLogs("transcripts.reminders", "ERROR"):
+            result = reminders.dispatch_reminders(connection=self.connection, batch_size=10)
+
+        self.assertEqual(result, (2, 2))
+        self.assertEqual(
+            list(ActionItem.objects.filter(reminder_sent=False).values_list("assigned_to__email", flat=True)),
+            ["bob@example.com"],
+        )
+
+    def test_a_dropped_connection_is_reopened_for_the_next_digest(self):
+        self.connection.send_messages.side_effect = [smtplib.SMTPServerDisconnected("closed"), 1, 1]
+        with self.assertLogs("transcripts.reminders", "ERROR"):
+            self.assertEqual(reminders.dispatch_reminders(connection=self.connection, batch_size=10), (2, 2))
+        calls = [call[0] for call in self.connection.method_calls]
+        self.assertEqual(calls[:5], ["open", "send_messages", "close", "open", "send_messages"])
+
+    def test_only_one_run_holds_the_lock(self):
+        self.assertTrue(reminders.acquire_lock("other-host:1:0"))
+        self.assertIsNone(reminders.dispatch_reminders(connection=self.connection))
+        self.connection.send_messages.assert_not_called()
+
+        reminders.release_lock("other-host:1:0")
+        self.assertEqual(reminders.dispatch_reminders(connection=self.connection), (3, 3))
+
+    def test_a_stale_lock_is_taken_over(self):
+        reminders.acquire_lock("dead-host:1:0")
+        ReminderLock.objects.update(locked_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(reminders.dispatch_reminders(connection=self.connection), (3, 3))
+        self.assertEqual(ReminderLock.objects.get().locked_by, "")
@@ -4,6 +4,9 @@ from .views import *
 
 urlpatterns = [
     path("zoom/transcribe/<str:meeting_id>/", TranscribeRecordingView.as_view(), name="transcribe-recording"),
+    path("zoom/transcribe/jobs/<int:job_id>/", TranscriptionJobStatusView.as_view(), name="transcription-job-status"),
     path("zoom/fetch-transcript/<str:meeting_id>/", FetchTranscriptView.as_view(), name="fetch-transcript"),
+    path("zoom/fetch-transcript/<str:meeting_id>/utterances/", TranscriptUtterancesView.as_view(), name="transcript-utterances"),
+    path("search/<str:org_id>/", TranscriptSearchView.as_view(), name="transcript-search"),
 ]
 
@@ -1,31 +1,58 @@
+from django.db.models import Q
 from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework import status
+from actionboard_back.conditional import not_modified, set_validators
+from meetings import cache as meeting_cache
 from meetings.models import Meeting
 import requests
 from rest_framework.permissions import IsAuthenticated
-from transcripts.assembly_ai import transcribe_recording_with_secure_url
-from transcripts.models import Transcript
+from transcripts.jobs import enqueue_transcription
+from transcripts.models import Transcript, TranscriptionJob, Utterance
+from transcripts.search import search_transcripts
 
 # Create your views here.
+def transcript_etag(transcript_pk, updated_at):
+    return f'"transcript-{transcript_pk}-{int(updated_at.timestamp() * 1000000)}"'
+
+
 class FetchTranscriptView(APIView):
+    """
+    Transcript text and summary for a meeting. Clients polling for changes
+    should send back the ETag; an unchanged transcript is answered with 304
+    from one narrow query, without reading the transcript body.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, meeting_id):
-        meeting = Meeting.objects.filter(meeting_id=meeting_id).first()
+        meeting = (
+            Meeting.objects
+            .filter(meeting_id=meeting_id)
+            .values('pk', 'transcript__pk', 'transcript__updated_at')
+            .first()
+        )
         if not meeting:
             return Response({"error": "Meeting not found"}, status=404)
-        
-        if hasattr(meeting, "transcript"):
-            transcript_data = {
-                "full_transcript": meeting.transcript.full_transcript,
-                "summary": meeting.transcript.summary,
-                "language": meeting.transcript.language,
-            }
-            return Response(transcript_data, status=200)
-        else:
+
+        if meeting['transcript__pk'] is None:
             return Response({"transcript": None}, status=200)
 
+        updated_at = meeting['transcript__updated_at']
+        etag = transcript_etag(meeting['transcript__pk'], updated_at)
+        response = not_modified(request, etag=etag, last_modified=updated_at)
+        if response is not None:
+            return response
+
+        transcript = Transcript.objects.select_related('body').get(pk=meeting['transcript__pk'])
+        transcript_data = {
+            "full_transcript": transcript.full_transcript,
+            "summary": transcript.summary,
+            "language": transcript.language,
+        }
+        return set_validators(Response(transcript_data, status=200), etag=etag, last_modified=updated_at)
+
 
 class TranscribeRecordingView(APIView):
     permission_classes = [IsAuthenticated]
@@ -33,30 +60,130 @@ class TranscribeRecordingView(APIView):
     def post(self, request, meeting_id):
         meeting = get_object_or_404(Meeting, meeting_id=meeting_id)
 
-        try:
-            transcript_text, summary = transcribe_recording_with_secure_url(
-                meeting_id, request.user
-            )
+        # The actual download/upload/transcription runs in the
+        # run_transcription_workers pool, never on the request thread.
+        job = enqueue_transcription(meeting, request.user)
 
-            transcript, created = Transcript.objects.get_or_create(
-                meeting=meeting,
-                defaults={
-                    "full_transcript": transcript_text,
-                    "summary": summary
-                }
-            )
-            if not created:
-                transcript.full_transcript = transcript_text
-                transcript.summary = summary
-                transcript.save()
+        return Response({
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": reverse("transcription-job-status", args=[job.id]),
+        }, status=status.HTTP_202_ACCEPTED)
 
-            return Response({
-                "full_transcript": transcript.full_transcript,
-                "summary": transcript.summary
-            })
 
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
+class TranscriptionJobStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(TranscriptionJob.objects.select_related('meeting'), pk=job_id)
+
+        return Response({
+            "job_id": job.id,
+            "meeting_id": job.meeting.meeting_id,
+            "status": job.status,
+            "error": job.error or None,
+            "attempts": job.attempts,
+            "created_at": job.created_at.isoformat(),
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        })
+
+
+class TranscriptUtterancesView(APIView):
+    """
+    Diarized segments of a meeting's transcript, read from the Utterance
+    table so the transcript body is never loaded.
+
+    ?start_ms=720000&end_ms=900000  segments overlapping that window
+    ?speaker=B                      only that speaker's segments
+    ?limit=500                      segments per page, at most 1000
+    ?cursor=...                     next_cursor from the previous page
+
+    Pages are keyset-paginated on (start_ms, id), in time order.
+    """
+    permission_classes = [IsAuthenticated]
+
+    DEFAULT_LIMIT = 500
+    MAX_LIMIT = 1000
 
+    def get(self, request, meeting_id):
+        params = {}
+        for param, default in (('start_ms', None), ('end_ms', None), ('limit', self.DEFAULT_LIMIT)):
+            value = request.query_params.get(param, default)
+            if value is None:
+                continue
+            try:
+                params[param] = int(value)
+            except ValueError:
+                return Response({"error": f"{param} must be an integer"}, status=400)
+            if params[param] < 0:
+                return Response({"error": f"{param} must not be negative"}, status=400)
+        if not 1 <= params['limit'] <= self.MAX_LIMIT:
+            return Response({"error": f"limit must be between 1 and {self.MAX_LIMIT}"}, status=400)
+
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                after_ms, after_pk = (int(part) for part in cursor.split('.'))
+            except ValueError:
+                return Response({"error": "Invalid cursor"}, status=400)
+
+        meeting = Meeting.objects.filter(meeting_id=meeting_id).values('transcript__pk').first()
+        if not meeting:
+            return Response({"error": "Meeting not found"}, status=404)
+        if meeting['transcript__pk'] is None:
+            return Response({"error": "Transcript not found"}, status=404)
+
+        utterances = Utterance.objects.filter(transcript_id=meeting['transcript__pk']).order_by('start_ms', 'pk')
+        if 'end_ms' in params:
+            utterances = utterances.filter(start_ms__lt=params['end_ms'])
+        if 'start_ms' in params:
+            utterances = utterances.filter(end_ms__gt=params['start_ms'])
+        speaker = request.query_params.get('speaker')
+        if speaker:
+            utterances = utterances.filter(speaker=speaker)
+        if cursor:
+            utterances = utterances.filter(Q(start_ms__gt=after_ms) | Q(start_ms=after_ms, pk__gt=after_pk))
+
+        # One extra row tells us whether there is a next page without a COUNT.
+        page = list(utterances.values('pk', 'speaker', 'start_ms', 'end_ms', 'text')[:params['limit'] + 1])
+        next_cursor = None
+        if len(page) > params['limit']:
+            page = page[:params['limit']]
+            next_cursor = f"{page[-1]['start_ms']}.{page[-1]['pk']}"
+        for utterance in page:
+            del utterance['pk']
+
+        return Response({
+            "utterances": page,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        }, status=200)
+
+
+class TranscriptSearchView(APIView):
+    """
+    Ranked search over an organisation's transcripts and meeting topics,
+    e.g. ?q=Q3 budget. See transcripts.search.
+    """
+    permission_classes = [IsAuthenticated]
+
+    MAX_LIMIT = 50
+
+    def get(self, request, org_id):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required"}, status=400)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), self.MAX_LIMIT))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
 
+        org_pk = meeting_cache.get_org_pk(org_id)
+        if org_pk is None:
+            return Response({"error": "Organisation not found"}, status=404)
 
+        return Response({
+            "query": query,
+            "results": search_transcripts(org_pk, query, limit=limit),
+        }, status=200)
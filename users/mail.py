@@ -0,0 +1,150 @@
+"""
+Outbound email queue.
+
+enqueue_email() stores the message in OutboundEmail and returns at once, so
+no request waits on SMTP. drain_outbox() (run by `python manage.py
+send_emails`) claims due emails in batches and sends them over one SMTP
+connection that the worker keeps open between batches. Failures are
+retried with exponential backoff until EMAIL_OUTBOX_MAX_ATTEMPTS, then the
+email is marked failed with the last error. A sent email's body (OTPs,
+reset links) is blanked at once and the row deleted after
+EMAIL_OUTBOX_RETENTION.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from actionboard_back import metrics
+from actionboard_back.utils import retry_delay
+from users.models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(to, subject, body, from_email=''):
+    email = OutboundEmail.objects.create(to=to, subject=subject, body=body, from_email=from_email or '')
+    metrics.incr("email.enqueued")
+    return email
+
+
+def claim_emails(worker_id, batch_size=50):
+    """
+    Claim up to batch_size due emails for this worker. Emails left in
+    sending by a worker that died are picked up again once their lock is
+    older than EMAIL_OUTBOX_LOCK_TIMEOUT.
+    """
+    now = timezone.now()
+    OutboundEmail.objects.filter(
+        status=OutboundEmail.STATUS_SENDING,
+        locked_at__lt=now - timedelta(seconds=settings.EMAIL_OUTBOX_LOCK_TIMEOUT),
+    ).update(status=OutboundEmail.STATUS_PENDING, locked_by='')
+
+    with transaction.atomic():
+        email_ids = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=email_ids, status=OutboundEmail.STATUS_PENDING).update(
+            status=OutboundEmail.STATUS_SENDING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+
+    return list(OutboundEmail.objects.filter(
+        pk__in=email_ids, status=OutboundEmail.STATUS_SENDING, locked_by=worker_id,
+    ).order_by('created_at'))
+
+
+def record_failure(email, error):
+    email.last_error = error
+    email.locked_by = ''
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboundEmail.STATUS_FAILED
+        metrics.incr("email.failed")
+    else:
+        email.status = OutboundEmail.STATUS_PENDING
+        email.next_attempt_at = timezone.now() + retry_delay(
+            email.attempts, settings.EMAIL_OUTBOX_RETRY_BASE_DELAY, settings.EMAIL_OUTBOX_RETRY_MAX_DELAY,
+        )
+        metrics.incr("email.retried")
+    email.save(update_fields=['status', 'last_error', 'locked_by', 'next_attempt_at'])
+
+
+def send_emails(emails, connection):
+    """
+    Send claimed emails over `connection`, one message per call so each
+    outcome is known, and record the results. Returns the number sent.
+    """
+    sent_ids = []
+    for email in emails:
+        message = EmailMessage(
+            subject=email.subject,
+            body=email.body,
+            from_email=email.from_email or None,
+            to=[email.to],
+            connection=connection,
+        )
+        try:
+            if not connection.send_messages([message]):
+                raise RuntimeError("The mail backend did not accept the message")
+        except Exception as e:
+            logger.warning("Email %s to %s failed: %s", email.pk, email.to, e)
+            record_failure(email, str(e))
+            # The server may have dropped us; reconnect for the next message.
+            connection.close()
+            try:
+                connection.open()
+            except Exception:
+                pass
+            continue
+        sent_ids.append(email.pk)
+
+    if sent_ids:
+        OutboundEmail.objects.filter(pk__in=sent_ids).update(
+            status=OutboundEmail.STATUS_SENT,
+            body='',
+            last_error='',
+            locked_by='',
+            sent_at=timezone.now(),
+        )
+        metrics.incr("email.sent", len(sent_ids))
+    return len(sent_ids)
+
+
+def purge_sent_emails():
+    """
+    Drop sent emails older than EMAIL_OUTBOX_RETENTION; failed emails are
+    kept for inspection. Returns the number of rows deleted.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.EMAIL_OUTBOX_RETENTION)
+    deleted, _ = OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENT, sent_at__lt=cutoff).delete()
+    if deleted:
+        metrics.incr("email.purged", deleted)
+    return deleted
+
+
+def drain_outbox(worker_id, connection, batch_size=50):
+    """
+    Send one batch of due emails. Returns the number of emails claimed.
+    """
+    emails = claim_emails(worker_id, batch_size=batch_size)
+    if not emails:
+        return 0
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning("Could not connect to the mail server: %s", e)
+        for email in emails:
+            record_failure(email, str(e))
+        return len(emails)
+    send_emails(emails, connection)
+    return len(emails)
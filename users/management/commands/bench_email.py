@@ -0,0 +1,146 @@
+import math
+import socketserver
+import statistics
+import threading
+import time
+
+from django.core.mail import get_connection, send_mail
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from actionboard_back.utils import rolled_back
+from users.mail import drain_outbox
+from users.models import OutboundEmail
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough SMTP for smtplib: every reply is delayed by the server's
+    latency, to stand in for the round trip to a real mail server.
+    """
+
+    def reply(self, line):
+        time.sleep(self.server.latency)
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 bench ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().split(' ', 1)[0].upper()
+            if command == 'EHLO':
+                self.wfile.write(b"250-bench\r\n")
+                self.reply("250 8BITMIME")
+            elif command == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.received += 1
+                self.reply("250 OK")
+            elif command == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.received = 0
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1000, samples[math.ceil(len(samples) * 95 / 100) - 1] * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark OTP email delivery against a local SMTP stand-in: sending inline per "
+        "request (the old path) versus enqueueing from the API and draining the outbox "
+        "over one connection. Data is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--emails', type=int, default=200)
+        parser.add_argument('--latency', type=float, default=20.0, help="Milliseconds the SMTP server waits before each reply.")
+        parser.add_argument('--batch-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        server = SMTPServer(options['latency'] / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        smtp = dict(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=server.server_address[1],
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+        )
+        try:
+            with override_settings(**smtp), rolled_back():
+                self.run(server, options)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def run(self, server, options):
+        count = options['emails']
+        self.stdout.write(f"{count} emails, {options['latency']:.0f} ms per SMTP reply")
+        self.stdout.write(f"{'path':<28} {'p50 ms':>9} {'p95 ms':>9} {'total s':>9} {'emails/s':>9}")
+
+        def report(name, samples, total, sent):
+            p50, p95 = percentiles(samples) if samples else (0, 0)
+            self.stdout.write(f"{name:<28} {p50:>9.1f} {p95:>9.1f} {total:>9.2f} {sent / total:>9.0f}")
+
+        samples = []
+        started = time.perf_counter()
+        for n in range(count):
+            sent = time.perf_counter()
+            send_mail("Your OTP Code", "Your OTP code is: 123456", None, [f"bench-direct-{n}@example.com"])
+            samples.append(time.perf_counter() - sent)
+        report("send inline per request", samples, time.perf_counter() - started, count)
+
+        client = APIClient()
+        url = reverse('send-otp')
+        samples = []
+        started = time.perf_counter()
+        for n in range(count):
+            sent = time.perf_counter()
+            response = client.post(url, {"email": f"bench-queued-{n}@example.com"}, format='json')
+            samples.append(time.perf_counter() - sent)
+            assert response.status_code == 200, response.content
+        report("API request, enqueue only", samples, time.perf_counter() - started, count)
+
+        before = server.received
+        connection = get_connection()
+        samples = []
+        started = time.perf_counter()
+        try:
+            while True:
+                batch_started = time.perf_counter()
+                claimed = drain_outbox("bench", connection, batch_size=options['batch_size'])
+                if not claimed:
+                    break
+                samples.append((time.perf_counter() - batch_started) / claimed)
+        finally:
+            connection.close()
+        elapsed = time.perf_counter() - started
+        delivered = server.received - before
+        report("worker drain, per email", samples, elapsed, delivered)
+
+        statuses = {
+            status: OutboundEmail.objects.filter(status=status).count() for status, _ in OutboundEmail.STATUS_CHOICES
+        }
+        self.stdout.write(f"server received {delivered} queued emails; outbox: {statuses}")
@@ -0,0 +1,55 @@
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from actionboard_back import metrics
+from actionboard_back.utils import make_worker_id, poll, stop_event
+from users.mail import drain_outbox, purge_sent_emails
+from users.models import OutboundEmail
+
+
+class Command(BaseCommand):
+    help = "Send the emails queued in the outbox over a reused SMTP connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the outbox is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the outbox once and exit.")
+        parser.add_argument('--stats', action='store_true', help="Print outbox status counts and exit.")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self.print_stats()
+
+        worker_id = make_worker_id()
+        connection = get_connection()
+
+        def drain():
+            claimed = drain_outbox(worker_id, connection, batch_size=options['batch_size'])
+            if claimed:
+                self.stdout.write(f"Processed {claimed} emails")
+            return claimed
+
+        def idle():
+            # Don't hold the SMTP connection open until the server drops it,
+            # and expire old sent rows.
+            connection.close()
+            purge_sent_emails()
+
+        try:
+            poll(stop_event(), drain, options['poll_interval'], once=options['once'], on_idle=idle)
+        finally:
+            connection.close()
+
+    def print_stats(self):
+        # Counted from the outbox itself, so they cover every process.
+        counts = dict(OutboundEmail.objects.values_list('status').annotate(Count('pk')).order_by())
+        for status, _ in OutboundEmail.STATUS_CHOICES:
+            self.stdout.write(f"{status}: {counts.get(status, 0)}")
+        self.stdout.write(f"retried: {OutboundEmail.objects.filter(attempts__gt=1).count()}")
+
+        if not metrics.is_shared():
+            self.stdout.write("send counters: not shared with other processes, set CACHE_URL to a shared cache")
+            return
+        counters = metrics.snapshot("email.enqueued", "email.sent", "email.retried", "email.failed", "email.purged")
+        self.stdout.write(", ".join(f"{name.split('.', 1)[1]} {value}" for name, value in counters.items()))
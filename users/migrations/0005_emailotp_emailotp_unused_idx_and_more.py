@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_remove_customuser_name_customuser_country_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailotp',
+            index=models.Index(condition=models.Q(('is_used', False)), fields=['email', 'otp', '-created_at'], name='emailotp_unused_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emailotp',
+            index=models.Index(condition=models.Q(('is_used', True), ('is_verified', True)), fields=['email', '-verified_at'], name='emailotp_verified_idx'),
+        ),
+    ]
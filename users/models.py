@@ -50,8 +50,68 @@ class EmailOTP(models.Model):
     is_verified = models.BooleanField(default=False)
     verified_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Latest unused OTP for an email/code pair (verify flows).
+            models.Index(
+                fields=['email', 'otp', '-created_at'],
+                condition=models.Q(is_used=False),
+                name='emailotp_unused_idx',
+            ),
+            # Most recent verified OTP before a password reset.
+            models.Index(
+                fields=['email', '-verified_at'],
+                condition=models.Q(is_verified=True, is_used=True),
+                name='emailotp_verified_idx',
+            ),
+        ]
+
     def is_expired(self):
         return self.created_at < timezone.now() - timedelta(minutes=10)
 
     def __str__(self):
-        return f"{self.email} - {self.otp}"
\ No newline at end of file
+        return f"{self.email} - {self.otp}"
+
+
+class OutboundEmail(models.Model):
+    """
+    Outbox of emails to send. Request handlers only enqueue rows here
+    (users.mail.enqueue_email); the send_emails worker delivers them over a
+    reused SMTP connection and records the outcome.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)  # blank: DEFAULT_FROM_EMAIL
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
@@ -3,7 +3,7 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 from users.models import CustomUser, EmailOTP
-from django.core.mail import send_mail
+from users.mail import enqueue_email
 from django_countries.serializer_fields import CountryField as CountrySerializerField
 
 class SendOTPSerializer(serializers.Serializer):
@@ -40,11 +40,10 @@ class RegisterSerializer(serializers.ModelSerializer):
         otp = str(random.randint(100000, 999999))
         EmailOTP.objects.create(email=email, otp=otp)
 
-        send_mail(
+        enqueue_email(
+            to=email,
             subject='Your OTP Code',
-            message=f'Your OTP code is: {otp}',
-            from_email=None,
-            recipient_list=[email],
+            body=f'Your OTP code is: {otp}',
         )
     
 
@@ -1,3 +1,86 @@
-from django.test import TestCase
+import smtplib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from users.mail import claim_emails, drain_outbox, enqueue_email, purge_sent_emails
+from users.models import OutboundEmail
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_BASE_DELAY=30, EMAIL_OUTBOX_RETENTION=3600,
+)
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.otp = enqueue_email("ada@example.com", "Your code", "Your code is 123456")
+
+    def failing_connection(self, *errors):
+        connection = mock.Mock()
+        connection.send_messages.side_effect = list(errors)
+        return connection
+
+    def test_sent_emails_lose_their_body(self):
+        self.assertEqual(drain_outbox("worker", get_connection()), 1)
+
+        self.assertEqual(mail.outbox[0].body, "Your code is 123456")
+        self.otp.refresh_from_db()
+        self.assertEqual((self.otp.status, self.otp.body), ("sent", ""))
+        self.assertIsNotNone(self.otp.sent_at)
+
+    def test_claimed_emails_are_not_claimed_by_another_worker(self):
+        self.assertEqual(claim_emails("a"), [self.otp])
+        self.assertEqual(claim_emails("b"), [])
+
+        OutboundEmail.objects.update(locked_at=timezone.now() - timedelta(days=1))
+        self.assertEqual([email.locked_by for email in claim_emails("b")], ["b"])
+
+    def test_failures_back_off_then_fail(self):
+        connection = self.failing_connection(smtplib.SMTPDataError(451, b"Try later"), smtplib.SMTPDataError(451, b"Try later"))
+        with self.assertLogs("users.mail", "WARNING"):
+            drain_outbox("worker", connection)
+        self.otp.refresh_from_db()
+        self.assertEqual((self.otp.status, self.otp.attempts), ("pending", 1))
+        self.assertIn("Try later", self.otp.last_error)
+        self.assertTrue(14 < (self.otp.next_attempt_at - timezone.now()).total_seconds() <= 30)
+        self.assertEqual(drain_outbox("worker", connection), 0)  # still backing off
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        with self.assertLogs("users.mail", "WARNING"):
+            drain_outbox("worker", connection)
+        self.otp.refresh_from_db()
+        self.assertEqual((self.otp.status, self.otp.attempts), ("failed", 2))
+        self.assertEqual(self.otp.body, "Your code is 123456")  # kept for inspection
+
+    def test_a_dropped_connection_is_reopened_for_the_next_email(self):
+        reset = enqueue_email("bob@example.com", "Reset", "Reset link")
+        connection = self.failing_connection(smtplib.SMTPServerDisconnected("Connection unexpectedly closed"), 1)
+        with self.assertLogs("users.mail", "WARNING"):
+            drain_outbox("worker", connection)
+
+        self.assertEqual([call[0] for call in connection.method_calls], ["open", "send_messages", "close", "open", "send_messages"])
+        self.assertEqual(dict(OutboundEmail.objects.values_list("pk", "status")), {self.otp.pk: "pending", reset.pk: "sent"})
+
+    def test_the_server_being_down_fails_the_whole_batch(self):
+        connection = mock.Mock()
+        connection.open.side_effect = ConnectionRefusedError("refused")
+        with self.assertLogs("users.mail", "WARNING"):
+            self.assertEqual(drain_outbox("worker", connection), 1)
+        connection.send_messages.assert_not_called()
+        self.otp.refresh_from_db()
+        self.assertEqual((self.otp.status, self.otp.last_error), ("pending", "refused"))
+
+    def test_purge_drops_old_sent_emails_only(self):
+        failed = enqueue_email("bob@example.com", "Reset", "Reset link")
+        OutboundEmail.objects.filter(pk=failed.pk).update(status="failed")
+        drain_outbox("worker", get_connection())
+        recent = enqueue_email("cy@example.com", "Your code", "Your code is 654321")
+        drain_outbox("worker", get_connection())
+        OutboundEmail.objects.exclude(pk=recent.pk).update(sent_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(purge_sent_emails(), 1)
+        self.assertEqual(set(OutboundEmail.objects.values_list("pk", flat=True)), {failed.pk, recent.pk})
@@ -3,12 +3,12 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from django.core.mail import send_mail
 from django.contrib.auth import get_user_model
 from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
 from allauth.socialaccount.providers.oauth2.client import OAuth2Client
 from dj_rest_auth.registration.views import SocialLoginView
 from .models import EmailOTP
+from .mail import enqueue_email
 from rest_framework_simplejwt.tokens import RefreshToken
 import random
 from rest_framework import generics
@@ -31,11 +31,10 @@ class SendOTPView(APIView):
 
             EmailOTP.objects.create(email=email, otp=otp)
 
-            send_mail(
+            enqueue_email(
+                to=email,
                 subject='Your OTP Code',
-                message=f'Your OTP code is: {otp}',
-                from_email=None,
-                recipient_list=[email]
+                body=f'Your OTP code is: {otp}',
             )
             return Response({'message': 'OTP sent successfully'}, status=200)
         return Response(serializer.errors, status=400)
@@ -167,11 +166,11 @@ class ForgotPasswordRequestOTPView(APIView):
         otp = str(random.randint(100000, 999999))  # 6-digit numeric OTP
         EmailOTP.objects.create(email=email, otp=otp)
 
-        send_mail(
+        enqueue_email(
+            to=email,
             subject='Your OTP Code',
-            message=f'Your OTP code is: {otp}',
+            body=f'Your OTP code is: {otp}',
             from_email='noreply@example.com',  # or your configured from_email
-            recipient_list=[email],
         )
     
 class VerifyOTPForForgotPasswordView(APIView):